@@ -0,0 +1,199 @@
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from ingest import (
+    RefTables,
+    append_rows,
+    qualifying_rows,
+    race_row,
+    read_race_csv_state,
+    read_result_csv_state,
+    result_key,
+    result_rows,
+    validate_race,
+)
+from serialization import loads
+
+# Batch ingestion of Ergast / Jolpica files (result, sprint and qualifying pages, any
+# number of seasons) into the CSVs under a data directory
+#   - files are decoded in a process pool and merged in path order; ids are only assigned
+#     in the merge, in (season, round) order, so the output does not depend on the order
+#     the files are given in or on scheduling
+#   - a race is merged from every file holding part of it (pages, /sprint, /qualifying)
+#   - races already in the race CSV keep their ids, only sprint / qualifying rows they
+#     are missing are added
+#   - a race that fails validate_race is reported and skipped, nothing of it is written,
+#     as is a file that is not valid JSON or holds no MRData.RaceTable.Races
+
+# data directory file names, the same ones main.py reads
+RACE_CSV = "new_races.csv"
+RESULT_CSV = "new_results.csv"
+SPRINT_CSV = "sprint_results.csv"
+QUALIFYING_CSV = "qualifying.csv"
+# result lists of an Ergast race
+SECTIONS = ("Results", "SprintResults", "QualifyingResults")
+
+
+@dataclass
+class BatchStats:
+    files: int = 0
+    races: int = 0
+    results: int = 0
+    sprint_results: int = 0
+    qualifying: int = 0
+    new_drivers: int = 0
+    new_ctors: int = 0
+    new_statuses: int = 0
+    issues: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+# (races, None), or ([], why) for a file that can't be read or holds no races (e.g. a
+# drivers.json picked up by a glob), so one bad file never stops the batch
+def read_races(json_path: str) -> tuple[list[dict], str | None]:
+    try:
+        with open(json_path, "rb") as f:
+            races_json = loads(f.read())
+    except OSError as e:
+        return [], f"{json_path}: {e.strerror or e}"
+    except ValueError as e:
+        return [], f"{json_path}: not valid JSON ({e})"
+
+    mr_data = races_json.get("MRData") if isinstance(races_json, dict) else None
+    race_table = mr_data.get("RaceTable") if isinstance(mr_data, dict) else None
+    races = race_table.get("Races") if isinstance(race_table, dict) else None
+    if not isinstance(races, list) or not all(isinstance(race, dict) for race in races):
+        return [], f"{json_path}: no MRData.RaceTable.Races"
+    return races, None
+
+
+# one race per (season, round), oldest first, with the results of every file
+#   - results repeated by overlapping pages are dropped, the rest keep their file order
+def merge_races(races_by_file: list[list[dict]]) -> list[dict]:
+    race_by_round: dict[tuple, dict] = {}
+    for races in races_by_file:
+        for race in races:
+            round_key = race.get("season"), race.get("round")
+            merged = race_by_round.setdefault(
+                round_key,
+                {key: value for key, value in race.items() if key not in SECTIONS},
+            )
+            for section in SECTIONS:
+                if section not in race:
+                    continue
+                results = merged.setdefault(section, [])
+                seen = {result_key(result) for result in results}
+                results.extend(
+                    result for result in race[section] if result_key(result) not in seen
+                )
+
+    def order(round_key: tuple) -> tuple:
+        season, round = round_key
+        return (int(season), int(round)) if f"{season}{round}".isdigit() else (0, 0)
+
+    return [race_by_round[round_key] for round_key in sorted(race_by_round, key=order)]
+
+
+def ingest_files(
+    json_paths: list[str],
+    data_dir: str = "data",
+    processes: int | None = None,
+    check: bool = False,
+) -> BatchStats:
+    json_paths = sorted(json_paths)
+    stats = BatchStats(files=len(json_paths))
+    start = time.perf_counter()
+
+    processes = min(processes or os.cpu_count() or 1, len(json_paths))
+    if processes <= 1:
+        read_results = [read_races(json_path) for json_path in json_paths]
+    else:
+        with Pool(processes) as pool:
+            read_results = pool.map(read_races, json_paths, chunksize=1)
+    races_by_file = [races for races, _ in read_results]
+    stats.issues += [issue for _, issue in read_results if issue is not None]
+
+    paths = {
+        name: os.path.join(data_dir, name)
+        for name in (RACE_CSV, RESULT_CSV, SPRINT_CSV, QUALIFYING_CSV)
+    }
+    refs = RefTables.from_csvs(data_dir)
+    race_id, race_id_by_round = read_race_csv_state(paths[RACE_CSV])
+    result_id, _ = read_result_csv_state(paths[RESULT_CSV])
+    sprint_id, sprint_race_ids = read_result_csv_state(paths[SPRINT_CSV])
+    qualify_id, qualifying_race_ids = read_result_csv_state(paths[QUALIFYING_CSV])
+
+    rows: dict[str, list[list]] = {name: [] for name in paths}
+    for race in merge_races(races_by_file):
+        issues = validate_race(race, refs)
+        if issues:
+            stats.issues += [
+                f"{race.get('season')} round {race.get('round')}: {issue}"
+                for issue in issues
+            ]
+            continue
+
+        round_key = int(race["season"]), int(race["round"])
+        if round_key not in race_id_by_round:
+            race_id += 1
+            race_id_by_round[round_key] = race_id
+            rows[RACE_CSV].append(race_row(race, race_id, refs))
+            new_rows = result_rows(race, race_id, result_id, refs)
+            result_id += len(new_rows)
+            rows[RESULT_CSV] += new_rows
+        existing_race_id = race_id_by_round[round_key]
+
+        if existing_race_id not in sprint_race_ids:
+            new_rows = result_rows(race, existing_race_id, sprint_id, refs, "SprintResults")
+            sprint_id += len(new_rows)
+            rows[SPRINT_CSV] += new_rows
+        if existing_race_id not in qualifying_race_ids:
+            new_rows = qualifying_rows(race, existing_race_id, qualify_id, refs)
+            qualify_id += len(new_rows)
+            rows[QUALIFYING_CSV] += new_rows
+
+    stats.races = len(rows[RACE_CSV])
+    stats.results = len(rows[RESULT_CSV])
+    stats.sprint_results = len(rows[SPRINT_CSV])
+    stats.qualifying = len(rows[QUALIFYING_CSV])
+    stats.new_drivers = len(refs.new_rows["drivers"])
+    stats.new_ctors = len(refs.new_rows["ctors"])
+    stats.new_statuses = len(refs.new_rows["statuses"])
+    if not check:
+        # the refs first, so the race rows never point at ids that are not written yet
+        refs.append_new_rows(
+            os.path.join(data_dir, "drivers.csv"),
+            os.path.join(data_dir, "constructors.csv"),
+            os.path.join(data_dir, "status.csv"),
+        )
+        for name, new_rows in rows.items():
+            append_rows(paths[name], new_rows)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Ingest Ergast / Jolpica result, sprint and qualifying files "
+        "for any number of seasons into the CSVs"
+    )
+    parser.add_argument("json_paths", nargs="+")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--processes", type=int, help="decoding processes, default all CPUs")
+    parser.add_argument(
+        "--check", action="store_true", help="validate and report, write nothing"
+    )
+    args = parser.parse_args()
+
+    stats = ingest_files(args.json_paths, args.data_dir, args.processes, args.check)
+    for issue in stats.issues:
+        print(f"skipped {issue}")
+    print(
+        f"{'Checked' if args.check else 'Appended'} {stats.races} races, "
+        f"{stats.results} results, {stats.sprint_results} sprint results and "
+        f"{stats.qualifying} qualifying results ({stats.new_drivers} new drivers, "
+        f"{stats.new_ctors} new constructors, {stats.new_statuses} new statuses) "
+        f"from {stats.files} files in {stats.seconds:.3f}s"
+    )
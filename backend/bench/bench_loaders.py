@@ -0,0 +1,119 @@
+"""
+Compares server startup time and peak RSS between the pydantic model loaders,
+the columnar loaders and the SQLite group-bys (LOADER=models / columnar / sqlite).
+
+Each run imports main.py in a fresh interpreter, in an empty working directory
+that links to backend/data, so there is no graph.snapshot to load and the whole
+startup pipeline is built cold. The sqlite runs read a database built once up
+front (its build time is reported on its own), the way a server finds it on any
+start after the first. Run from backend/:
+    python -m bench.bench_loaders [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRONTEND_DATA_DIR = os.path.join(BACKEND_DIR, "../frontend/src/data")
+LOADERS = ("models", "columnar", "sqlite")
+# the stages the LOADER choice changes
+LOADER_STAGES = ("load_races", "load_results", "process_results", "populate_driver_pairings")
+
+
+def child() -> None:
+    start = time.perf_counter()
+    import main  # noqa: F401
+    from instrumentation import stage_stats
+
+    print(
+        json.dumps(
+            {
+                "seconds": time.perf_counter() - start,
+                "loader_seconds": sum(
+                    stage_stats[name].seconds for name in LOADER_STAGES if name in stage_stats
+                ),
+                # ru_maxrss is in KiB on Linux
+                "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+            }
+        )
+    )
+
+
+# a fresh backend/ working directory: the real data, the seed positions, no snapshot
+def make_workdir(parent: str) -> str:
+    directory = tempfile.mkdtemp(dir=parent)
+    backend = os.path.join(directory, "backend")
+    os.makedirs(os.path.join(directory, "frontend/src/data"))  # main.py writes ctorMap.json
+    os.makedirs(backend)
+    os.symlink(os.path.join(BACKEND_DIR, "data"), os.path.join(backend, "data"))
+    positions = os.path.join(FRONTEND_DATA_DIR, "nodePositions.json")
+    if os.path.exists(positions):
+        os.symlink(positions, os.path.join(directory, "frontend/src/data/nodePositions.json"))
+    return backend
+
+
+def run(loader: str, parent: str, sqlite_db: str) -> dict[str, float]:
+    env = {
+        **os.environ,
+        "LOADER": loader,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])
+        ),
+        "RELOAD_INTERVAL": "0",
+    }
+    env.pop("PAYLOAD_STORE", None)
+    env.pop("SQLITE_DB", None)
+    if loader == "sqlite":
+        env["SQLITE_DB"] = sqlite_db
+    output = subprocess.run(
+        [sys.executable, "-m", "bench.bench_loaders", "--child"],
+        cwd=make_workdir(parent),
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    from sqlite_store import sync_database
+
+    with tempfile.TemporaryDirectory() as parent:
+        sqlite_db = os.path.join(parent, "data.sqlite")
+        start = time.perf_counter()
+        sync_database(sqlite_db, os.path.join(BACKEND_DIR, "data"))
+        print(f"SQLite database built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        for loader in LOADERS:
+            runs = [run(loader, parent, sqlite_db) for _ in range(args.repeat)]
+            seconds = min(run["seconds"] for run in runs)
+            loader_seconds = min(run["loader_seconds"] for run in runs)
+            peak_rss = min(run["peak_rss_mib"] for run in runs)
+            print(
+                f"{loader:>8}: {seconds * 1000:8.1f} ms cold startup  "
+                f"{loader_seconds * 1000:7.1f} ms in the loader stages  "
+                f"{peak_rss:7.1f} MiB peak RSS"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Times the all-pairs distance / centrality precompute (graph_metrics.py) on the
+teammate graph of seasons since --since, for each --since, so wall time and
+memory can be read against the driver count.
+
+Run from backend/:
+    python -m bench.bench_metrics [--since Y Y ...] [--processes N]
+"""
+
+import argparse
+import os
+import resource
+import time
+
+from graph_metrics import compute_graph_metrics
+from teammate_paths import TeammateGraph
+
+
+def max_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux, workers are counted once they have exited
+    usage = sum(
+        resource.getrusage(who).ru_maxrss
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+    return usage / 1024
+
+
+def main() -> None:
+    # importing main builds the graph, keep it out of spawned workers' __mp_main__
+    from main import graph_state
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--since", type=int, nargs="+", default=[2010, 1990, 1970, 1950]
+    )
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(
+        f"{'since':>6} {'drivers':>8} {'edges':>8} {'matrix KiB':>11} "
+        f"{'1 proc s':>9} {f'{args.processes} procs s':>10} {'max RSS MiB':>12}"
+    )
+    for since in args.since:
+        teammate_graph = TeammateGraph(
+            {
+                driver_pair_id: driver_pair
+                for driver_pair_id, driver_pair in graph_state.driver_pair_by_id.items()
+                if any(
+                    max(years) >= since for years in driver_pair.years_by_ctor.values()
+                )
+            }
+        )
+
+        timings = []
+        for processes in (1, args.processes):
+            start = time.perf_counter()
+            graph_metrics = compute_graph_metrics(teammate_graph, processes)
+            timings.append(time.perf_counter() - start)
+
+        print(
+            f"{since:>6} {len(teammate_graph.driver_ids):>8} "
+            f"{len(teammate_graph.neighbors) // 2:>8} "
+            f"{len(graph_metrics.distances) / 1024:>11.1f} "
+            f"{timings[0]:>9.2f} {timings[1]:>10.2f} {max_rss_mib():>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Compares the grouped pairing engine in main.py against the original per-ctor scan.
+
+Run from backend/:
+    python -m bench.bench_pairings [--repeat N]
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from datetime import date
+
+from data_types import Result
+
+
+# the model fields the original implementation used, before races / drivers / pairs
+# moved to slotted dataclasses with sorted id arrays
+@dataclass
+class LegacyRace:
+    race_id: int
+    date: date
+    ctors: set[int] = field(default_factory=set)
+    results: set[int] = field(default_factory=set)
+
+
+@dataclass
+class LegacyDriver:
+    years_by_ctor: dict[int, set[int]] = field(default_factory=dict)
+    driver_pairs: set[tuple[int, int]] = field(default_factory=set)
+    teammates_by_year_by_ctor: dict[int, dict[int, list[int]]] = field(default_factory=dict)
+
+
+@dataclass
+class LegacyCtor:
+    driver_pair_ids: set[tuple[int, int]] = field(default_factory=set)
+
+
+@dataclass
+class LegacyDriverPair:
+    driver_id_1: int
+    driver_id_2: int
+    race_ids: set[int] = field(default_factory=set)
+    years_by_ctor: dict[int, set[int]] = field(default_factory=dict)
+
+
+# original implementation, frozen as the reference for timing and output checks
+def legacy_populate_driver_pairings(
+    race_by_id: dict[int, LegacyRace],
+    result_by_id: dict[int, Result],
+    driver_by_id: dict[int, LegacyDriver],
+    ctor_by_id: dict[int, LegacyCtor],
+) -> dict[tuple[int, int], LegacyDriverPair]:
+    driver_pair_by_id: dict[tuple[int, int], LegacyDriverPair] = dict()
+
+    for race in race_by_id.values():
+        for ctor_id in race.ctors:
+            pair: list[int, int] = list()
+            for result_id in race.results:
+                result: Result = result_by_id[result_id]
+                if result.constructor_id == ctor_id:
+                    pair.append(result.driver_id)
+
+            if len(pair) != 2:
+                driver_id = pair[0]
+                driver_by_id[driver_id].years_by_ctor.setdefault(ctor_id, set()).add(
+                    race.date.year
+                )
+                continue
+
+            driver_id1 = min(pair)
+            driver_id2 = max(pair)
+            driver_pair_id = driver_id1, driver_id2
+
+            driver_pair: LegacyDriverPair = driver_pair_by_id.setdefault(
+                driver_pair_id, LegacyDriverPair(*driver_pair_id)
+            )
+
+            driver_pair.race_ids.add(race.race_id)
+            driver_pair.years_by_ctor.setdefault(ctor_id, set()).add(race.date.year)
+
+            driver_by_id[driver_id1].driver_pairs.add(driver_pair_id)
+            driver_by_id[driver_id1].years_by_ctor.setdefault(ctor_id, set()).add(
+                race.date.year
+            )
+
+            teammates: list = (
+                driver_by_id[driver_id1]
+                .teammates_by_year_by_ctor.setdefault(ctor_id, dict())
+                .setdefault(race.date.year, list())
+            )
+            if driver_id2 not in teammates:
+                teammates.append(driver_id2)
+
+            driver_by_id[driver_id2].driver_pairs.add(driver_pair_id)
+            driver_by_id[driver_id2].years_by_ctor.setdefault(ctor_id, set()).add(
+                race.date.year
+            )
+
+            teammates: list = (
+                driver_by_id[driver_id2]
+                .teammates_by_year_by_ctor.setdefault(ctor_id, dict())
+                .setdefault(race.date.year, list())
+            )
+            if driver_id1 not in teammates:
+                teammates.append(driver_id1)
+
+            ctor_by_id[ctor_id].driver_pair_ids.add(driver_pair_id)
+
+    return driver_pair_by_id
+
+
+# the inputs in the legacy models, with races holding their result / ctor sets as
+# the original process_results left them
+def to_legacy(race_by_id, result_by_id, driver_by_id, ctor_by_id):
+    legacy_race_by_id = {
+        race_id: LegacyRace(race_id, race.date) for race_id, race in race_by_id.items()
+    }
+    for result in result_by_id.values():
+        race = legacy_race_by_id[result.race_id]
+        race.results.add(result.result_id)
+        race.ctors.add(result.constructor_id)
+    return (
+        legacy_race_by_id,
+        result_by_id,
+        {driver_id: LegacyDriver() for driver_id in driver_by_id},
+        {ctor_id: LegacyCtor() for ctor_id in ctor_by_id},
+    )
+
+
+def load(data_dir: str):
+    # importing main builds the graph, so not at module import
+    from main import load_ctors, load_drivers, load_races, load_results, process_results
+
+    driver_by_id, _ = load_drivers(f"{data_dir}/drivers.csv")
+    ctor_by_id, _ = load_ctors(f"{data_dir}/constructors.csv")
+    result_by_id = load_results(f"{data_dir}/new_results.csv")
+    race_by_id = load_races(f"{data_dir}/new_races.csv")
+    process_results(race_by_id, result_by_id, driver_by_id)
+    return race_by_id, result_by_id, driver_by_id, ctor_by_id
+
+
+def time_pairing(fn, data_dir: str, repeat: int, legacy: bool = False) -> tuple[float, dict]:
+    best = float("inf")
+    driver_pair_by_id = {}
+    for _ in range(repeat):
+        data = load(data_dir)  # pairing mutates drivers / ctors, so start fresh
+        if legacy:
+            data = to_legacy(*data)
+        start = time.perf_counter()
+        driver_pair_by_id = fn(*data)
+        best = min(best, time.perf_counter() - start)
+    return best, driver_pair_by_id
+
+
+def main() -> None:
+    from main import populate_driver_pairings
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy_time, legacy_pairs = time_pairing(
+        legacy_populate_driver_pairings, args.data_dir, args.repeat, legacy=True
+    )
+    grouped_time, grouped_pairs = time_pairing(
+        populate_driver_pairings, args.data_dir, args.repeat
+    )
+
+    # every legacy pairing must still be produced; 3+ car teams only add to it
+    for driver_pair_id, legacy_pair in legacy_pairs.items():
+        pair = grouped_pairs[driver_pair_id]
+        assert set(legacy_pair.race_ids) <= set(pair.race_ids), driver_pair_id
+        for ctor_id, years in legacy_pair.years_by_ctor.items():
+            assert set(years) <= set(pair.years_by_ctor[ctor_id]), driver_pair_id
+
+    print(f"legacy:  {legacy_time * 1000:8.2f} ms  ({len(legacy_pairs)} pairs)")
+    print(f"grouped: {grouped_time * 1000:8.2f} ms  ({len(grouped_pairs)} pairs)")
+    print(f"speedup: {legacy_time / grouped_time:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Compares the size and client parse time of the /graph payload versions
+(1: Cytoscape elements, 2: compact), raw and pre-compressed.
+
+Run from backend/:
+    python -m bench.bench_payload [--min-year Y] [--max-year Y]
+"""
+
+import argparse
+import json
+import time
+
+from graph_cache import compress_body
+
+
+def parse_time(body: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        json.loads(body)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    # importing main builds the graph, so not at module import
+    from main import graph_state
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--min-year", type=int, default=0)
+    parser.add_argument("--max-year", type=int, default=9999)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'version':>7} {'raw KiB':>10} {'gzip KiB':>10} {'br KiB':>10} {'parse ms':>10}")
+    for version, cache in graph_state.graph_caches.items():
+        body = bytes(cache.get(args.min_year, args.max_year).body)
+        encoded = compress_body(body)
+        br = f"{len(encoded['br']) / 1024:10.1f}" if "br" in encoded else f"{'-':>10}"
+        print(
+            f"{version:>7} {len(body) / 1024:10.1f} {len(encoded['gzip']) / 1024:10.1f} "
+            f"{br} {parse_time(body, args.repeat) * 1000:10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
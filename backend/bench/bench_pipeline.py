@@ -0,0 +1,204 @@
+"""
+Times each stage of the main.py pipeline and the /graph payload builds on
+synthetic data sets (bench/synthetic.py) at several multiples of the real
+history, and writes the results as JSON so runs can be compared between commits.
+
+Each scale runs in a fresh interpreter that imports main.py with a generated
+data/ directory as its working directory. Stage times come from the
+instrumentation.stage timers; with --trace they also carry tracemalloc peaks.
+A scale that runs past --timeout reports the stages it finished, the next one
+is where the time went. Run from backend/:
+    python -m bench.bench_pipeline [--scale 1 10 100] [--output FILE]
+    python -m bench.bench_pipeline --compare BASELINE.json [--scale ...]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.synthetic import generate
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def max_rss_mib() -> float:
+    # ru_maxrss is in KiB on Linux, pool workers are counted once they have exited
+    usage = sum(
+        resource.getrusage(who).ru_maxrss
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+    return usage / 1024
+
+
+def stage_report() -> dict[str, dict]:
+    from instrumentation import stage_stats
+
+    return {
+        name: {"seconds": stats.seconds, "runs": stats.count, "peakBytes": stats.peak_bytes}
+        for name, stats in sorted(stage_stats.items())
+    }
+
+
+# cold builds of every /graph payload version for the full range, bypassing the caches
+def graph_report(graph_state) -> dict[str, dict]:
+    report = {}
+    for version, cache in graph_state.graph_caches.items():
+        start = time.perf_counter()
+        payload = cache.build(0, 9999)
+        built = time.perf_counter()
+        body = json.dumps(payload).encode("utf-8")
+        report[str(version)] = {
+            "buildSeconds": built - start,
+            "serializeSeconds": time.perf_counter() - built,
+            "bytes": len(body),
+        }
+    return report
+
+
+def child() -> None:
+    start = time.perf_counter()
+
+    def timed_out(signum, frame):
+        print(json.dumps({"timedOut": True, "stages": stage_report()}), flush=True)
+        os.killpg(0, signal.SIGKILL)  # along with any metrics pool workers
+
+    signal.signal(signal.SIGTERM, timed_out)
+    from main import graph_state
+
+    startup = time.perf_counter() - start
+    graph = graph_report(graph_state)
+    print(
+        json.dumps(
+            {
+                "startupSeconds": startup,
+                "peakRssMib": max_rss_mib(),
+                "pairs": len(graph_state.driver_pair_by_id),
+                "stages": stage_report(),
+                "graph": graph,
+            }
+        ),
+        flush=True,
+    )
+
+
+def run(scale: int, seed: int, timeout: float, trace: bool, workdir: str) -> dict:
+    directory = os.path.join(workdir, f"scale-{scale}", "backend")
+    start = time.perf_counter()
+    counts = generate(directory, scale, seed)
+    generate_seconds = time.perf_counter() - start
+    # main.py writes ctorMap.json next to the frontend sources
+    os.makedirs(os.path.join(directory, "../frontend/src/data"), exist_ok=True)
+
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")])
+        ),
+        "RELOAD_INTERVAL": "0",
+    }
+    env.pop("PAYLOAD_STORE", None)
+    if trace:
+        env["PYTHONTRACEMALLOC"] = "1"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "bench.bench_pipeline", "--child"],
+        cwd=directory,
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    try:
+        output, _ = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.terminate()
+        output, _ = process.communicate()
+
+    report = {"scale": scale, "rows": counts, "generateSeconds": generate_seconds}
+    lines = output.splitlines()
+    if lines and lines[-1].startswith("{"):
+        report.update(json.loads(lines[-1]))
+    else:  # e.g. killed for running out of memory
+        report["error"] = f"exit status {process.returncode}"
+    return report
+
+
+def print_summary(reports: list[dict], baseline: dict | None) -> None:
+    baseline_by_scale = {
+        report["scale"]: report for report in (baseline or {}).get("scales", [])
+    }
+    for report in reports:
+        status = report.get("error") or ("timed out" if report.get("timedOut") else "")
+        print(
+            f"scale {report['scale']}: {report['rows']['results']} results, "
+            f"{report['rows']['drivers']} drivers {status}",
+            file=sys.stderr,
+        )
+        base_stages = baseline_by_scale.get(report["scale"], {}).get("stages", {})
+        for name, stats in report.get("stages", {}).items():
+            line = f"  {name:>26} {stats['seconds']:10.3f} s"
+            if name in base_stages and base_stages[name]["seconds"] > 0:
+                line += f"  {stats['seconds'] / base_stages[name]['seconds']:6.2f}x"
+            print(line, file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds per scale")
+    parser.add_argument("--trace", action="store_true", help="record tracemalloc peaks")
+    parser.add_argument("--output", help="JSON results file, stdout if not given")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    parser.add_argument("--workdir", help="keep the generated data sets here")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        reports = [
+            run(scale, args.seed, args.timeout, args.trace, args.workdir or workdir)
+            for scale in args.scale
+        ]
+
+    commit = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    results = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "loader": os.environ.get("LOADER", "models"),
+        "seed": args.seed,
+        "traced": args.trace,
+        "scales": reports,
+    }
+    print_summary(reports, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
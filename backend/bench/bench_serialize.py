@@ -0,0 +1,55 @@
+"""
+Compares encode time and throughput of the JSON backends (serialization.py)
+on the /graph payloads, and the /graph request time with a cold payload cache.
+
+Run from backend/:
+    python -m bench.bench_serialize [--min-year Y] [--max-year Y] [--repeat N]
+"""
+
+import argparse
+import time
+
+from serialization import dumps_json, dumps_orjson, orjson
+
+BACKENDS = {"json": dumps_json, "orjson": dumps_orjson}
+
+
+def encode_time(dumps, payload, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = dumps(payload)
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def main() -> None:
+    # importing main builds the graph, so not at module import
+    from main import graph_state
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--min-year", type=int, default=0)
+    parser.add_argument("--max-year", type=int, default=9999)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    backends = BACKENDS if orjson else {"json": dumps_json}
+    print(
+        f"{'version':>8} {'backend':>7} {'KiB':>8} {'build ms':>9} "
+        f"{'encode ms':>10} {'MiB/s':>8} {'cold ms':>8}"
+    )
+    for version, cache in graph_state.graph_caches.items():
+        start = time.perf_counter()
+        payload = cache.build(args.min_year, args.max_year)
+        build = time.perf_counter() - start
+        for name, dumps in backends.items():
+            seconds, size = encode_time(dumps, payload, args.repeat)
+            print(
+                f"{version:>8} {name:>7} {size / 1024:8.1f} {build * 1000:9.2f} "
+                f"{seconds * 1000:10.2f} {size / seconds / 2**20:8.1f} "
+                f"{(build + seconds) * 1000:8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
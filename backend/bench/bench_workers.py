@@ -0,0 +1,127 @@
+"""
+Measures the memory of N concurrent workers serving the same /graph year ranges:
+  - spawn:   each worker imports main.py (uvicorn --workers N)
+  - store:   same, with a shared PAYLOAD_STORE
+  - preload: main.py is imported once and the workers are forked from it
+             (gunicorn --preload), with a shared PAYLOAD_STORE
+
+PSS splits shared pages (copy-on-write pages, the snapshot / payload files in
+the page cache) between the processes using them, so the PSS total is what N
+workers cost. Run from backend/ (Linux only, reads /proc/<pid>/smaps_rollup):
+    python -m bench.bench_workers [--workers 1 2 4] [--ranges N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+MODES = ("spawn", "store", "preload")
+
+
+def serve(ranges: int) -> None:
+    from main import graph_state
+
+    for start in range(1950, 1950 + ranges * 5, 5):
+        for cache in graph_state.graph_caches.values():
+            cache.get(start, 2025)
+
+
+def child(ranges: int) -> None:
+    serve(ranges)
+    print(os.getpid(), flush=True)
+    sys.stdin.readline()  # keep running until the parent has measured
+
+
+def preload(workers: int, ranges: int) -> None:
+    import main  # noqa: F401
+
+    ready_read, ready_write = os.pipe()
+    done_read, done_write = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            serve(ranges)
+            os.write(ready_write, b".")
+            os.read(done_read, 1)
+            os._exit(0)
+        pids.append(pid)
+        os.read(ready_read, 1)  # one after another, as in the other modes
+    print(" ".join(map(str, pids)), flush=True)
+    sys.stdin.readline()
+    os.write(done_write, b"." * workers)
+    for pid in pids:
+        os.waitpid(pid, 0)
+
+
+def memory_kib(pid: int) -> dict[str, int]:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f.read().splitlines()[1:])
+    return {name: int(fields[name].split()[0]) for name in ("Rss", "Pss", "Pss_Anon")}
+
+
+def run(mode: str, workers: int, ranges: int, store: str) -> dict[str, int]:
+    env = {key: value for key, value in os.environ.items() if key != "PAYLOAD_STORE"}
+    if mode != "spawn":
+        env["PAYLOAD_STORE"] = store
+
+    def start(*args: str) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-m", "bench.bench_workers", *args],
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+
+    # started one after another, so later workers find earlier payloads in the store
+    if mode == "preload":
+        processes = [start("--preload", str(workers), str(ranges))]
+        # the preloading process is counted too, it holds the pages the workers share
+        pids = [processes[0].pid, *map(int, processes[0].stdout.readline().split())]
+    else:
+        processes, pids = [], []
+        for _ in range(workers):
+            processes.append(start("--child", str(ranges)))
+            pids.append(int(processes[-1].stdout.readline()))
+
+    totals = {"Rss": 0, "Pss": 0, "Pss_Anon": 0}
+    for pid in pids:
+        for name, value in memory_kib(pid).items():
+            totals[name] += value
+    for process in processes:
+        process.communicate("\n")
+    return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--ranges", type=int, default=8)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--preload", type=int, nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child)
+        return
+    if args.preload is not None:
+        preload(*args.preload)
+        return
+
+    print(f"{'workers':>7} {'mode':>8} {'RSS MiB':>9} {'PSS MiB':>9} {'anon PSS MiB':>13}")
+    for workers in args.workers:
+        for mode in MODES:
+            with tempfile.TemporaryDirectory() as store:
+                totals = run(mode, workers, args.ranges, store)
+            print(
+                f"{workers:>7} {mode:>8} "
+                f"{totals['Rss'] / 1024:>9.1f} {totals['Pss'] / 1024:>9.1f} "
+                f"{totals['Pss_Anon'] / 1024:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Generates a synthetic source data set in the schema of backend/data, for
+benchmarking the pipeline at a multiple of the real history.
+
+A scale of N runs N parallel series over 1950-2025, each about the size of the
+real one: ~10-12 teams a season (some fielding 3 or 4 cars), a driver market
+with retirements, rookies and team changes, mid-season stand-ins, and drivers
+promoted between series so the teammate graph stays connected. The same seed
+and scale always give the same files.
+
+Run from backend/:
+    python -m bench.synthetic DIRECTORY [--scale N] [--seed S]
+"""
+
+import argparse
+import csv
+import os
+import random
+import shutil
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from ingest import (
+    CTOR_HEADER,
+    DRIVER_HEADER,
+    NULL,
+    QUALIFYING_HEADER,
+    RACE_HEADER,
+    RESULT_HEADER,
+)
+
+FIRST_YEAR = 1950
+LAST_YEAR = 2025
+FIRST_QUALIFYING_YEAR = 1994  # qualifying.csv only covers recent seasons
+
+POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+FINISHED_STATUS_ID = 1
+LAPPED_STATUS_IDS = [11, 12, 13]
+DNF_STATUS_IDS = [3, 4, 5, 6, 7, 8, 9, 10, 20, 22, 23]
+
+NULL_SESSIONS = [NULL] * 10  # fp1_date ... sprint_time
+
+NATIONALITIES = ["British", "German", "Italian", "French", "Brazilian", "Finnish",
+                 "Spanish", "American", "Australian", "Japanese", "Dutch", "Austrian"]
+
+
+@dataclass
+class Series:
+    index: int
+    ctor_ids: list[int] = field(default_factory=list)  # teams currently entered
+    seats: dict[int, list[int]] = field(default_factory=dict)  # ctor_id -> driver_ids
+
+
+# rows are written as they are generated, only the driver market is kept in memory
+class Generator:
+    def __init__(self, scale: int, seed: int, data_dir: str, files: ExitStack):
+        self.scale = scale
+        self.random = random.Random(seed)
+        self.series = [Series(index) for index in range(scale)]
+        self.retired: set[int] = set()
+        self.counts = dict.fromkeys(
+            ("drivers", "ctors", "races", "results", "qualifying"), 0
+        )
+
+        def writer(name: str, header: list[str]):
+            f = files.enter_context(
+                open(f"{data_dir}/{name}", "w", newline="", encoding="utf-8")
+            )
+            writer = csv.writer(f)
+            writer.writerow(header)
+            return writer.writerow
+
+        self.write_driver = writer("drivers.csv", DRIVER_HEADER)
+        self.write_ctor = writer("constructors.csv", CTOR_HEADER)
+        self.write_race = writer("new_races.csv", RACE_HEADER)
+        self.write_result = writer("new_results.csv", RESULT_HEADER)
+        self.write_qualifying = writer("qualifying.csv", QUALIFYING_HEADER)
+
+    def next_id(self, name: str) -> int:
+        self.counts[name] += 1
+        return self.counts[name]
+
+    def new_driver(self, series: Series, year: int) -> int:
+        driver_id = self.next_id("drivers")
+        surname = f"Driver{driver_id}"
+        self.write_driver([
+            driver_id, f"s{series.index}_driver{driver_id}", NULL, NULL,
+            f"Series{series.index}", surname,
+            f"{year - self.random.randint(19, 30)}-{self.random.randint(1, 12):02}-"
+            f"{self.random.randint(1, 28):02}",
+            self.random.choice(NATIONALITIES), f"http://example.com/{surname}",
+        ])
+        return driver_id
+
+    def new_ctor(self, series: Series) -> int:
+        ctor_id = self.next_id("ctors")
+        self.write_ctor([
+            ctor_id, f"s{series.index}_team{ctor_id}", f"Team {ctor_id}",
+            self.random.choice(NATIONALITIES), f"http://example.com/team{ctor_id}",
+            f"#{self.random.randrange(0x1000000):06X}",
+            f"#{self.random.randrange(0x1000000):06X}",
+        ])
+        return ctor_id
+
+    # a rookie, or now and then a driver promoted from another series
+    def fill_seat(self, series: Series, year: int, taken: set[int]) -> int:
+        other = self.series[self.random.randrange(self.scale)]
+        if other is not series and self.random.random() < 0.05:
+            candidates = [
+                driver_id
+                for driver_ids in other.seats.values()
+                for driver_id in driver_ids
+                if driver_id not in taken and driver_id not in self.retired
+            ]
+            if candidates:
+                return self.random.choice(candidates)
+        return self.new_driver(series, year)
+
+    def start_season(self, series: Series, year: int) -> None:
+        # teams entering and leaving
+        team_count = self.random.randint(10, 12)
+        series.ctor_ids = [
+            ctor_id for ctor_id in series.ctor_ids if self.random.random() > 0.08
+        ]
+        while len(series.ctor_ids) < team_count:
+            series.ctor_ids.append(self.new_ctor(series))
+
+        # everyone still racing goes back into the market, some change teams
+        market = [
+            driver_id
+            for driver_ids in series.seats.values()
+            for driver_id in driver_ids
+            if driver_id not in self.retired
+        ]
+        for driver_id in market:
+            if self.random.random() < 0.18:
+                self.retired.add(driver_id)
+        stay = {driver_id for driver_id in market if driver_id not in self.retired}
+
+        seats: dict[int, list[int]] = {}
+        cars_by_ctor: dict[int, int] = {}
+        taken: set[int] = set()
+        for ctor_id in series.ctor_ids:
+            # 3 and 4 car entries, mostly in the early seasons
+            cars = 2
+            if self.random.random() < (0.3 if year < 1970 else 0.05):
+                cars = self.random.choice((3, 3, 4))
+            cars_by_ctor[ctor_id] = cars
+            seats[ctor_id] = [
+                driver_id
+                for driver_id in series.seats.get(ctor_id, [])
+                if driver_id in stay and self.random.random() > 0.3
+            ][:cars]
+            taken.update(seats[ctor_id])
+        # drivers left without a seat sit the season out, and are not seen again
+        movers = sorted(stay - taken)
+        self.random.shuffle(movers)
+        for ctor_id in series.ctor_ids:
+            while len(seats[ctor_id]) < cars_by_ctor[ctor_id]:
+                if movers:
+                    driver_id = movers.pop()
+                else:
+                    driver_id = self.fill_seat(series, year, taken)
+                seats[ctor_id].append(driver_id)
+                taken.add(driver_id)
+        series.seats = seats
+
+    def race(self, series: Series, year: int, round: int, race_count: int) -> None:
+        race_id = self.next_id("races")
+        month = 3 + (round - 1) * 9 // race_count
+        day = 1 + (round * 7) % 28
+        self.write_race([
+            race_id, year, round, series.index * 40 + round,
+            f"Series {series.index} Grand Prix {round}", f"{year}-{month:02}-{day:02}",
+            NULL, f"http://example.com/{year}/{series.index}/{round}", *NULL_SESSIONS,
+        ])
+
+        entries = []
+        for ctor_id, driver_ids in series.seats.items():
+            for driver_id in driver_ids:
+                if self.random.random() < 0.02:  # a stand-in for this race
+                    driver_id = self.new_driver(series, year)
+                entries.append((driver_id, ctor_id))
+        self.random.shuffle(entries)  # the finishing order
+
+        laps = 60
+        base_ms = 5_400_000 + self.random.randrange(600_000)
+        for grid, (driver_id, ctor_id) in enumerate(entries, 1):
+            self.qualify(race_id, year, driver_id, ctor_id, grid)
+        finished = [self.random.random() > 0.2 for _ in entries]
+        finishers = [entry for entry, done in zip(entries, finished) if done]
+        retirements = [entry for entry, done in zip(entries, finished) if not done]
+        for position_order, (driver_id, ctor_id) in enumerate(
+            finishers + retirements, 1
+        ):
+            result_id = self.next_id("results")
+            lap = f"1:{self.random.randint(20, 40)}.{self.random.randrange(1000):03}"
+            if position_order <= len(finishers):
+                behind = min((position_order - 1) // 6, 3)
+                status_id = LAPPED_STATUS_IDS[behind - 1] if behind else FINISHED_STATUS_ID
+                millis = base_ms + position_order * 5_000 if not behind else NULL
+                self.write_result([
+                    result_id, race_id, driver_id, ctor_id, NULL, position_order,
+                    position_order, position_order, position_order,
+                    POINTS[position_order - 1] if position_order <= len(POINTS) else 0,
+                    laps - behind, NULL, millis, NULL, NULL, lap, NULL, status_id,
+                ])
+            else:
+                self.write_result([
+                    result_id, race_id, driver_id, ctor_id, NULL, position_order,
+                    NULL, "R", position_order, 0, self.random.randrange(laps), NULL,
+                    NULL, NULL, NULL, NULL, NULL, self.random.choice(DNF_STATUS_IDS),
+                ])
+
+    def qualify(
+        self, race_id: int, year: int, driver_id: int, ctor_id: int, position: int
+    ) -> None:
+        if year < FIRST_QUALIFYING_YEAR:
+            return
+        self.write_qualifying([
+            self.next_id("qualifying"), race_id, driver_id, ctor_id, NULL, position,
+            f"1:{self.random.randint(20, 40)}.{self.random.randrange(1000):03}",
+            NULL, NULL,
+        ])
+
+    def run(self) -> None:
+        # season by season across every series, so ids read in date order
+        for year in range(FIRST_YEAR, LAST_YEAR + 1):
+            race_count = 8 + (year - FIRST_YEAR) * 16 // (LAST_YEAR - FIRST_YEAR)
+            for series in self.series:
+                self.start_season(series, year)
+                for round in range(1, race_count + 1):
+                    self.race(series, year, round, race_count)
+
+
+# writes DIRECTORY/data/*.csv under the names main.py reads; returns the row counts
+def generate(directory: str, scale: int = 1, seed: int = 0) -> dict[str, int]:
+    data_dir = os.path.join(directory, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    with ExitStack() as files:
+        generator = Generator(scale, seed, data_dir, files)
+        generator.run()
+    # the status codes and ctor lineages are shared with the real data
+    for name in ("status.csv", "ctor_lineage.json"):
+        shutil.copy(os.path.join(os.path.dirname(__file__), "../data", name), data_dir)
+    return generator.counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("directory")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(generate(args.directory, args.scale, args.seed))
+
+
+if __name__ == "__main__":
+    main()
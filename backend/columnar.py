@@ -0,0 +1,239 @@
+# Columnar loaders for results / races CSVs
+#   - rows are parsed straight into typed arrays (one per column), not a pydantic model per row
+#   - \N is stored as NULL in integer columns
+#   - races are only turned into Race dataclasses for the state (see RaceColumns.to_models)
+#   - races per driver are grouped with numpy when it is installed, else with a loop over
+#     the rows
+
+import csv
+from array import array
+from dataclasses import dataclass, field
+from datetime import date
+from data_types import Driver, DriverPair, Race, Result, add_sorted
+from pairings import pair_drivers
+
+try:
+    import numpy as np
+except ImportError:  # optional, process_result_columns loops over the rows without it
+    np = None
+
+NULL = -1  # sentinel for \N in integer columns
+
+
+def to_int(value: str) -> int:
+    return NULL if value == r"\N" else int(value)
+
+
+# lap time string (e.g. "1:27.452") -> milliseconds
+def lap_time_ms(value: str | None) -> int:
+    if value is None or value == r"\N" or not value:
+        return NULL
+    minutes, _, seconds = value.rpartition(":")
+    return round((int(minutes or 0) * 60 + float(seconds)) * 1000)
+
+
+@dataclass
+class ResultColumns:
+    result_id: array = field(default_factory=lambda: array("i"))
+    race_id: array = field(default_factory=lambda: array("i"))
+    driver_id: array = field(default_factory=lambda: array("i"))
+    constructor_id: array = field(default_factory=lambda: array("i"))
+    position: array = field(default_factory=lambda: array("i"))  # NULL if not classified
+    grid: array = field(default_factory=lambda: array("i"))
+    position_order: array = field(default_factory=lambda: array("i"))
+    points: array = field(default_factory=lambda: array("d"))
+    laps: array = field(default_factory=lambda: array("i"))
+    milliseconds: array = field(default_factory=lambda: array("i"))
+    fastest_lap_ms: array = field(default_factory=lambda: array("i"))
+    status_id: array = field(default_factory=lambda: array("i"))
+
+    def __len__(self) -> int:
+        return len(self.result_id)
+
+    def append(self, result: Result) -> None:
+        self.result_id.append(result.result_id)
+        self.race_id.append(result.race_id)
+        self.driver_id.append(result.driver_id)
+        self.constructor_id.append(result.constructor_id)
+        for name in (
+            "position",
+            "grid",
+            "position_order",
+            "laps",
+            "milliseconds",
+            "status_id",
+        ):
+            value = getattr(result, name)
+            getattr(self, name).append(NULL if value is None else value)
+        self.points.append(result.points)
+        self.fastest_lap_ms.append(lap_time_ms(result.fastest_lap_time))
+
+    # results loaded as models (LOADER=models, ingestion) as columns
+    @classmethod
+    def from_models(cls, result_by_id: dict[int, Result]) -> "ResultColumns":
+        columns = cls()
+        for result in result_by_id.values():
+            columns.append(result)
+        return columns
+
+
+@dataclass
+class QualifyingColumns:
+    race_id: array = field(default_factory=lambda: array("i"))
+    driver_id: array = field(default_factory=lambda: array("i"))
+    constructor_id: array = field(default_factory=lambda: array("i"))
+    position: array = field(default_factory=lambda: array("i"))
+
+    def __len__(self) -> int:
+        return len(self.race_id)
+
+
+@dataclass
+class RaceColumns:
+    race_id: array = field(default_factory=lambda: array("i"))
+    year: array = field(default_factory=lambda: array("i"))
+    date: array = field(default_factory=lambda: array("i"))  # proleptic ordinal
+    name: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.race_id)
+
+    def year_by_race_id(self) -> dict[int, int]:
+        return dict(zip(self.race_id, self.year))
+
+    # rows were already parsed on load
+    def to_models(self) -> dict[int, Race]:
+        return {
+            race_id: Race(race_id, year, name, date.fromordinal(ordinal))
+            for race_id, year, name, ordinal in zip(
+                self.race_id, self.year, self.name, self.date
+            )
+        }
+
+
+def load_result_columns(file_path: str) -> ResultColumns:
+    columns = ResultColumns()
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        result_id, race_id, driver_id, constructor_id, position = (
+            header.index(name)
+            for name in ("resultId", "raceId", "driverId", "constructorId", "position")
+        )
+        grid, position_order, points, laps, milliseconds, fastest_lap_time, status_id = (
+            header.index(name)
+            for name in (
+                "grid",
+                "positionOrder",
+                "points",
+                "laps",
+                "milliseconds",
+                "fastestLapTime",
+                "statusId",
+            )
+        )
+        for row in reader:
+            columns.result_id.append(int(row[result_id]))
+            columns.race_id.append(int(row[race_id]))
+            columns.driver_id.append(int(row[driver_id]))
+            columns.constructor_id.append(int(row[constructor_id]))
+            columns.position.append(to_int(row[position]))
+            columns.grid.append(to_int(row[grid]))
+            columns.position_order.append(to_int(row[position_order]))
+            columns.points.append(float(row[points]))
+            columns.laps.append(to_int(row[laps]))
+            columns.milliseconds.append(to_int(row[milliseconds]))
+            columns.fastest_lap_ms.append(lap_time_ms(row[fastest_lap_time]))
+            columns.status_id.append(to_int(row[status_id]))
+    return columns
+
+
+def load_qualifying_columns(file_path: str) -> QualifyingColumns:
+    columns = QualifyingColumns()
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        race_id, driver_id, constructor_id, position = (
+            header.index(name)
+            for name in ("raceId", "driverId", "constructorId", "position")
+        )
+        for row in reader:
+            columns.race_id.append(int(row[race_id]))
+            columns.driver_id.append(int(row[driver_id]))
+            columns.constructor_id.append(int(row[constructor_id]))
+            columns.position.append(to_int(row[position]))
+    return columns
+
+
+def load_race_columns(file_path: str) -> RaceColumns:
+    columns = RaceColumns()
+    with open(file_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        race_id, year, name, race_date = (
+            header.index(column) for column in ("raceId", "year", "name", "date")
+        )
+        for row in reader:
+            columns.race_id.append(int(row[race_id]))
+            columns.year.append(int(row[year]))
+            columns.date.append(date.fromisoformat(row[race_date]).toordinal())
+            columns.name.append(row[name])
+    return columns
+
+
+def as_numpy(column: array) -> "np.ndarray":
+    return np.frombuffer(column, dtype=np.intc).astype(np.int64)
+
+
+# columnar equivalent of process_results, only the driver side is kept
+def process_result_columns(results: ResultColumns, driver_by_id: dict[int, Driver]) -> None:
+    if np is None:
+        for race_id, driver_id in zip(results.race_id, results.driver_id):
+            add_sorted(driver_by_id[driver_id].race_ids, race_id)
+        return
+
+    # distinct (driver, race) keys, sorted by driver then race
+    keys = np.unique((as_numpy(results.driver_id) << 32) | as_numpy(results.race_id))
+    driver_ids = keys >> 32
+    race_ids = array("i", (keys & 0xFFFFFFFF).astype(np.intc).tobytes())
+    starts = np.flatnonzero(np.r_[True, driver_ids[1:] != driver_ids[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    for driver_id, start, end in zip(
+        driver_ids[starts].tolist(), starts.tolist(), ends.tolist()
+    ):
+        driver = driver_by_id[driver_id]
+        if driver.race_ids:
+            for race_id in race_ids[start:end]:
+                add_sorted(driver.race_ids, race_id)
+        else:
+            driver.race_ids = race_ids[start:end]
+
+
+# race_id -> ctor_id -> distinct driver ids, races, ctors and drivers in order of first result
+#   - stays a loop: building these nested dicts (what pair_drivers walks) is the whole cost,
+#     a numpy dedup / sort in front of it measured slower, even on 10x the results
+def group_drivers_by_race_ctor(
+    results: ResultColumns,
+) -> dict[int, dict[int, list[int]]]:
+    drivers_by_ctor_by_race: dict[int, dict[int, list[int]]] = dict()
+    for race_id, ctor_id, driver_id in zip(
+        results.race_id, results.constructor_id, results.driver_id
+    ):
+        drivers: list[int] = drivers_by_ctor_by_race.setdefault(
+            race_id, dict()
+        ).setdefault(ctor_id, list())
+        if driver_id not in drivers:
+            drivers.append(driver_id)
+    return drivers_by_ctor_by_race
+
+
+def populate_driver_pairings_columnar(
+    races: RaceColumns,
+    results: ResultColumns,
+    driver_by_id: dict[int, Driver],
+) -> dict[tuple[int, int], DriverPair]:
+    return pair_drivers(
+        group_drivers_by_race_ctor(results),
+        races.year_by_race_id(),
+        driver_by_id,
+    )
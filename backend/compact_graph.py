@@ -0,0 +1,140 @@
+from data_types import Driver, Ctor, DriverPair
+from year_index import YearIndex
+from graph_metrics import GraphMetrics
+
+# Compact (version 2) /graph payload
+#   - ctor names are sent once in a shared table, nodes / edges only carry ctor ids
+#   - nodes and edges are positional arrays, described by nodeFields / edgeFields
+#   - year lists are flattened inclusive ranges, e.g. [2007, 2012, 2014, 2014]
+#   - teammatesByYearByCtor is not sent, it is the edges' yearsByCtor seen from each end
+#   - eccentricity / closeness / betweenness are null when no metrics were computed,
+#     x / y when there is no layout (see graph_layout.py)
+#   - headToHead is a list of per ctor-year rows, described by headToHeadFields
+#     (1 = source, 2 = target)
+COMPACT_VERSION = 2
+NODE_FIELDS = [
+    "id",
+    "codename",
+    "forename",
+    "surname",
+    "raceCount",
+    "yearsByCtor",
+    "eccentricity",
+    "closeness",
+    "betweenness",
+    "x",
+    "y",
+]
+EDGE_FIELDS = ["source", "target", "yearsByCtor", "headToHead"]
+HEAD_TO_HEAD_FIELDS = [
+    "ctorId",
+    "year",
+    "races",
+    "raceAhead1",
+    "raceAhead2",
+    "qualifyingAhead1",
+    "qualifyingAhead2",
+    "points1",
+    "points2",
+    "dnfs1",
+    "dnfs2",
+]
+
+
+# sorted years -> flat [start, end, start, end, ...] list of inclusive ranges
+def year_ranges(years: list[int]) -> list[int]:
+    ranges: list[int] = []
+    for year in years:
+        if ranges and ranges[-1] == year - 1:
+            ranges[-1] = year
+        else:
+            ranges += [year, year]
+    return ranges
+
+
+def compact_years_by_ctor(
+    years_by_ctor: dict[int, set[int]], key
+) -> list[tuple[int, list[int]]]:
+    entries = [(ctor_id, sorted(years)) for ctor_id, years in years_by_ctor.items()]
+    entries.sort(key=lambda entry: key(entry[1]))
+    return [(ctor_id, year_ranges(years)) for ctor_id, years in entries]
+
+
+def compact_head_to_head(driver_pair: DriverPair) -> list[list]:
+    rows = [
+        [
+            ctor_id,
+            year,
+            head_to_head.races,
+            *head_to_head.race_ahead,
+            *head_to_head.qualifying_ahead,
+            *(round(points, 2) for points in head_to_head.points),
+            *head_to_head.dnfs,
+        ]
+        for ctor_id, head_to_head_by_year in driver_pair.head_to_head_by_year_by_ctor.items()
+        for year, head_to_head in head_to_head_by_year.items()
+    ]
+    rows.sort(key=lambda row: (row[1], row[0]))
+    return rows
+
+
+def to_compact_data(
+    driver_by_id: dict[int, Driver],
+    ctor_by_id: dict[int, Ctor],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair],
+    year_index: YearIndex,
+    min_year: int = 0,
+    max_year: int = 9999,
+    graph_metrics: GraphMetrics | None = None,
+    positions: dict[int, tuple[float, float]] | None = None,
+) -> dict:
+    driver_ids, driver_pair_ids = year_index.graph_ids(driver_by_id, min_year, max_year)
+    ctor_ids: set[int] = set()
+
+    nodes = []
+    for driver_id in driver_ids:
+        driver: Driver = driver_by_id[driver_id]
+        ctor_ids.update(driver.years_by_ctor)
+        metrics = graph_metrics.node_metrics(driver_id) if graph_metrics else {}
+        x, y = positions[driver_id] if positions else (None, None)
+        nodes.append(
+            [
+                driver_id,
+                driver.codename,
+                driver.forename,
+                driver.surname,
+                len(driver.race_ids),
+                # same order as version 1, first ctor first
+                compact_years_by_ctor(driver.years_by_ctor, key=min),
+                metrics.get("eccentricity"),
+                metrics.get("closeness"),
+                metrics.get("betweenness"),
+                round(x, 1) if x is not None else None,
+                round(y, 1) if y is not None else None,
+            ]
+        )
+
+    edges = [
+        [
+            driver_pair.driver_id_1,
+            driver_pair.driver_id_2,
+            compact_years_by_ctor(driver_pair.years_by_ctor, key=max),
+            compact_head_to_head(driver_pair),
+        ]
+        for driver_pair in (
+            driver_pair_by_id[driver_pair_id] for driver_pair_id in driver_pair_ids
+        )
+    ]
+
+    # newest to oldest, same as version 1 (see to_cytoscape_data)
+    nodes.sort(key=lambda node: node[5][0][1][0], reverse=True)
+
+    return {
+        "version": COMPACT_VERSION,
+        "ctors": {ctor_id: ctor_by_id[ctor_id].name for ctor_id in sorted(ctor_ids)},
+        "nodeFields": NODE_FIELDS,
+        "nodes": nodes,
+        "edgeFields": EDGE_FIELDS,
+        "headToHeadFields": HEAD_TO_HEAD_FIELDS,
+        "edges": edges,
+    }
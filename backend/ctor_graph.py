@@ -0,0 +1,203 @@
+# Team-level graph: constructors as nodes, linked by the drivers they shared
+#   - a lineage (data/ctor_lineage.json) groups constructors that are one team under
+#     different names, e.g. Toleman -> Benetton -> Renault -> Lotus F1 -> Alpine
+#   - aggregated from the drivers' years_by_ctor and the pairs' years_by_ctor, so it
+#     needs no pass over the results
+#   - a driver's move between two teams from one season to the next is a transfer,
+#     a mid-season switch only counts as a shared driver
+
+import json
+from collections import Counter
+from itertools import combinations
+from typing import TypedDict
+from data_types import Ctor, Driver, DriverPair
+from graph_views import YearsByCtorEntry
+from year_index import YearIndex
+
+
+class TeamNodeData(TypedDict):
+    id: str  # ctor id of the team's current name, also gives its colours
+    name: str
+    yearsByCtor: list[YearsByCtorEntry]
+    drivers: int
+    teammatePairs: int
+
+
+class TeamEdgeData(TypedDict):
+    source: str
+    target: str
+    sharedDrivers: int
+    transfers: int
+    transfersByYear: list[list[int]]  # [year, source -> target, target -> source]
+
+
+class CtorLineage:
+    """
+    Maps a ctor, in a given season, to the team it belongs to.
+
+    Ctors outside every lineage are a team of their own. The last constructor of
+    a lineage names the team and gives its id.
+    """
+
+    def __init__(self, ctor_by_id: dict[int, Ctor], lineages: dict[str, list]):
+        ctor_ids_by_ref: dict[str, list[int]] = {}
+        for ctor in ctor_by_id.values():
+            ctor_ids_by_ref.setdefault(ctor.constructor_ref, []).append(ctor.constructor_id)
+
+        self.name_by_team_id: dict[int, str] = {
+            ctor.constructor_id: ctor.name for ctor in ctor_by_id.values()
+        }
+        # ctor_id -> (first_year, last_year, team_id) spans
+        self.spans_by_ctor_id: dict[int, list[tuple[int, int, int]]] = {}
+        for name, entries in lineages.items():
+            entries = [
+                entry if isinstance(entry, dict) else {"ref": entry} for entry in entries
+            ]
+            # refs missing from constructors.csv are skipped (e.g. synthetic data)
+            entries = [entry for entry in entries if entry["ref"] in ctor_ids_by_ref]
+            if not entries:
+                continue
+            # refs can repeat in constructors.csv, the latest id is the current one
+            team_id = max(ctor_ids_by_ref[entries[-1]["ref"]])
+            self.name_by_team_id[team_id] = name
+            for entry in entries:
+                for ctor_id in ctor_ids_by_ref[entry["ref"]]:
+                    self.spans_by_ctor_id.setdefault(ctor_id, []).append(
+                        (entry.get("from", 0), entry.get("to", 9999), team_id)
+                    )
+
+    def team_id(self, ctor_id: int, year: int) -> int:
+        for first_year, last_year, team_id in self.spans_by_ctor_id.get(ctor_id, ()):
+            if first_year <= year <= last_year:
+                return team_id
+        return ctor_id
+
+
+# {"<team name>": ["<constructorRef>" | {"ref": .., "from": year, "to": year}, ...]}
+#   - oldest constructor first, the bounds are for refs shared by unrelated teams
+def load_ctor_lineage(file_path: str, ctor_by_id: dict[int, Ctor]) -> CtorLineage:
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            lineages = json.load(f)
+    except FileNotFoundError:
+        lineages = {}
+    return CtorLineage(ctor_by_id, lineages)
+
+
+class CtorGraphIndex:
+    """
+    Per-driver seasons by team and per-team teammate pair counts by year.
+
+    Built once per data version, a year range then only looks at the drivers
+    active in it (see YearIndex.driver_ids).
+    """
+
+    def __init__(
+        self,
+        driver_by_id: dict[int, Driver],
+        driver_pair_by_id: dict[tuple[int, int], DriverPair],
+        lineage: CtorLineage,
+    ):
+        self.lineage = lineage
+        # driver_id -> [(year, team_ids)], oldest first
+        self.seasons_by_driver_id: dict[int, list[tuple[int, frozenset[int]]]] = {}
+        # team_id -> year -> ctor_ids the team raced as
+        self.ctor_ids_by_year_by_team: dict[int, dict[int, set[int]]] = {}
+        for driver_id, driver in driver_by_id.items():
+            team_ids_by_year: dict[int, set[int]] = {}
+            for ctor_id, years in driver.years_by_ctor.items():
+                for year in years:
+                    team_id = lineage.team_id(ctor_id, year)
+                    team_ids_by_year.setdefault(year, set()).add(team_id)
+                    self.ctor_ids_by_year_by_team.setdefault(team_id, {}).setdefault(
+                        year, set()
+                    ).add(ctor_id)
+            self.seasons_by_driver_id[driver_id] = [
+                (year, frozenset(team_ids))
+                for year, team_ids in sorted(team_ids_by_year.items())
+            ]
+
+        # team_id -> year -> pairs that were teammates there
+        self.pair_count_by_year_by_team: dict[int, Counter[int]] = {}
+        for driver_pair in driver_pair_by_id.values():
+            for ctor_id, years in driver_pair.years_by_ctor.items():
+                for year in years:
+                    team_id = lineage.team_id(ctor_id, year)
+                    self.pair_count_by_year_by_team.setdefault(team_id, Counter())[
+                        year
+                    ] += 1
+
+
+# Cytoscape elements of the team graph for a year range
+def to_ctor_graph_data(
+    ctor_graph_index: CtorGraphIndex,
+    ctor_by_id: dict[int, Ctor],
+    year_index: YearIndex,
+    min_year: int = 0,
+    max_year: int = 9999,
+) -> dict[str, list[dict]]:
+    driver_ids_by_team: dict[int, set[int]] = {}
+    shared_drivers: Counter[tuple[int, int]] = Counter()
+    # (from team, to team) -> year -> drivers
+    transfers: dict[tuple[int, int], Counter[int]] = {}
+
+    for driver_id in sorted(year_index.driver_ids(min_year, max_year)):
+        seasons = [
+            (year, team_ids)
+            for year, team_ids in ctor_graph_index.seasons_by_driver_id[driver_id]
+            if min_year <= year <= max_year
+        ]
+        team_ids = frozenset().union(*(team_ids for _, team_ids in seasons))
+        for team_id in team_ids:
+            driver_ids_by_team.setdefault(team_id, set()).add(driver_id)
+        for team_pair in combinations(sorted(team_ids), 2):
+            shared_drivers[team_pair] += 1
+        for (_, previous), (year, current) in zip(seasons, seasons[1:]):
+            for from_team_id in previous - current:
+                for to_team_id in current - previous:
+                    transfers.setdefault((from_team_id, to_team_id), Counter())[year] += 1
+
+    nodes = []
+    for team_id in sorted(driver_ids_by_team):
+        years_by_ctor: dict[int, list[int]] = {}
+        for year, ctor_ids in ctor_graph_index.ctor_ids_by_year_by_team[team_id].items():
+            if min_year <= year <= max_year:
+                for ctor_id in ctor_ids:
+                    years_by_ctor.setdefault(ctor_id, []).append(year)
+        pair_counts = ctor_graph_index.pair_count_by_year_by_team.get(team_id, {})
+        node_data: TeamNodeData = {
+            "id": str(team_id),
+            "name": ctor_graph_index.lineage.name_by_team_id[team_id],
+            "yearsByCtor": sorted(
+                [
+                    {
+                        "ctor": ctor_by_id[ctor_id].name,
+                        "ctorId": str(ctor_id),
+                        "years": sorted(years),
+                    }
+                    for ctor_id, years in years_by_ctor.items()
+                ],
+                key=lambda entry: min(entry["years"]),
+            ),
+            "drivers": len(driver_ids_by_team[team_id]),
+            "teammatePairs": sum(
+                count for year, count in pair_counts.items() if min_year <= year <= max_year
+            ),
+        }
+        nodes.append({"data": node_data})
+
+    edges = []
+    for (source, target), count in sorted(shared_drivers.items()):
+        forward = transfers.get((source, target), Counter())
+        back = transfers.get((target, source), Counter())
+        edge_data: TeamEdgeData = {
+            "source": str(source),
+            "target": str(target),
+            "sharedDrivers": count,
+            "transfers": sum(forward.values()) + sum(back.values()),
+            "transfersByYear": [
+                [year, forward[year], back[year]] for year in sorted(forward | back)
+            ],
+        }
+        edges.append({"data": edge_data})
+    return {"nodes": nodes, "edges": edges}
@@ -1,5 +1,7 @@
 from pydantic import BaseModel, field_validator, Field, ConfigDict, ValidationInfo
 from typing import Optional
+from array import array
+from bisect import bisect_left
 from datetime import date
 from dataclasses import dataclass, field
 
@@ -13,39 +15,102 @@ class MyBaseModel(BaseModel):
     model_config = ConfigDict(alias_generator=to_camel, populate_by_name=True)
 
 
-@dataclass
+# sorted id arrays stand in for sets in the internal state: a set of a few ints
+# costs ~200 bytes, an array('i') 64 bytes plus 4 per id
+def sorted_ids() -> array:
+    return array("i")
+
+
+# adds value to a sorted array, if it is not in it yet
+def add_sorted(values: array, value: int) -> None:
+    i = bisect_left(values, value)
+    if i == len(values) or values[i] != value:
+        values.insert(i, value)
+
+
+@dataclass(slots=True)
+class HeadToHead:
+    # [driver_id_1, driver_id_2] pairs, same order as the DriverPair
+    races: int = 0  # races both drivers started
+    race_ahead: list[int] = field(default_factory=lambda: [0, 0])
+    qualifying_ahead: list[int] = field(default_factory=lambda: [0, 0])
+    points: list[float] = field(default_factory=lambda: [0.0, 0.0])
+    dnfs: list[int] = field(default_factory=lambda: [0, 0])
+
+
+@dataclass(slots=True)
 class DriverPair:
     driver_id_1: int  # driverId1 < driverId2
     driver_id_2: int
-    race_ids: set[int] = field(default_factory=set)
-    years_by_ctor: dict[int, set[int]] = field(
+    race_ids: array = field(default_factory=sorted_ids)  # sorted raceIds
+    years_by_ctor: dict[int, array] = field(
+        default_factory=dict
+    )  # mapping from ctor_id to sorted years drivers drove together for that ctor
+    head_to_head_by_year_by_ctor: dict[int, dict[int, HeadToHead]] = field(
         default_factory=dict
-    )  # mapping from ctor_id to list of years drivers drove together for that ctor
+    )  # mapping from ctor_id to mapping from year to head-to-head for that season
 
 
-class Driver(MyBaseModel):
+# Internal state is kept in slotted dataclasses, the *Row models below validate
+# rows read from the CSVs (or an ingest) and are converted once on load
+@dataclass(slots=True)
+class Driver:
     driver_id: int
     driver_ref: str
-    number: Optional[int]
+    number: int | None
     forename: str
     surname: str
-    codename: str = Field(alias="code")
+    codename: str
     dob: date
     nationality: str
-    years_active: set[int] = Field(
-        default_factory=set
-    )  # years that driver appears in at least one result
-    years_by_ctor: dict[int, set[int]] = Field(
+    years_by_ctor: dict[int, array] = field(
         default_factory=dict
-    )  # mapping from ctor_id to list of years drivers drove together for that ctor
-    teammates_by_year_by_ctor: dict[int, dict[int, list[int]]] = Field(
+    )  # mapping from ctor_id to sorted years driver drove for that ctor
+    teammates_by_year_by_ctor: dict[int, dict[int, list[int]]] = field(
         default_factory=dict
-    ) # mapping from ctor_id to mapping from year to list of teammates in that year
-    teammates: set[int] = Field(default_factory=set)  # set of teammates by driverId
-    driver_pairs: set[tuple[int, int]] = Field(default_factory=set)
-    race_ids: set[int] = Field(
-        default_factory=set
-    )  # set of races driver has results in
+    )  # mapping from ctor_id to mapping from year to list of teammates in that year
+    teammate_ids: array = field(default_factory=sorted_ids)  # sorted driverIds
+    race_ids: array = field(default_factory=sorted_ids)  # races driver has results in
+
+    # years that driver appears in at least one result
+    @property
+    def years_active(self) -> set[int]:
+        return set().union(*self.years_by_ctor.values())
+
+    def __str__(self):
+        return f"{self.forename} {self.surname}"
+
+
+@dataclass(slots=True)
+class Race:
+    race_id: int
+    year: int
+    name: str
+    date: date
+
+    def __str__(self):
+        return f"{self.year} {self.name}"
+
+
+@dataclass(slots=True)
+class Ctor:
+    constructor_id: int
+    constructor_ref: str  # one word identifier e.g. 'alpine'
+    name: str  # full name e.g. 'Alpine F1 Team'
+    nationality: str
+    color_primary: str | None
+    color_secondary: str | None
+
+
+class DriverRow(MyBaseModel):
+    driver_id: int
+    driver_ref: str
+    number: Optional[int]
+    forename: str
+    surname: str
+    codename: str = Field(alias="code")
+    dob: date
+    nationality: str
 
     @field_validator("codename", mode="before")
     def handle_null(cls, v, info: ValidationInfo):
@@ -56,21 +121,73 @@ class Driver(MyBaseModel):
             ].upper()  # first 3 characters of last part of last name (e.g "de matta" -> MAT)
         return v
 
-    def __str__(self):
-        return f"{self.forename} {self.surname}"
+    def to_driver(self) -> Driver:
+        return Driver(
+            self.driver_id,
+            self.driver_ref,
+            self.number,
+            self.forename,
+            self.surname,
+            self.codename,
+            self.dob,
+            self.nationality,
+        )
+
+
+class RaceRow(MyBaseModel):
+    race_id: int
+    year: int
+    # circuit_id: int
+    name: str
+    date: date
+
+    def to_race(self) -> Race:
+        return Race(self.race_id, self.year, self.name, self.date)
+
+
+class CtorRow(MyBaseModel):
+    constructor_id: int
+    constructor_ref: str
+    name: str
+    nationality: str
+    color_primary: str | None
+    color_secondary: str | None
+
+    def to_ctor(self) -> Ctor:
+        return Ctor(
+            self.constructor_id,
+            self.constructor_ref,
+            self.name,
+            self.nationality,
+            self.color_primary,
+            self.color_secondary,
+        )
 
 
-# TODO: Add more fields to this (grid pos, finish pos, points, etc)
 class Result(MyBaseModel):
     result_id: int
     race_id: int
     driver_id: int
     constructor_id: int
-    position: Optional[
-        int
-    ]  # None if retired, DNF, etc (TODO: add field indicating this)
-
-    @field_validator("position", mode="before")
+    position: Optional[int]  # None if retired, DNF, etc (see status_id)
+    grid: Optional[int] = None  # 0 is a pit lane start
+    position_order: Optional[int] = None
+    points: float = 0
+    laps: Optional[int] = None
+    milliseconds: Optional[int] = None  # race time
+    fastest_lap_time: Optional[str] = None  # e.g. "1:27.452"
+    status_id: Optional[int] = None  # statusId in status.csv
+
+    @field_validator(
+        "position",
+        "grid",
+        "position_order",
+        "laps",
+        "milliseconds",
+        "fastest_lap_time",
+        "status_id",
+        mode="before",
+    )
     def handle_null(cls, v):
         if v == r"\N":  # raw string match
             return None
@@ -81,29 +198,3 @@ class Result(MyBaseModel):
             return f"{driver_by_id[self.driver_id]} finished in P{self.position} in the {race_by_id[self.race_id]}"
         else:
             return f"{driver_by_id[self.driver_id]} did not finish the {race_by_id[self.race_id]}"
-
-
-class Race(MyBaseModel):
-    race_id: int
-    year: int
-    # circuit_id: int
-    name: str
-    date: date
-    drivers: set[int] = Field(
-        default_factory=set
-    )  # set of drivers who competed by driverId
-    ctors: set[int] = Field(default_factory=set)  # set of constructors by ctorId
-    results: set[int] = Field(default_factory=set)  # set of results by resultId
-
-    def __str__(self):
-        return f"{self.year} {self.name}"
-
-
-class Ctor(MyBaseModel):
-    constructor_id: int
-    constructor_ref: str  # one word identifier e.g. 'alpine'
-    name: str  # full name e.g. 'Alpine F1 Team'
-    nationality: str
-    driver_pair_ids: set[tuple[int, int]] = Field(default_factory=set)
-    color_primary: str | None
-    color_secondary: str | None
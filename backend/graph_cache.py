@@ -0,0 +1,241 @@
+import gzip
+import hashlib
+import mmap
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable
+from instrumentation import stage
+from serialization import dumps
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip is pre-compressed without it
+    brotli = None
+
+# preferred first
+CONTENT_CODINGS = ("br", "gzip")
+
+
+@dataclass(frozen=True)
+class CachedPayload:
+    body: bytes | memoryview  # serialized JSON payload, a mapped file if from a store
+    etag: str  # quoted strong validator, derived from body
+    encoded: dict[str, bytes | memoryview] = field(
+        default_factory=dict
+    )  # content-coding -> body
+
+    # picks the best pre-compressed body the client accepts
+    #   - returns (body, etag, content-coding or None)
+    #   - each coding gets its own etag, as the bytes differ
+    def representation(
+        self, accept_encoding: str | None
+    ) -> tuple[bytes | memoryview, str, str | None]:
+        accepted = parse_accept_encoding(accept_encoding)
+        for coding in CONTENT_CODINGS:
+            if coding in self.encoded and coding in accepted:
+                return self.encoded[coding], f'{self.etag[:-1]}-{coding}"', coding
+        return self.body, self.etag, None
+
+
+class PayloadStore:
+    """
+    Directory of serialized payloads shared by worker processes.
+
+    A payload is <name>.json, one <name>.json.<coding> per content-coding and
+    <name>.etag, which is written last so only complete payloads are loaded.
+    Bodies are memory-mapped, so all workers serve the same page cache pages.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def load(self, name: str) -> CachedPayload | None:
+        path = os.path.join(self.directory, name)
+        try:
+            with open(f"{path}.etag", encoding="ascii") as f:
+                etag = f.read()
+            return CachedPayload(
+                _map_file(f"{path}.json"),
+                etag,
+                {
+                    coding: _map_file(f"{path}.json.{coding}")
+                    for coding in CONTENT_CODINGS
+                    if os.path.exists(f"{path}.json.{coding}")
+                },
+            )
+        except FileNotFoundError:  # not stored yet, or pruned with an old data version
+            return None
+
+    def save(self, name: str, payload: CachedPayload) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, name)
+        files = [
+            (f"{path}.json", payload.body),
+            *((f"{path}.json.{coding}", body) for coding, body in payload.encoded.items()),
+            (f"{path}.etag", payload.etag.encode("ascii")),
+        ]
+        # workers may save the same payload at once, each swaps in its own complete copy
+        for file_path, content in files:
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+
+
+def _map_file(path: str) -> memoryview:
+    with open(path, "rb") as f:
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class PayloadCache:
+    """
+    Bounded LRU cache of serialized JSON payloads.
+
+    build(*key) must return a JSON serializable payload, get(*key) returns the
+    cached serialization (building it on a miss). With a store, misses are
+    looked up in (and builds saved to) the store first, under name. A version
+    is prefixed to the etags, so they change whenever the data is reloaded.
+    """
+
+    def __init__(
+        self,
+        build: Callable[..., object],
+        maxsize: int = 32,
+        compress: bool = True,
+        store: PayloadStore | None = None,
+        name: str = "payload",
+        version: str = "",
+    ):
+        self.build = build
+        self.maxsize = maxsize
+        self.compress = compress
+        self.store = store
+        self.name = name
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, CachedPayload] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, *key) -> CachedPayload:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+            self.misses += 1
+
+        # build outside the lock, a duplicate build on a race is harmless
+        entry = self._load_or_build(key)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _load_or_build(self, key: tuple) -> CachedPayload:
+        store_name = f"{self.name}-{'_'.join(map(str, key))}"
+        if self.store is not None:
+            entry = self.store.load(store_name)
+            if entry is not None:
+                return entry
+
+        payload = self.build(*key)
+        with stage("serialize"):
+            body = dumps(payload)
+        digest = hashlib.sha1(body).hexdigest()
+        with stage("compress"):
+            encoded = compress_body(body) if self.compress else {}
+        entry = CachedPayload(
+            body,
+            f'"{self.version}-{digest}"' if self.version else f'"{digest}"',
+            encoded,
+        )
+        if self.store is not None:
+            self.store.save(store_name, entry)
+            # serve the mapped copy, so the built bytes are not kept per process
+            return self.store.load(store_name) or entry
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+
+class GraphCache(PayloadCache):
+    """
+    PayloadCache for graph payloads, keyed by year range.
+
+    build(min_year, max_year, *args) must return a JSON serializable payload.
+    Year ranges are clamped to [first_year, last_year] so ranges that select
+    the same seasons (e.g. 0-2025 and 1950-9999) share a cache entry.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[int, int], object],
+        first_year: int,
+        last_year: int,
+        maxsize: int = 32,
+        compress: bool = True,
+        store: PayloadStore | None = None,
+        name: str = "graph",
+        version: str = "",
+    ):
+        super().__init__(build, maxsize, compress, store, name, version)
+        self.first_year = first_year
+        self.last_year = last_year
+
+    def key(self, min_year: int, max_year: int, *args) -> tuple:
+        return max(min_year, self.first_year), min(max_year, self.last_year), *args
+
+    def get(self, min_year: int, max_year: int, *args) -> CachedPayload:
+        return super().get(*self.key(min_year, max_year, *args))
+
+
+# checks an If-None-Match header value against an etag (weak comparison, RFC 9110)
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def compress_body(body: bytes | memoryview) -> dict[str, bytes]:
+    encoded = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(body)
+    return encoded
+
+
+# content-codings with a non-zero q value in an Accept-Encoding header
+def parse_accept_encoding(accept_encoding: str | None) -> set[str]:
+    accepted = set()
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
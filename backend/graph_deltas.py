@@ -0,0 +1,137 @@
+from data_types import Driver, DriverPair
+from graph_views import most_common_ctor_id
+from year_index import YearIndex
+
+# Season by season /graph/deltas payload, for scrubbing the year slider
+#   - the frame of season y is the graph of the year range [y - window + 1, y]: the same
+#     nodes, edges and displayCtorIds as /graph/skeleton for that range
+#   - base is the first season's frame, each delta turns the previous frame into the next
+#   - nodes are [id, displayCtorId], edges [source, target, displayCtorId], removals
+#     are ids / [source, target]; ctorChanges lists kept elements whose display ctor changed
+#   - element details come from /graph, /driver and /pair as usual
+DELTAS_VERSION = 1
+
+
+class SeasonFrames:
+    """
+    The ctor entries most_common_ctor_id needs, per driver and per pair.
+
+    Built once per data version, so a frame only selects the ids active in its
+    range (see YearIndex.graph_ids) and picks their display ctors.
+    """
+
+    def __init__(
+        self,
+        driver_by_id: dict[int, Driver],
+        driver_pair_by_id: dict[tuple[int, int], DriverPair],
+        year_index: YearIndex,
+    ):
+        self.driver_by_id = driver_by_id
+        self.year_index = year_index
+        # same order as the skeleton graph: drivers by first year, pairs by last year
+        self.ctor_entries_by_driver_id: dict[int, list[dict]] = {
+            driver_id: ctor_entries(driver.years_by_ctor, min)
+            for driver_id, driver in driver_by_id.items()
+        }
+        self.ctor_entries_by_pair_id: dict[tuple[int, int], list[dict]] = {
+            driver_pair_id: ctor_entries(driver_pair.years_by_ctor, max)
+            for driver_pair_id, driver_pair in driver_pair_by_id.items()
+        }
+
+    # (driver_id -> displayCtorId, (source, target) -> displayCtorId) for a year range
+    def frame(
+        self, min_year: int, max_year: int
+    ) -> tuple[dict[int, int], dict[tuple[int, int], int]]:
+        driver_ids, driver_pair_ids = self.year_index.graph_ids(
+            self.driver_by_id, min_year, max_year
+        )
+        return (
+            {
+                driver_id: int(
+                    most_common_ctor_id(
+                        self.ctor_entries_by_driver_id[driver_id], min_year, max_year
+                    )
+                )
+                for driver_id in driver_ids
+            },
+            {
+                driver_pair_id: int(
+                    most_common_ctor_id(
+                        self.ctor_entries_by_pair_id[driver_pair_id], min_year, max_year
+                    )
+                )
+                for driver_pair_id in driver_pair_ids
+            },
+        )
+
+
+def ctor_entries(years_by_ctor: dict, key) -> list[dict]:
+    return [
+        {"ctorId": str(ctor_id), "years": list(years)}
+        for ctor_id, years in sorted(
+            years_by_ctor.items(), key=lambda item: key(item[1])
+        )
+    ]
+
+
+# base frame plus one delta per season in [min_year, max_year]
+def to_delta_data(
+    season_frames: SeasonFrames,
+    min_year: int,
+    max_year: int,
+    window: int = 1,
+) -> dict:
+    years = season_frames.year_index.years_in(min_year, max_year)
+    if not years:
+        return {"version": DELTAS_VERSION, "window": window, "base": None, "deltas": []}
+
+    node_ctors, edge_ctors = season_frames.frame(years[0] - window + 1, years[0])
+    base = {
+        "year": years[0],
+        "nodes": [[driver_id, ctor_id] for driver_id, ctor_id in node_ctors.items()],
+        "edges": [
+            [*driver_pair_id, ctor_id] for driver_pair_id, ctor_id in edge_ctors.items()
+        ],
+    }
+
+    deltas = []
+    for year in years[1:]:
+        next_node_ctors, next_edge_ctors = season_frames.frame(year - window + 1, year)
+        deltas.append(
+            {
+                "year": year,
+                "removeNodes": [
+                    driver_id for driver_id in node_ctors if driver_id not in next_node_ctors
+                ],
+                "addNodes": [
+                    [driver_id, ctor_id]
+                    for driver_id, ctor_id in next_node_ctors.items()
+                    if driver_id not in node_ctors
+                ],
+                "removeEdges": [
+                    list(driver_pair_id)
+                    for driver_pair_id in edge_ctors
+                    if driver_pair_id not in next_edge_ctors
+                ],
+                "addEdges": [
+                    [*driver_pair_id, ctor_id]
+                    for driver_pair_id, ctor_id in next_edge_ctors.items()
+                    if driver_pair_id not in edge_ctors
+                ],
+                "ctorChanges": {
+                    "nodes": [
+                        [driver_id, ctor_id]
+                        for driver_id, ctor_id in next_node_ctors.items()
+                        if node_ctors.get(driver_id, ctor_id) != ctor_id
+                    ],
+                    "edges": [
+                        [*driver_pair_id, ctor_id]
+                        for driver_pair_id, ctor_id in next_edge_ctors.items()
+                        if edge_ctors.get(driver_pair_id, ctor_id) != ctor_id
+                    ],
+                },
+            }
+        )
+        node_ctors, edge_ctors = next_node_ctors, next_edge_ctors
+
+    return {"version": DELTAS_VERSION, "window": window, "base": base, "deltas": deltas}
@@ -0,0 +1,230 @@
+# Server-side force-directed layout of the teammate graph, sent as node positions on /graph
+#   - Fruchterman-Reingold, vectorized with numpy; without numpy the nodes keep their
+#     seeded / placed positions and are not relaxed
+#   - seeded from the previous positions (the last layout, else the frontend's
+#     nodePositions.json), seeded nodes move with a lower temperature than new ones,
+#     so the layout stays stable as drivers are added
+#   - new nodes start at the centroid of their already placed teammates
+#   - a year range reuses the full layout, relaxed for a few iterations over its subgraph
+
+import json
+import math
+import random
+from array import array
+from dataclasses import dataclass
+
+try:
+    import numpy as np
+except ImportError:  # optional, positions are placed but not relaxed without it
+    np = None
+
+DEFAULT_SPACING = 100.0  # ideal distance between nodes, when there are no seeds to measure
+ITERATIONS = 100  # full history layout
+RANGE_ITERATIONS = 30  # relaxing the full layout over a year range's subgraph
+SEEDED_STEP = 0.01  # step scale of seeded nodes, new nodes move with 1.0
+RANGE_STEP = 0.05
+# pull towards the centre, against a total repulsion of about n k^2 / r at radius r,
+# so the drawing settles at a radius of about k sqrt(n / GRAVITY)
+GRAVITY = 4.0
+BLOCK = 512  # rows of the pairwise repulsion computed at once, bounds memory to BLOCK * n
+
+
+@dataclass
+class GraphLayout:
+    """
+    Node positions for the full history teammate graph.
+    """
+
+    driver_ids: array  # int32
+    xy: array  # float64, x and y per driver, same order as driver_ids
+
+    def __post_init__(self):
+        self.index_by_driver_id: dict[int, int] = {
+            driver_id: i for i, driver_id in enumerate(self.driver_ids)
+        }
+
+    def positions(self) -> dict[int, tuple[float, float]]:
+        return {
+            driver_id: (self.xy[2 * i], self.xy[2 * i + 1])
+            for i, driver_id in enumerate(self.driver_ids)
+        }
+
+
+# driver_id -> (x, y), from a Cytoscape positions export ({"<id>": {"x": .., "y": ..}})
+def load_seed_positions(file_path: str) -> dict[int, tuple[float, float]]:
+    try:
+        with open(file_path, encoding="utf-8") as f:
+            positions = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {
+        int(driver_id): (position["x"], position["y"])
+        for driver_id, position in positions.items()
+    }
+
+
+# the ideal node spacing k of Fruchterman-Reingold, sqrt(area / n), so the seeded
+# drivers' spread is kept as the graph grows
+def spacing(positions: list[tuple[float, float]]) -> float:
+    if len(positions) < 10:
+        return DEFAULT_SPACING
+    xs = [x for x, _ in positions]
+    ys = [y for _, y in positions]
+    area = (max(xs) - min(xs)) * (max(ys) - min(ys))
+    return math.sqrt(area / len(positions)) or DEFAULT_SPACING
+
+
+# positions for every driver: seeded ones as they are, the others next to placed teammates
+#   - drivers with no placed teammate (a new component) start at a random spot, seeded
+#     by driver_id so the result does not change between runs
+def place(
+    driver_ids: list[int],
+    pair_ids: list[tuple[int, int]],
+    seed_positions: dict[int, tuple[float, float]],
+    length: float,
+) -> dict[int, tuple[float, float]]:
+    neighbors: dict[int, list[int]] = {driver_id: [] for driver_id in driver_ids}
+    for a, b in pair_ids:
+        neighbors[a].append(b)
+        neighbors[b].append(a)
+
+    positions = {
+        driver_id: seed_positions[driver_id]
+        for driver_id in driver_ids
+        if driver_id in seed_positions
+    }
+    if positions:
+        center_x = sum(x for x, _ in positions.values()) / len(positions)
+        center_y = sum(y for _, y in positions.values()) / len(positions)
+    else:
+        center_x = center_y = 0.0
+    spread = length * math.sqrt(len(driver_ids)) / 2
+
+    unplaced = [driver_id for driver_id in driver_ids if driver_id not in positions]
+    while unplaced:
+        placed_now = {}
+        for driver_id in unplaced:
+            placed = [positions[n] for n in neighbors[driver_id] if n in positions]
+            if placed:
+                angle = random.Random(driver_id).uniform(0, 2 * math.pi)
+                placed_now[driver_id] = (
+                    sum(x for x, _ in placed) / len(placed) + length / 2 * math.cos(angle),
+                    sum(y for _, y in placed) / len(placed) + length / 2 * math.sin(angle),
+                )
+        if not placed_now:  # only unconnected components left, start the next one
+            rng = random.Random(unplaced[0])
+            placed_now[unplaced[0]] = (
+                center_x + rng.uniform(-spread, spread),
+                center_y + rng.uniform(-spread, spread),
+            )
+        positions.update(placed_now)
+        unplaced = [driver_id for driver_id in unplaced if driver_id not in placed_now]
+    return positions
+
+
+def relax(
+    xy: "np.ndarray",
+    edges: "np.ndarray",
+    steps: "np.ndarray",
+    length: float,
+    iterations: int,
+) -> "np.ndarray":
+    """
+    Fruchterman-Reingold iterations over xy (n x 2) in place.
+
+    edges is an m x 2 array of row indices, steps the per-node scale of the
+    temperature (the largest move of an iteration), which cools linearly to 0.
+    Gravity towards the centre keeps separate components from drifting apart.
+    """
+    n = len(xy)
+    if n < 2:
+        return xy
+    x, y = xy[:, 0], xy[:, 1]
+    center_x, center_y = x.mean(), y.mean()
+    source, target = edges[:, 0], edges[:, 1]
+    for iteration in range(iterations):
+        temperature = length * (1 - iteration / iterations)
+        displacement_x = np.zeros(n)
+        displacement_y = np.zeros(n)
+
+        # repulsion between every pair of nodes: k^2 / d along the difference
+        for start in range(0, n, BLOCK):
+            dx = x[start : start + BLOCK, None] - x[None, :]
+            dy = y[start : start + BLOCK, None] - y[None, :]
+            weight = dx * dx
+            weight += dy * dy
+            np.maximum(weight, 0.01, out=weight)
+            np.divide(length * length, weight, out=weight)
+            displacement_x[start : start + BLOCK] += (dx * weight).sum(axis=1)
+            displacement_y[start : start + BLOCK] += (dy * weight).sum(axis=1)
+
+        # attraction along edges: d^2 / k towards each other
+        dx = x[source] - x[target]
+        dy = y[source] - y[target]
+        weight = np.sqrt(dx * dx + dy * dy) / length
+        np.add.at(displacement_x, source, -dx * weight)
+        np.add.at(displacement_x, target, dx * weight)
+        np.add.at(displacement_y, source, -dy * weight)
+        np.add.at(displacement_y, target, dy * weight)
+
+        displacement_x -= GRAVITY * (x - center_x)
+        displacement_y -= GRAVITY * (y - center_y)
+        displacement = np.stack((displacement_x, displacement_y), axis=1)
+
+        moved = np.maximum(np.sqrt((displacement**2).sum(axis=1)), 1e-9)
+        limit = np.minimum(moved, temperature * steps)
+        xy += displacement * (limit / moved)[:, None]
+    return xy
+
+
+def layout(
+    driver_ids: list[int],
+    pair_ids: list[tuple[int, int]],
+    seed_positions: dict[int, tuple[float, float]],
+    iterations: int,
+    seeded_step: float,
+) -> dict[int, tuple[float, float]]:
+    length = spacing(
+        [seed_positions[driver_id] for driver_id in driver_ids if driver_id in seed_positions]
+    )
+    positions = place(driver_ids, pair_ids, seed_positions, length)
+    if np is None or iterations <= 0:
+        return positions
+
+    index_by_driver_id = {driver_id: i for i, driver_id in enumerate(driver_ids)}
+    xy = np.array([positions[driver_id] for driver_id in driver_ids], dtype=float)
+    edges = np.array(
+        [(index_by_driver_id[a], index_by_driver_id[b]) for a, b in pair_ids],
+        dtype=np.intp,
+    ).reshape(-1, 2)
+    steps = np.array(
+        [seeded_step if driver_id in seed_positions else 1.0 for driver_id in driver_ids]
+    )
+    relax(xy, edges, steps, length, iterations)
+    return {driver_id: (float(x), float(y)) for driver_id, (x, y) in zip(driver_ids, xy)}
+
+
+# full history layout, every driver with a teammate gets a position
+def compute_layout(
+    driver_pair_ids: list[tuple[int, int]],
+    seed_positions: dict[int, tuple[float, float]],
+    iterations: int = ITERATIONS,
+) -> GraphLayout:
+    driver_ids = sorted({driver_id for pair_id in driver_pair_ids for driver_id in pair_id})
+    positions = layout(
+        driver_ids, sorted(driver_pair_ids), seed_positions, iterations, SEEDED_STEP
+    )
+    xy = array("d")
+    for driver_id in driver_ids:
+        xy.extend(positions[driver_id])
+    return GraphLayout(array("i", driver_ids), xy)
+
+
+# positions for a year range's subgraph, starting from the full layout
+def range_layout(
+    graph_layout: GraphLayout,
+    driver_ids: list[int],
+    pair_ids: list[tuple[int, int]],
+    iterations: int = RANGE_ITERATIONS,
+) -> dict[int, tuple[float, float]]:
+    return layout(driver_ids, pair_ids, graph_layout.positions(), iterations, RANGE_STEP)
@@ -0,0 +1,180 @@
+import os
+from array import array
+from dataclasses import dataclass
+import multiprocessing
+from teammate_paths import TeammateGraph
+
+try:
+    import numpy as np
+except ImportError:  # optional, row_metrics loops over the distance rows without it
+    np = None
+
+UNREACHABLE = 255  # distance matrix entry for drivers in different components
+
+
+@dataclass
+class GraphMetrics:
+    """
+    All-pairs teammate distances and centrality, over the full history graph.
+
+    distances is a row-major len(driver_ids)^2 uint8 matrix of hop counts.
+    Closeness uses the Wasserman-Faust form (scaled by component size) and
+    betweenness is normalized by (n-1)(n-2), as the graph is not connected.
+    """
+
+    driver_ids: array  # int32, same order as TeammateGraph.driver_ids
+    distances: array  # uint8, n * n
+    eccentricity: array  # uint8, within the driver's component
+    closeness: array  # float64
+    betweenness: array  # float64
+
+    def __post_init__(self):
+        self.index_by_driver_id: dict[int, int] = {
+            driver_id: i for i, driver_id in enumerate(self.driver_ids)
+        }
+
+    def distance(self, driver_id1: int, driver_id2: int) -> int | None:
+        i = self.index_by_driver_id[driver_id1]
+        j = self.index_by_driver_id[driver_id2]
+        distance = self.distances[i * len(self.driver_ids) + j]
+        return None if distance == UNREACHABLE else distance
+
+    # metrics for one driver, as sent on /graph node data
+    def node_metrics(self, driver_id: int) -> dict[str, float]:
+        i = self.index_by_driver_id.get(driver_id)
+        if i is None:
+            return {}
+        return {
+            "eccentricity": self.eccentricity[i],
+            "closeness": round(self.closeness[i], 6),
+            "betweenness": round(self.betweenness[i], 6),
+        }
+
+
+## WORKERS ##
+
+_offsets: array = array("i")
+_neighbors: array = array("i")
+
+
+def _init_worker(offsets: array, neighbors: array) -> None:
+    global _offsets, _neighbors
+    _offsets, _neighbors = offsets, neighbors
+
+
+# Brandes' algorithm for a chunk of sources
+#   - returns the distance rows of the sources and their betweenness contributions
+def _brandes_chunk(sources: range) -> tuple[bytes, list[float]]:
+    offsets, neighbors = _offsets, _neighbors
+    n = len(offsets) - 1
+    rows = bytearray()
+    betweenness = [0.0] * n
+
+    for source in sources:
+        distance = [-1] * n
+        sigma = [0] * n  # number of shortest paths from source
+        predecessors: list[list[int]] = [[] for _ in range(n)]
+        distance[source] = 0
+        sigma[source] = 1
+        order = [source]  # nodes in non-decreasing distance
+
+        for node in order:  # order grows as the BFS goes
+            next_distance = distance[node] + 1
+            for slot in range(offsets[node], offsets[node + 1]):
+                neighbor = neighbors[slot]
+                if distance[neighbor] < 0:
+                    distance[neighbor] = next_distance
+                    order.append(neighbor)
+                if distance[neighbor] == next_distance:
+                    sigma[neighbor] += sigma[node]
+                    predecessors[neighbor].append(node)
+
+        dependency = [0.0] * n
+        for node in reversed(order):
+            for predecessor in predecessors[node]:
+                dependency[predecessor] += (
+                    sigma[predecessor] / sigma[node] * (1 + dependency[node])
+                )
+            if node != source:
+                betweenness[node] += dependency[node]
+
+        rows += bytes(
+            UNREACHABLE if d < 0 else min(d, UNREACHABLE - 1) for d in distance
+        )
+
+    return bytes(rows), betweenness
+
+
+# eccentricity and closeness of each driver, from its row of the distance matrix
+def row_metrics(distances: array, n: int) -> tuple[array, array]:
+    if np is None:
+        eccentricity = array("B")
+        closeness = array("d")
+        for i in range(n):
+            row = distances[i * n : (i + 1) * n]
+            reachable = [d for d in row if d != UNREACHABLE]
+            total = sum(reachable)
+            eccentricity.append(max(reachable))
+            closeness.append(
+                (len(reachable) - 1) ** 2 / (total * (n - 1)) if total and n > 1 else 0.0
+            )
+        return eccentricity, closeness
+
+    # the matrix is viewed in place, the same uint8 bytes GraphMetrics keeps
+    matrix = np.frombuffer(distances, dtype=np.uint8).reshape(n, n)
+    reachable = matrix != UNREACHABLE
+    hops = np.where(reachable, matrix, 0)
+    totals = hops.sum(axis=1, dtype=np.int64)
+    counts = reachable.sum(axis=1, dtype=np.int64)
+    return (
+        array("B", hops.max(axis=1, initial=0).astype(np.uint8).tobytes()),
+        array(
+            "d",
+            np.divide(
+                (counts - 1) ** 2,
+                totals * (n - 1),
+                out=np.zeros(n),
+                where=totals > 0,
+            ).tobytes(),
+        ),
+    )
+
+
+def compute_graph_metrics(
+    teammate_graph: TeammateGraph, processes: int | None = None
+) -> GraphMetrics:
+    n = len(teammate_graph.driver_ids)
+    processes = processes or os.cpu_count() or 1
+    chunk_size = max(1, -(-n // (processes * 4)))  # a few chunks per process
+    chunks = [range(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+    init_args = (teammate_graph.offsets, teammate_graph.neighbors)
+    if processes == 1:
+        _init_worker(*init_args)
+        results = [_brandes_chunk(chunk) for chunk in chunks]
+    else:
+        # spawned, not forked: this runs in the reload thread and in /ingest, and forking a
+        # process with running threads can leave the children waiting on a lock forever
+        with multiprocessing.get_context("spawn").Pool(
+            processes, initializer=_init_worker, initargs=init_args
+        ) as pool:
+            results = pool.map(_brandes_chunk, chunks)
+
+    distances = array("B")
+    betweenness = [0.0] * n
+    for rows, partial in results:
+        distances.frombytes(rows)
+        for i, value in enumerate(partial):
+            betweenness[i] += value
+
+    eccentricity, closeness = row_metrics(distances, n)
+
+    # each undirected path is counted from both ends
+    scale = 1 / ((n - 1) * (n - 2)) if n > 2 else 0.0
+    return GraphMetrics(
+        array("i", teammate_graph.driver_ids),
+        distances,
+        eccentricity,
+        closeness,
+        array("d", (value * scale for value in betweenness)),
+    )
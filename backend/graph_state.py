@@ -0,0 +1,261 @@
+import os
+from functools import lru_cache
+from threading import Lock
+from compact_graph import COMPACT_VERSION, to_compact_data
+from ctor_graph import CtorGraphIndex, CtorLineage, to_ctor_graph_data
+from graph_deltas import SeasonFrames, to_delta_data
+from graph_cache import GraphCache, PayloadCache, PayloadStore
+from graph_layout import range_layout
+from instrumentation import stage
+from graph_views import (
+    pair_edge_data,
+    to_cytoscape_data,
+    to_driver_detail,
+    to_pair_detail,
+    to_skeleton_data,
+)
+from snapshot import Snapshot
+from teammate_paths import TeammateGraph
+from year_index import YearIndex
+
+
+class GraphState:
+    """
+    One version of the processed graph, with the payload caches built from it.
+
+    Requests use the state they started with and a reload swaps in a new one, so
+    cached payloads never mix data versions. /ingest is the only in-place update,
+    it holds lock (shared by every state) and then swaps in a new state as well.
+    With a store_root, graph payloads are shared with other workers on disk.
+    """
+
+    def __init__(
+        self,
+        snapshot: Snapshot,
+        version: str,
+        lock: Lock,
+        store_root: str | None = None,
+        ctor_lineage: CtorLineage | None = None,
+    ):
+        self.version = version  # short hex of the source files hash
+        self.lock = lock  # held while the graph is read for a payload or updated
+        self.driver_by_id = snapshot.driver_by_id
+        self.driver_by_ref = snapshot.driver_by_ref
+        self.ctor_by_id = snapshot.ctor_by_id
+        self.ctor_by_ref = snapshot.ctor_by_ref
+        self.race_by_id = snapshot.race_by_id
+        self.driver_pair_by_id = snapshot.driver_pair_by_id
+        self.graph_metrics = snapshot.graph_metrics
+        self.graph_layout = snapshot.graph_layout
+        self.year_index = YearIndex(self.driver_by_id)
+        self.teammate_graph = TeammateGraph(self.driver_pair_by_id)
+        self.ctor_graph_index = CtorGraphIndex(
+            self.driver_by_id,
+            self.driver_pair_by_id,
+            ctor_lineage or CtorLineage(self.ctor_by_id, {}),
+        )
+
+        store = PayloadStore(os.path.join(store_root, version)) if store_root else None
+        years = [race.year for race in self.race_by_id.values()]
+        # one cache per /graph payload version, plus the skeleton graph
+        self.graph_caches: dict[int | str, GraphCache] = {
+            payload_version: GraphCache(
+                build,
+                first_year=min(years),
+                last_year=max(years),
+                store=store,
+                name=f"graph{payload_version}",
+                version=version,
+            )
+            for payload_version, build in (
+                (1, self.build_graph),
+                (COMPACT_VERSION, self.build_compact_graph),
+                ("skeleton", self.build_skeleton_graph),
+            )
+        }
+        self.season_frames = SeasonFrames(
+            self.driver_by_id, self.driver_pair_by_id, self.year_index
+        )
+        # season by season patches (/graph/deltas), keyed by year range and window
+        self.delta_cache = GraphCache(
+            self.build_deltas,
+            first_year=min(years),
+            last_year=max(years),
+            store=store,
+            name="deltas",
+            version=version,
+        )
+        # team-level graph (/ctor-graph)
+        self.ctor_graph_cache = GraphCache(
+            self.build_ctor_graph,
+            first_year=min(years),
+            last_year=max(years),
+            store=store,
+            name="ctorgraph",
+            version=version,
+        )
+        # per-entity detail payloads, small enough to not be worth compressing or sharing
+        self.driver_detail_cache = PayloadCache(
+            self.build_driver_detail, maxsize=1024, compress=False, version=version
+        )
+        self.pair_detail_cache = PayloadCache(
+            self.build_pair_detail, maxsize=4096, compress=False, version=version
+        )
+        self.path_cache = PayloadCache(
+            self.build_path, maxsize=4096, compress=False, version=version
+        )
+        # year ranges are clamped by the graph caches, so each range is laid out once
+        self.range_positions = lru_cache(maxsize=64)(self._range_positions)
+
+    def to_snapshot(self) -> Snapshot:
+        return Snapshot(
+            self.driver_by_id,
+            self.driver_by_ref,
+            self.ctor_by_id,
+            self.ctor_by_ref,
+            self.race_by_id,
+            self.driver_pair_by_id,
+            self.graph_metrics,
+            self.graph_layout,
+        )
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        layout_info = self.range_positions.cache_info()
+        return {
+            **{
+                str(payload_version): cache.stats()
+                for payload_version, cache in self.graph_caches.items()
+            },
+            "deltas": self.delta_cache.stats(),
+            "ctor": self.ctor_graph_cache.stats(),
+            "driver": self.driver_detail_cache.stats(),
+            "pair": self.pair_detail_cache.stats(),
+            "path": self.path_cache.stats(),
+            "layout": {
+                "hits": layout_info.hits,
+                "misses": layout_info.misses,
+                "size": layout_info.currsize,
+                "maxsize": layout_info.maxsize,
+            },
+        }
+
+    # node positions for a year range's graph, relaxed from the full history layout
+    #   - called with lock held
+    def _range_positions(
+        self, min_year: int, max_year: int
+    ) -> dict[int, tuple[float, float]]:
+        if self.graph_layout is None:
+            return {}
+        driver_ids, driver_pair_ids = self.year_index.graph_ids(
+            self.driver_by_id, min_year, max_year
+        )
+        # the full history graph is the layout itself
+        if len(driver_ids) == len(self.graph_layout.driver_ids):
+            return self.graph_layout.positions()
+        with stage("range_layout"):
+            return range_layout(self.graph_layout, driver_ids, driver_pair_ids)
+
+    def build_graph(self, min_year: int, max_year: int) -> dict[str, dict]:
+        with self.lock:
+            positions = self.range_positions(min_year, max_year)
+            with stage("to_cytoscape_data"):
+                return to_cytoscape_data(
+                    self.driver_by_id,
+                    self.ctor_by_id,
+                    self.driver_pair_by_id,
+                    self.year_index,
+                    min_year,
+                    max_year,
+                    self.graph_metrics,
+                    positions,
+                )
+
+    def build_compact_graph(self, min_year: int, max_year: int) -> dict:
+        with self.lock:
+            positions = self.range_positions(min_year, max_year)
+            with stage("to_compact_data"):
+                return to_compact_data(
+                    self.driver_by_id,
+                    self.ctor_by_id,
+                    self.driver_pair_by_id,
+                    self.year_index,
+                    min_year,
+                    max_year,
+                    self.graph_metrics,
+                    positions,
+                )
+
+    def build_skeleton_graph(self, min_year: int, max_year: int) -> dict[str, list]:
+        with self.lock:
+            positions = self.range_positions(min_year, max_year)
+            with stage("to_skeleton_data"):
+                return to_skeleton_data(
+                    self.driver_by_id,
+                    self.ctor_by_id,
+                    self.driver_pair_by_id,
+                    self.year_index,
+                    min_year,
+                    max_year,
+                    positions=positions,
+                )
+
+    def build_deltas(self, min_year: int, max_year: int, window: int) -> dict:
+        with self.lock, stage("to_delta_data"):
+            return to_delta_data(self.season_frames, min_year, max_year, window)
+
+    def build_ctor_graph(self, min_year: int, max_year: int) -> dict[str, list]:
+        with self.lock, stage("to_ctor_graph_data"):
+            return to_ctor_graph_data(
+                self.ctor_graph_index,
+                self.ctor_by_id,
+                self.year_index,
+                min_year,
+                max_year,
+            )
+
+    def build_driver_detail(self, driver_id: int) -> dict:
+        with self.lock:
+            return to_driver_detail(
+                self.driver_by_id[driver_id], self.ctor_by_id, self.race_by_id
+            )
+
+    def build_pair_detail(self, driver_id1: int, driver_id2: int) -> dict:
+        with self.lock:
+            return to_pair_detail(
+                self.driver_pair_by_id[driver_id1, driver_id2],
+                self.driver_by_id,
+                self.ctor_by_id,
+                self.race_by_id,
+            )
+
+    def build_path(
+        self,
+        from_driver_id: int,
+        to_driver_id: int,
+        min_year: int | None,
+        max_year: int | None,
+        ctor_id: int | None,
+    ) -> dict:
+        with self.lock:
+            path = self.teammate_graph.shortest_path(
+                from_driver_id, to_driver_id, min_year, max_year, ctor_id
+            )
+            return {
+                "distance": len(path) - 1 if path else None,  # None if not connected
+                "path": [
+                    {
+                        "id": str(driver_id),
+                        "driverRef": self.driver_by_id[driver_id].driver_ref,
+                        "name": str(self.driver_by_id[driver_id]),
+                        "codename": self.driver_by_id[driver_id].codename,
+                    }
+                    for driver_id in path or []
+                ],
+                "links": [
+                    pair_edge_data(
+                        self.driver_pair_by_id[min(driver_ids), max(driver_ids)],
+                        self.ctor_by_id,
+                    )
+                    for driver_ids in zip(path or [], (path or [])[1:])
+                ],
+            }
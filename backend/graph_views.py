@@ -0,0 +1,304 @@
+from typing import NotRequired, TypedDict
+from data_types import Driver, Ctor, DriverPair, HeadToHead, Race
+from year_index import YearIndex
+from graph_metrics import GraphMetrics
+
+
+# Shapes of the version 1 /graph payload
+#   - plain dicts, so they go straight to the JSON encoder (see serialization.py)
+class YearsByCtorEntry(TypedDict):
+    ctor: str
+    ctorId: str
+    years: list[int]
+
+
+class TeammatesByCtorEntry(TypedDict):
+    ctorId: int
+    years: list[list]  # [year, [teammate driver ids]], newest first
+
+
+class HeadToHeadEntry(TypedDict):
+    ctorId: str
+    year: int
+    races: int
+    raceAhead: list[int]
+    qualifyingAhead: list[int]
+    points: list[float]
+    pointsShare: float | None
+    dnfs: list[int]
+
+
+class NodeData(TypedDict):
+    id: str
+    displayCtorId: str
+    name: str
+    codename: str
+    forename: str
+    surname: str
+    yearsByCtor: list[YearsByCtorEntry]
+    teammatesByYearByCtor: list[TeammatesByCtorEntry]
+    raceCount: int
+    # see GraphMetrics.node_metrics
+    eccentricity: NotRequired[int]
+    closeness: NotRequired[float]
+    betweenness: NotRequired[float]
+
+
+class EdgeData(TypedDict):
+    source: str
+    target: str
+    displayCtorId: str
+    yearsByCtor: list[YearsByCtorEntry]
+    headToHead: list[HeadToHeadEntry]
+
+
+# Cytoscape node data for a driver (version 1 /graph payload)
+def driver_node_data(driver: Driver, ctor_by_id: dict[int, Ctor]) -> NodeData:
+    return {
+        "id": str(driver.driver_id),
+        "displayCtorId": "0",  # default, will get changed
+        "name": str(driver),
+        "codename": driver.codename,
+        "forename": driver.forename,
+        "surname": driver.surname,
+        # "yearsActive": sorted(list(driver.years_active)), Not using for now, because same info in yearsByCtor
+        "yearsByCtor": sorted(
+            [
+                {
+                    "ctor": ctor_by_id[ctor_id].name,
+                    "ctorId": str(ctor_id),
+                    "years": sorted(years),
+                }
+                for ctor_id, years in driver.years_by_ctor.items()
+            ],
+            key=lambda pair: min(pair["years"]),
+        ),
+        "teammatesByYearByCtor": sorted(
+            [
+                {
+                    "ctorId": ctorId,
+                    "years": sorted(
+                        [list(item) for item in years.items()],
+                        key=lambda year: year[0], reverse=True),
+                }
+                for ctorId, years in driver.teammates_by_year_by_ctor.items()
+            ],
+            key=lambda pair: (
+                max([year[0] for year in pair["years"]]),
+                len(pair["years"]),
+            ), reverse=True
+        ),
+        "raceCount": len(driver.race_ids),
+    }
+
+
+# Cytoscape edge data for a driver pair (version 1 /graph payload)
+def pair_edge_data(driver_pair: DriverPair, ctor_by_id: dict[int, Ctor]) -> EdgeData:
+    return {
+        "source": str(driver_pair.driver_id_1),
+        "target": str(driver_pair.driver_id_2),
+        "displayCtorId": "0",  # default, will get changed
+        "yearsByCtor": sorted(
+            [
+                {
+                    "ctor": ctor_by_id[ctor_id].name,
+                    "ctorId": str(ctor_id),
+                    "years": sorted(years),
+                }
+                for ctor_id, years in driver_pair.years_by_ctor.items()
+            ],
+            key=lambda pair: max(pair["years"]),
+        ),
+        "headToHead": head_to_head_data(driver_pair),
+    }
+
+
+# per ctor-year head-to-heads of a pair, oldest first
+#   - two-item lists are [source, target], pointsShare is the source's
+def head_to_head_data(driver_pair: DriverPair) -> list[HeadToHeadEntry]:
+    entries: list[HeadToHeadEntry] = []
+    for ctor_id, head_to_head_by_year in driver_pair.head_to_head_by_year_by_ctor.items():
+        for year, head_to_head in head_to_head_by_year.items():
+            head_to_head: HeadToHead
+            points = [round(points, 2) for points in head_to_head.points]
+            entries.append(
+                {
+                    "ctorId": str(ctor_id),
+                    "year": year,
+                    "races": head_to_head.races,
+                    "raceAhead": head_to_head.race_ahead,
+                    "qualifyingAhead": head_to_head.qualifying_ahead,
+                    "points": points,
+                    "pointsShare": (
+                        round(points[0] / sum(points), 4) if sum(points) else None
+                    ),
+                    "dnfs": head_to_head.dnfs,
+                }
+            )
+    entries.sort(key=lambda entry: (entry["year"], int(entry["ctorId"])))
+    return entries
+
+
+# Cytoscape elements for a year range (version 1 /graph payload)
+def to_cytoscape_data(
+    driver_by_id: dict[int, Driver],
+    ctor_by_id: dict[int, Ctor],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair],
+    year_index: YearIndex,
+    min_year: int = 0,
+    max_year: int = 9999,
+    graph_metrics: GraphMetrics | None = None,
+    positions: dict[int, tuple[float, float]] | None = None,
+) -> dict[str, list[dict]]:
+    # only drivers (with teammates) active in the year range are looked at,
+    # and only edges with both drivers in the year range are kept
+    driver_ids, driver_pair_ids = year_index.graph_ids(driver_by_id, min_year, max_year)
+    nodes = [
+        {"data": driver_node_data(driver_by_id[id], ctor_by_id)} for id in driver_ids
+    ]
+    # centrality is over the full history graph, not just the year range
+    if graph_metrics is not None:
+        for node, id in zip(nodes, driver_ids):
+            node["data"].update(graph_metrics.node_metrics(id))
+    # preset positions from the server-side layout (see graph_layout.py)
+    if positions:
+        for node, id in zip(nodes, driver_ids):
+            node["position"] = position_data(positions[id])
+    edges = [
+        {"data": pair_edge_data(driver_pair_by_id[driver_pair_id], ctor_by_id)}
+        for driver_pair_id in driver_pair_ids
+    ]
+
+    # Order the nodes from newest to oldest
+    #   - This is to fix a label chaching issue, where the last nodes in the list dont get their labels chached
+    #   - This was causing their labels to flicker. For now, put old nodes to end of list
+    #   - TODO: Come up with better solution, so that no labels flicker
+    nodes.sort(
+        key=lambda node: min(node["data"]["yearsByCtor"][0]["years"]), reverse=True
+    )
+    return {"nodes": nodes, "edges": edges}
+
+
+# Cytoscape element position, rounded as sub-pixel precision is not drawn anyway
+def position_data(position: tuple[float, float]) -> dict[str, float]:
+    return {"x": round(position[0], 1), "y": round(position[1], 1)}
+
+
+# ctor with the most years in range, ties go to the later ctor
+#   - same rule as getMostCommonCtorId in DriverGraph.tsx
+def most_common_ctor_id(
+    years_by_ctor: list[YearsByCtorEntry], min_year: int = 0, max_year: int = 9999
+) -> str:
+    ctor_id, max_count = "0", -1
+    for entry in reversed(years_by_ctor):
+        count = sum(1 for year in entry["years"] if min_year <= year <= max_year)
+        if count > max_count:
+            ctor_id, max_count = entry["ctorId"], count
+    return ctor_id
+
+
+# Lightweight graph for first paint: ids, codename, display ctor and edges only
+#   - details are fetched per driver / pair (see to_driver_detail, to_pair_detail)
+def to_skeleton_data(
+    driver_by_id: dict[int, Driver],
+    ctor_by_id: dict[int, Ctor],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair],
+    year_index: YearIndex,
+    min_year: int = 0,
+    max_year: int = 9999,
+    positions: dict[int, tuple[float, float]] | None = None,
+) -> dict[str, list]:
+    driver_ids, driver_pair_ids = year_index.graph_ids(driver_by_id, min_year, max_year)
+
+    nodes = []
+    for driver_id in driver_ids:
+        driver: Driver = driver_by_id[driver_id]
+        years_by_ctor = [
+            {"ctorId": str(ctor_id), "years": years}
+            for ctor_id, years in sorted(
+                driver.years_by_ctor.items(), key=lambda item: min(item[1])
+            )
+        ]
+        nodes.append(
+            {
+                "data": {
+                    "id": str(driver_id),
+                    "codename": driver.codename,
+                    "displayCtorId": most_common_ctor_id(
+                        years_by_ctor, min_year, max_year
+                    ),
+                    "raceCount": len(driver.race_ids),
+                    "firstYear": min(driver.years_active),
+                }
+            }
+        )
+        if positions:
+            nodes[-1]["position"] = position_data(positions[driver_id])
+
+    edges = []
+    for driver_pair_id in driver_pair_ids:
+        driver_pair: DriverPair = driver_pair_by_id[driver_pair_id]
+        years_by_ctor = [
+            {"ctorId": str(ctor_id), "years": years}
+            for ctor_id, years in sorted(
+                driver_pair.years_by_ctor.items(), key=lambda item: max(item[1])
+            )
+        ]
+        edges.append(
+            {
+                "data": {
+                    "source": str(driver_pair.driver_id_1),
+                    "target": str(driver_pair.driver_id_2),
+                    "displayCtorId": most_common_ctor_id(
+                        years_by_ctor, min_year, max_year
+                    ),
+                }
+            }
+        )
+
+    # newest to oldest, same as to_cytoscape_data
+    nodes.sort(key=lambda node: node["data"]["firstYear"], reverse=True)
+    return {"nodes": nodes, "edges": edges}
+
+
+# races resolved through race_by_id, oldest first
+def race_list(race_ids: set[int], race_by_id: dict[int, Race]) -> list[dict]:
+    return [
+        {
+            "raceId": race.race_id,
+            "year": race.year,
+            "name": race.name,
+            "date": race.date.isoformat(),
+        }
+        for race in sorted(
+            (race_by_id[race_id] for race_id in race_ids), key=lambda race: race.date
+        )
+    ]
+
+
+def to_driver_detail(
+    driver: Driver, ctor_by_id: dict[int, Ctor], race_by_id: dict[int, Race]
+) -> dict:
+    return {
+        **driver_node_data(driver, ctor_by_id),
+        "driverRef": driver.driver_ref,
+        "number": driver.number,
+        "nationality": driver.nationality,
+        "dob": driver.dob.isoformat(),
+        "races": race_list(driver.race_ids, race_by_id),
+    }
+
+
+def to_pair_detail(
+    driver_pair: DriverPair,
+    driver_by_id: dict[int, Driver],
+    ctor_by_id: dict[int, Ctor],
+    race_by_id: dict[int, Race],
+) -> dict:
+    return {
+        **pair_edge_data(driver_pair, ctor_by_id),
+        "sourceName": str(driver_by_id[driver_pair.driver_id_1]),
+        "targetName": str(driver_by_id[driver_pair.driver_id_2]),
+        "raceCount": len(driver_pair.race_ids),
+        "races": race_list(driver_pair.race_ids, race_by_id),
+    }
@@ -0,0 +1,297 @@
+import csv
+import re
+from itertools import combinations
+from columnar import NULL, QualifyingColumns, ResultColumns, as_numpy
+from data_types import DriverPair, HeadToHead
+
+try:
+    import numpy as np
+except ImportError:  # optional, populate_head_to_head loops over the rows without it
+    np = None
+
+# outcome of a result, by its status in status.csv
+FINISHED = "finished"  # "Finished" or "+N Laps"
+DNF = "dnf"  # retired, accident, not classified, ...
+NOT_STARTED = "not_started"  # never took the start, not a DNF
+DISQUALIFIED = "disqualified"  # not a DNF either
+
+LAPPED_STATUS = re.compile(r"\+\d+ Laps?")
+NOT_STARTED_STATUSES = {
+    "Did not start",
+    "Did not qualify",
+    "Did not prequalify",
+    "107% Rule",
+    "Withdrew",
+}
+DISQUALIFIED_STATUSES = {"Disqualified", "Excluded"}
+
+
+def status_outcome(status: str) -> str:
+    if status == "Finished" or LAPPED_STATUS.fullmatch(status):
+        return FINISHED
+    if status in NOT_STARTED_STATUSES:
+        return NOT_STARTED
+    if status in DISQUALIFIED_STATUSES:
+        return DISQUALIFIED
+    return DNF
+
+
+def load_status_outcomes(file_path: str) -> dict[int, str]:
+    with open(file_path, newline="", encoding="utf-8") as f:
+        return {
+            int(row["statusId"]): status_outcome(row["status"])
+            for row in csv.DictReader(f)
+        }
+
+
+def populate_head_to_head(
+    results: ResultColumns,
+    qualifying: QualifyingColumns,
+    year_by_race_id: dict[int, int],
+    status_outcome_by_id: dict[int, str],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair],
+) -> None:
+    """
+    Adds race / qualifying head-to-heads, points and DNFs to the driver pairs.
+
+    One pass over the results table groups each driver's results by race and
+    ctor, then every pairing in a group is compared (same groups as
+    pair_drivers). Counts are added to what the pairs already hold, so new races
+    can be folded in on ingestion. Results without a status (ingested rows) count
+    as started and not retired.
+
+    With numpy installed the grouping and comparisons run over whole columns,
+    and only the per pair, ctor and year totals are added in Python. Both paths
+    fill the pairs in the same order, points may differ in the last bit.
+    """
+    if np is not None:
+        _populate_head_to_head_numpy(
+            results, qualifying, year_by_race_id, status_outcome_by_id, driver_pair_by_id
+        )
+        return
+
+    qualifying_position: dict[tuple[int, int], int] = {}
+    for race_id, driver_id, position in zip(
+        qualifying.race_id, qualifying.driver_id, qualifying.position
+    ):
+        if position != NULL:
+            qualifying_position[race_id, driver_id] = position
+
+    # race_id -> ctor_id -> driver_id -> [best position, points, started, finished]
+    #   - a driver can have more than one result for a ctor in a race (shared drives)
+    entries_by_ctor_by_race: dict[int, dict[int, dict[int, list]]] = {}
+    for race_id, ctor_id, driver_id, position, points, status_id in zip(
+        results.race_id,
+        results.constructor_id,
+        results.driver_id,
+        results.position,
+        results.points,
+        results.status_id,
+    ):
+        entry = (
+            entries_by_ctor_by_race.setdefault(race_id, {})
+            .setdefault(ctor_id, {})
+            .setdefault(driver_id, [NULL, 0.0, False, False])
+        )
+        if position != NULL and (entry[0] == NULL or position < entry[0]):
+            entry[0] = position
+        entry[1] += points
+        outcome = status_outcome_by_id.get(status_id)
+        if outcome != NOT_STARTED:
+            entry[2] = True
+            if outcome != DNF:
+                entry[3] = True
+
+    for race_id, entries_by_ctor in entries_by_ctor_by_race.items():
+        year = year_by_race_id[race_id]
+        for ctor_id, entry_by_driver in entries_by_ctor.items():
+            for driver_pair_id in combinations(sorted(entry_by_driver), 2):
+                head_to_head: HeadToHead = (
+                    driver_pair_by_id[driver_pair_id]
+                    .head_to_head_by_year_by_ctor.setdefault(ctor_id, {})
+                    .setdefault(year, HeadToHead())
+                )
+                entries = [entry_by_driver[driver_id] for driver_id in driver_pair_id]
+                for i, (_, points, started, finished) in enumerate(entries):
+                    head_to_head.points[i] += points
+                    if started and not finished:
+                        head_to_head.dnfs[i] += 1
+
+                if entries[0][2] and entries[1][2]:
+                    head_to_head.races += 1
+                    ahead = _ahead(entries[0][0], entries[1][0])
+                    if ahead is not None:
+                        head_to_head.race_ahead[ahead] += 1
+
+                # only compared when both drivers have a qualifying result
+                positions = [
+                    qualifying_position.get((race_id, driver_id), NULL)
+                    for driver_id in driver_pair_id
+                ]
+                if NULL not in positions:
+                    ahead = _ahead(*positions)
+                    if ahead is not None:
+                        head_to_head.qualifying_ahead[ahead] += 1
+
+
+# populate_head_to_head over numpy columns
+#   - results are grouped into entries (race, ctor, driver) in the order the loop meets
+#     them: races and ctors by their first result, drivers ascending
+#   - pairs are the combinations within a (race, ctor), found by comparing each entry with
+#     the k-th next one for k = 1, 2, ... until no group is that large
+#   - totals per (pair, ctor, year) are added in order of their first race, so the dicts
+#     on the pairs are filled in the loop's order
+def _populate_head_to_head_numpy(
+    results: ResultColumns,
+    qualifying: QualifyingColumns,
+    year_by_race_id: dict[int, int],
+    status_outcome_by_id: dict[int, str],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair],
+) -> None:
+    if not len(results):
+        return
+    race_ids = as_numpy(results.race_id)
+    ctor_ids = as_numpy(results.constructor_id)
+    driver_ids = as_numpy(results.driver_id)
+
+    # outcomes by statusId + 1, so NULL (and statuses not in status.csv) count as finished
+    status_ids = as_numpy(results.status_id) + 1
+    size = max(max(status_outcome_by_id, default=0) + 1, int(status_ids.max())) + 1
+    started_by_status = np.ones(size, dtype=bool)
+    finished_by_status = np.ones(size, dtype=bool)
+    for status_id, outcome in status_outcome_by_id.items():
+        started_by_status[status_id + 1] = outcome != NOT_STARTED
+        finished_by_status[status_id + 1] = outcome not in (NOT_STARTED, DNF)
+
+    _, race_first, race_inverse = np.unique(
+        race_ids, return_index=True, return_inverse=True
+    )
+    _, group_first, group_inverse = np.unique(
+        (race_ids << 32) | ctor_ids, return_index=True, return_inverse=True
+    )
+    groups = group_first[group_inverse]  # a (race, ctor) by its first result
+    order = np.lexsort((driver_ids, groups, race_first[race_inverse]))
+    starts = _starts(groups[order], driver_ids[order])
+
+    unclassified = np.iinfo(np.int64).max
+    positions = as_numpy(results.position)[order]
+    best_position = np.minimum.reduceat(
+        np.where(positions == NULL, unclassified, positions), starts
+    )
+    best_position[best_position == unclassified] = NULL
+    points = np.add.reduceat(np.frombuffer(results.points, dtype=np.float64)[order], starts)
+    started = np.logical_or.reduceat(started_by_status[status_ids[order]], starts)
+    finished = np.logical_or.reduceat(finished_by_status[status_ids[order]], starts)
+    entry_group = groups[order][starts]
+    entry_race = race_ids[order][starts]
+    entry_ctor = ctor_ids[order][starts]
+    entry_driver = driver_ids[order][starts]
+
+    firsts, seconds = [], []
+    for k in range(1, len(starts)):
+        index = np.flatnonzero(entry_group[:-k] == entry_group[k:])
+        if not len(index):
+            break
+        firsts.append(index)
+        seconds.append(index + k)
+    if not firsts:
+        return
+    first, second = np.concatenate(firsts), np.concatenate(seconds)
+    pair_order = np.lexsort((second, first))  # the loop's combinations() order
+    first, second = first[pair_order], second[pair_order]
+
+    both_started = started[first] & started[second]
+    race_ahead = _ahead_numpy(best_position[first], best_position[second]) & both_started
+    qualifying_position = _qualifying_lookup(qualifying)
+    positions1 = qualifying_position(entry_race[first], entry_driver[first])
+    positions2 = qualifying_position(entry_race[second], entry_driver[second])
+    qualifying_ahead = _ahead_numpy(positions1, positions2) & (
+        (positions1 != NULL) & (positions2 != NULL)
+    )
+    years = np.array(
+        [year_by_race_id[race_id] for race_id in entry_race[first].tolist()],
+        dtype=np.int64,
+    )
+
+    keys = (entry_driver[first], entry_driver[second], entry_ctor[first], years)
+    total_order = np.lexsort(keys[::-1])  # stable, a total's first pair stays first
+    total_starts = _starts(*(key[total_order] for key in keys))
+    heads = [key[total_order][total_starts].tolist() for key in keys]
+    totals = [
+        np.add.reduceat(column[total_order], total_starts).tolist()
+        for column in (
+            both_started.astype(np.int64),
+            *race_ahead.astype(np.int64),
+            *qualifying_ahead.astype(np.int64),
+            points[first],
+            points[second],
+            (started[first] & ~finished[first]).astype(np.int64),
+            (started[second] & ~finished[second]).astype(np.int64),
+        )
+    ]
+    for i in np.argsort(total_order[total_starts]).tolist():
+        driver_id1, driver_id2, ctor_id, year = (head[i] for head in heads)
+        races, ahead1, ahead2, q_ahead1, q_ahead2, points1, points2, dnfs1, dnfs2 = (
+            total[i] for total in totals
+        )
+        head_to_head: HeadToHead = (
+            driver_pair_by_id[driver_id1, driver_id2]
+            .head_to_head_by_year_by_ctor.setdefault(ctor_id, {})
+            .setdefault(year, HeadToHead())
+        )
+        head_to_head.races += races
+        head_to_head.race_ahead[0] += ahead1
+        head_to_head.race_ahead[1] += ahead2
+        head_to_head.qualifying_ahead[0] += q_ahead1
+        head_to_head.qualifying_ahead[1] += q_ahead2
+        head_to_head.points[0] += points1
+        head_to_head.points[1] += points2
+        head_to_head.dnfs[0] += dnfs1
+        head_to_head.dnfs[1] += dnfs2
+
+
+# indexes where any of the (sorted) key columns changes, the first included
+def _starts(*keys: "np.ndarray") -> "np.ndarray":
+    changed = np.zeros(len(keys[0]) - 1, dtype=bool)
+    for key in keys:
+        changed |= key[1:] != key[:-1]
+    return np.flatnonzero(np.r_[True, changed])
+
+
+# vectorized (race_id, driver_id) -> qualifying position, NULL if there is none
+#   - like the loop's dict, the last row of a (race, driver) wins
+def _qualifying_lookup(qualifying: QualifyingColumns):
+    positions = as_numpy(qualifying.position)
+    classified = positions != NULL
+    keys = ((as_numpy(qualifying.race_id) << 32) | as_numpy(qualifying.driver_id))[
+        classified
+    ]
+    keys, last = np.unique(keys[::-1], return_index=True)
+    # a key past the end, or not found, lands on the padding
+    padded_keys = np.r_[keys, -1]
+    padded_positions = np.r_[positions[classified][::-1][last], NULL]
+
+    def lookup(race_ids: "np.ndarray", driver_ids: "np.ndarray") -> "np.ndarray":
+        key = (race_ids << 32) | driver_ids
+        found = np.searchsorted(keys, key)
+        return np.where(padded_keys[found] == key, padded_positions[found], NULL)
+
+    return lookup
+
+
+# _ahead over position columns, as (first ahead, second ahead) masks
+def _ahead_numpy(positions1: "np.ndarray", positions2: "np.ndarray") -> "np.ndarray":
+    differ = positions1 != positions2
+    first = differ & (
+        (positions2 == NULL) | ((positions1 != NULL) & (positions1 < positions2))
+    )
+    return np.stack((first, differ & ~first))
+
+
+# index of the better of two positions, a classified driver beats an unclassified one
+def _ahead(position1: int, position2: int) -> int | None:
+    if position1 == position2:  # both NULL (or a shared drive)
+        return None
+    if position2 == NULL or (position1 != NULL and position1 < position2):
+        return 0
+    return 1
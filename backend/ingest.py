@@ -0,0 +1,672 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator, TextIO
+
+NULL = r"\N"
+
+# column order of the CSVs, matches the rows built below
+RACE_HEADER = [
+    "raceId", "year", "round", "circuitId", "name", "date", "time", "url",
+    "fp1_date", "fp1_time", "fp2_date", "fp2_time", "fp3_date", "fp3_time",
+    "quali_date", "quali_time", "sprint_date", "sprint_time",
+]  # fmt: skip
+RESULT_HEADER = [
+    "resultId", "raceId", "driverId", "constructorId", "number", "grid",
+    "position", "positionText", "positionOrder", "points", "laps", "time",
+    "milliseconds", "fastestLap", "rank", "fastestLapTime", "fastestLapSpeed",
+    "statusId",
+]  # fmt: skip
+SPRINT_RESULT_HEADER = [
+    "resultId", "raceId", "driverId", "constructorId", "number", "grid",
+    "position", "positionText", "positionOrder", "points", "laps", "time",
+    "milliseconds", "fastestLap", "fastestLapTime", "statusId",
+]  # fmt: skip
+QUALIFYING_HEADER = [
+    "qualifyId", "raceId", "driverId", "constructorId", "number", "position",
+    "q1", "q2", "q3",
+]  # fmt: skip
+DRIVER_HEADER = [
+    "driverId", "driverRef", "number", "code", "forename", "surname", "dob",
+    "nationality", "url",
+]  # fmt: skip
+CTOR_HEADER = [
+    "constructorId", "constructorRef", "name", "nationality", "url",
+    "colorPrimary", "colorSecondary",
+]  # fmt: skip
+
+# Ergast sessions, in the order of the race CSV's date / time column pairs
+SESSIONS = ["FirstPractice", "SecondPractice", "ThirdPractice", "Qualifying", "Sprint"]
+# Driver fields needed to add a driver that is not in drivers.csv yet
+NEW_DRIVER_FIELDS = ["givenName", "familyName", "dateOfBirth", "nationality"]
+
+
+# Streams a race CSV for its max raceId and the raceId of each (season, round) present
+def read_race_csv_state(race_csv_path: str) -> tuple[int, dict[tuple[int, int], int]]:
+    max_race_id = 0
+    race_id_by_round: dict[tuple[int, int], int] = {}
+    with open(race_csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        year, round = header.index("year"), header.index("round")
+        for row in reader:
+            if row[0].isdigit():
+                max_race_id = max(max_race_id, int(row[0]))
+                race_id_by_round[int(row[year]), int(row[round])] = int(row[0])
+    return max_race_id, race_id_by_round
+
+
+# Streams a result / qualifying CSV for its max id and the raceIds it has rows for,
+# without holding the rows in memory
+def read_result_csv_state(result_csv_path: str) -> tuple[int, set[int]]:
+    max_id = 0
+    race_ids: set[int] = set()
+    with open(result_csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        next(reader)
+        for row in reader:
+            if row[0].isdigit():
+                max_id = max(max_id, int(row[0]))
+                race_ids.add(int(row[1]))
+    return max_id, race_ids
+
+
+# Reads which results each race already has in a result CSV, as
+# raceId -> ({(driverId, constructorId, positionOrder)}, most laps completed)
+#   - the key is result_key's, with ids in place of refs
+def read_result_keys(result_csv_path: str) -> dict[int, tuple[set[tuple], int]]:
+    keys_by_race_id: dict[int, tuple[set[tuple], int]] = {}
+    with open(result_csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        driver, ctor, position_order, laps = map(
+            header.index, ("driverId", "constructorId", "positionOrder", "laps")
+        )
+        for row in reader:
+            if not row or not row[0].isdigit():
+                continue
+            keys, leader_laps = keys_by_race_id.get(int(row[1]), (set(), 0))
+            keys.add((int(row[driver]), int(row[ctor]), int(row[position_order])))
+            if row[laps].isdigit():
+                leader_laps = max(leader_laps, int(row[laps]))
+            keys_by_race_id[int(row[1])] = keys, leader_laps
+    return keys_by_race_id
+
+
+def append_rows(csv_path: str, rows: list[list]) -> None:
+    if not rows:
+        return
+    with open_for_append(csv_path) as f:
+        csv.writer(f).writerows(rows)
+
+
+@contextmanager
+def open_for_append(csv_path: str) -> Iterator[TextIO]:
+    with open(csv_path, "a", newline="", encoding="utf-8") as f:
+        # some of the source CSVs have no line break after their last row
+        if f.tell() and not ends_with_newline(csv_path):
+            f.write("\n")
+        yield f
+
+
+def ends_with_newline(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+# Reads a ref -> id mapping (e.g. driverRef -> driverId) from a CSV
+def read_ref_ids(csv_path: str, id_column: str, ref_column: str) -> dict[str, int]:
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        return {row[ref_column]: int(row[id_column]) for row in csv.DictReader(f)}
+
+
+class RefTables:
+    """
+    Ref -> id lookups for ingestion: drivers, ctors, statuses and circuits.
+
+    Drivers and ctors missing from the CSVs (e.g. rookies) are added from the
+    Driver / Constructor objects Ergast embeds in every result, and statuses
+    missing from status.csv get the next statusId. The rows for those are kept
+    in new_rows until append_new_rows writes them.
+    """
+
+    def __init__(
+        self,
+        driver_id_by_ref: dict[str, int],
+        ctor_id_by_ref: dict[str, int],
+        status_id_by_status: dict[str, int],
+        circuit_id_by_ref: dict[str, int] | None = None,
+    ):
+        self.driver_id_by_ref = dict(driver_id_by_ref)
+        self.ctor_id_by_ref = dict(ctor_id_by_ref)
+        self.status_id_by_status = dict(status_id_by_status)
+        self.circuit_id_by_ref = circuit_id_by_ref or {}
+        self.new_rows: dict[str, list[list]] = {"drivers": [], "ctors": [], "statuses": []}
+
+    @classmethod
+    def from_csvs(cls, data_dir: str = "data") -> "RefTables":
+        return cls(
+            read_ref_ids(f"{data_dir}/drivers.csv", "driverId", "driverRef"),
+            read_ref_ids(f"{data_dir}/constructors.csv", "constructorId", "constructorRef"),
+            read_ref_ids(f"{data_dir}/status.csv", "statusId", "status"),
+            read_ref_ids(f"{data_dir}/circuits.csv", "circuitId", "circuitRef"),
+        )
+
+    # why a result's driver / ctor can't be resolved, None if it can
+    def unresolvable(self, result: dict) -> str | None:
+        driver = result.get("Driver") or {}
+        if driver.get("driverId") not in self.driver_id_by_ref:
+            missing = [key for key in NEW_DRIVER_FIELDS if not driver.get(key)]
+            if missing:
+                return f"unknown driver '{driver.get('driverId')}' without {', '.join(missing)}"
+        ctor = result.get("Constructor") or {}
+        if ctor.get("constructorId") not in self.ctor_id_by_ref and not ctor.get("name"):
+            return f"unknown constructor '{ctor.get('constructorId')}' without a name"
+        return None
+
+    def driver_id(self, driver: dict) -> int:
+        ref = driver["driverId"]
+        if ref not in self.driver_id_by_ref:
+            driver_id = max(self.driver_id_by_ref.values(), default=0) + 1
+            self.driver_id_by_ref[ref] = driver_id
+            self.new_rows["drivers"].append(
+                [
+                    driver_id,
+                    ref,
+                    driver.get("permanentNumber", NULL),
+                    driver.get("code", NULL),
+                    driver["givenName"],
+                    driver["familyName"],
+                    driver["dateOfBirth"],
+                    driver["nationality"],
+                    driver.get("url", NULL),
+                ]
+            )
+        return self.driver_id_by_ref[ref]
+
+    def ctor_id(self, ctor: dict) -> int:
+        ref = ctor["constructorId"]
+        if ref not in self.ctor_id_by_ref:
+            ctor_id = max(self.ctor_id_by_ref.values(), default=0) + 1
+            self.ctor_id_by_ref[ref] = ctor_id
+            # no colours yet, the frontend falls back to grey
+            self.new_rows["ctors"].append(
+                [
+                    ctor_id,
+                    ref,
+                    ctor["name"],
+                    ctor.get("nationality", NULL),
+                    ctor.get("url", NULL),
+                    "",
+                    "",
+                ]
+            )
+        return self.ctor_id_by_ref[ref]
+
+    # Ergast has said "Lapped" since 2024, status.csv has "+N Lap(s)"
+    def status_id(self, status: str, laps_behind: int | None = None) -> int:
+        if status == "Lapped" and laps_behind:
+            status = f"+{laps_behind} Lap{'s' if laps_behind > 1 else ''}"
+        if status not in self.status_id_by_status:
+            status_id = max(self.status_id_by_status.values(), default=0) + 1
+            self.status_id_by_status[status] = status_id
+            self.new_rows["statuses"].append([status_id, status])
+        return self.status_id_by_status[status]
+
+    def circuit_id(self, circuit: dict | None) -> int | str:
+        return self.circuit_id_by_ref.get((circuit or {}).get("circuitId"), NULL)
+
+    def append_new_rows(self, driver_csv_path: str, ctor_csv_path: str, status_csv_path: str):
+        append_rows(driver_csv_path, self.new_rows["drivers"])
+        append_rows(ctor_csv_path, self.new_rows["ctors"])
+        append_rows(status_csv_path, self.new_rows["statuses"])
+        self.new_rows = {"drivers": [], "ctors": [], "statuses": []}
+
+
+def is_int(value) -> bool:
+    return isinstance(value, str) and value.lstrip("-").isdigit()
+
+
+def is_number(value) -> bool:
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+# Problems that keep a race from being ingested, an empty list if there are none
+#   - every result needs a resolvable driver / ctor and numeric fields that parse
+#   - positions can repeat (shared drives before 1958), a driver in the same car can't
+def validate_race(race: dict, refs: RefTables) -> list[str]:
+    issues = []
+    for key in ("season", "round"):
+        if not is_int(race.get(key)):
+            issues.append(f"{key} is {race.get(key)!r}, not a number")
+    if not race.get("raceName") or not race.get("date"):
+        issues.append("no raceName / date")
+
+    for section, int_fields in (
+        ("Results", ("position", "grid", "laps")),
+        ("SprintResults", ("position", "grid", "laps")),
+        ("QualifyingResults", ("position",)),
+    ):
+        entries = set()
+        for result in race.get(section, []):
+            problem = refs.unresolvable(result)
+            if problem:
+                issues.append(f"{section}: {problem}")
+                continue
+            ref = result["Driver"]["driverId"]
+            for key in int_fields:
+                if not is_int(result.get(key)):
+                    issues.append(f"{section}: {ref} has {key} {result.get(key)!r}")
+            if "points" in result and not is_number(result["points"]):
+                issues.append(f"{section}: {ref} has points {result['points']!r}")
+            entry = ref, result.get("number")
+            if entry in entries:
+                issues.append(f"{section}: {ref} is listed twice in car {entry[1]}")
+            entries.add(entry)
+    return issues
+
+
+# Builds the race row for one Ergast race
+def race_row(race: dict, race_id: int, refs: RefTables) -> list:
+    return [
+        race_id,
+        race["season"],
+        race["round"],
+        refs.circuit_id(race.get("Circuit")),
+        race["raceName"],
+        race["date"],
+        race.get("time", NULL),
+        race.get("url", NULL),
+        *(
+            (race.get(session) or {}).get(key, NULL)
+            for session in SESSIONS
+            for key in ("date", "time")
+        ),
+    ]
+
+
+# Builds the result rows of one Ergast race, or of its sprint (SprintResults)
+#   - position is only set for classified finishers, positionOrder for everyone
+#   - statuses are mapped to status.csv ids, "Lapped" by the laps behind the winner
+#     (leader_laps, for the tail of a race whose winner is already in the CSV)
+def result_rows(
+    race: dict,
+    race_id: int,
+    result_id: int,
+    refs: RefTables,
+    section: str = "Results",
+    leader_laps: int = 0,
+) -> list[list]:
+    results = sorted(race.get(section, []), key=lambda result: int(result["position"]))
+    leader_laps = max([leader_laps, *(int(result["laps"]) for result in results)])
+
+    rows = []
+    for result in results:
+        result_id += 1
+        fastest_lap = result.get("FastestLap") or {}
+        race_time = result.get("Time") or {}
+        row = [
+            result_id,
+            race_id,
+            refs.driver_id(result["Driver"]),
+            refs.ctor_id(result["Constructor"]),
+            result.get("number", NULL),
+            result["grid"],
+            result["position"] if result.get("positionText", "").isdigit() else NULL,
+            result.get("positionText", result["position"]),
+            result["position"],
+            result.get("points", "0"),
+            result["laps"],
+            race_time.get("time", NULL),
+            race_time.get("millis", NULL),
+            fastest_lap.get("lap", NULL),
+            fastest_lap.get("rank", NULL),
+            (fastest_lap.get("Time") or {}).get("time", NULL),
+            (fastest_lap.get("AverageSpeed") or {}).get("speed", NULL),
+            (
+                refs.status_id(result["status"], leader_laps - int(result["laps"]))
+                if result.get("status")
+                else NULL
+            ),
+        ]
+        if section == "SprintResults":
+            del row[16], row[14]  # no rank / fastestLapSpeed columns
+        rows.append(row)
+    return rows
+
+
+# Builds the qualifying rows of one Ergast race (QualifyingResults)
+def qualifying_rows(
+    race: dict, race_id: int, qualify_id: int, refs: RefTables
+) -> list[list]:
+    rows = []
+    for result in sorted(
+        race.get("QualifyingResults", []), key=lambda result: int(result["position"])
+    ):
+        qualify_id += 1
+        rows.append(
+            [
+                qualify_id,
+                race_id,
+                refs.driver_id(result["Driver"]),
+                refs.ctor_id(result["Constructor"]),
+                result.get("number", NULL),
+                result["position"],
+                result.get("Q1", NULL),
+                result.get("Q2", NULL),
+                result.get("Q3", NULL),
+            ]
+        )
+    return rows
+
+
+# Yields (race row, result rows) for every race not already in the race CSV
+#   - a race whose (season, round) is already in the race CSV yields (None, result rows)
+#     with only the results it does not have yet: the tail of a race split across two
+#     result pages, posted after the page with its head. Re-ingesting is a no-op
+#   - ids continue from the max ids in the CSVs
+#   - raises ValueError for a race that does not validate (see validate_race)
+def iter_new_rows(
+    races: Iterable[dict],
+    race_csv_path: str,
+    result_csv_path: str,
+    refs: RefTables,
+) -> Iterator[tuple[list | None, list[list]]]:
+    race_id, race_id_by_round = read_race_csv_state(race_csv_path)
+    result_id, _ = read_result_csv_state(result_csv_path)
+    # results of every race so far, those in the CSV read on the first race already in it
+    keys_by_race_id: dict[int, tuple[set[tuple], int]] = {}
+    read_keys = False
+
+    for race in races:
+        issues = validate_race(race, refs)
+        if issues:
+            raise ValueError(
+                f"{race.get('season')} round {race.get('round')}: {'; '.join(issues)}"
+            )
+        round_key = int(race["season"]), int(race["round"])
+        if round_key in race_id_by_round:
+            if not read_keys:
+                keys_by_race_id.update(read_result_keys(result_csv_path))
+                read_keys = True
+            existing_id = race_id_by_round[round_key]
+            keys, leader_laps = keys_by_race_id.setdefault(existing_id, (set(), 0))
+            results = [
+                result
+                for result in race.get("Results", [])
+                if (
+                    refs.driver_id_by_ref.get(result["Driver"]["driverId"]),
+                    refs.ctor_id_by_ref.get(result["Constructor"]["constructorId"]),
+                    int(result["position"]),
+                )
+                not in keys
+            ]
+            if results:
+                rows = result_rows(
+                    {"Results": results}, existing_id, result_id, refs, leader_laps=leader_laps
+                )
+                result_id += len(rows)
+                keys.update((row[2], row[3], int(row[8])) for row in rows)
+                yield None, rows
+            continue
+
+        race_id += 1
+        race_id_by_round[round_key] = race_id
+        rows = result_rows(race, race_id, result_id, refs)
+        result_id += len(rows)
+        keys_by_race_id[race_id] = (
+            {(row[2], row[3], int(row[8])) for row in rows},
+            max((int(row[10]) for row in rows), default=0),
+        )
+        yield race_row(race, race_id, refs), rows
+
+
+# Takes result JSON and appends its races / results to the race/result CSVs
+#   - returns the appended race and result rows, results can be for races already in the
+#     race CSV (see iter_new_rows)
+#   - drivers / ctors / statuses it added are left in refs.new_rows for the caller
+def process_races_json(
+    races_json: dict,
+    race_csv_path: str,
+    result_csv_path: str,
+    refs: RefTables,
+) -> tuple[list[list], list[list]]:
+    new_race_rows = []
+    new_result_rows = []
+    for race, results in iter_new_rows(
+        races_json["MRData"]["RaceTable"]["Races"],
+        race_csv_path,
+        result_csv_path,
+        refs,
+    ):
+        if race is not None:
+            new_race_rows.append(race)
+        new_result_rows.extend(results)
+
+    # Append only the new rows, the existing history is never rewritten
+    append_rows(race_csv_path, new_race_rows)
+    append_rows(result_csv_path, new_result_rows)
+
+    return new_race_rows, new_result_rows
+
+
+def process_new_json(
+    json_path: str,
+    race_csv_path: str,
+    result_csv_path: str,
+    refs: RefTables,
+) -> tuple[list[list], list[list]]:
+    with open(json_path, encoding="utf-8") as f:
+        races_json = json.load(f)
+    return process_races_json(races_json, race_csv_path, result_csv_path, refs)
+
+
+## STREAMING INGESTION ##
+
+
+class _StreamReader:
+    """Chunked text buffer over a file, for scanning and decoding JSON incrementally."""
+
+    def __init__(self, f: TextIO, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk  # drop what was consumed
+        self.pos = 0
+        return True
+
+    def next_char(self) -> str:
+        if self.pos >= len(self.buffer) and not self.fill():
+            raise ValueError("unexpected end of JSON stream")
+        c = self.buffer[self.pos]
+        self.pos += 1
+        return c
+
+    def next_token(self) -> str:
+        c = self.next_char()
+        while c.isspace():
+            c = self.next_char()
+        return c
+
+
+# Yields the items of the first array stored under `key`, one at a time
+#   - only the item being decoded is held in memory, not the whole document
+#   - items are expected to be objects (as Ergast's Races[] are)
+def iter_json_array(f: TextIO, key: str, chunk_size: int = 1 << 16) -> Iterator[dict]:
+    reader = _StreamReader(f, chunk_size)
+
+    # scan string tokens until one is used as `key` and holds an array
+    while True:
+        if reader.next_char() != '"':
+            continue
+        chars = []
+        c = reader.next_char()
+        while c != '"':
+            if c == "\\":
+                chars.append(c)
+                c = reader.next_char()
+            chars.append(c)
+            c = reader.next_char()
+        if "".join(chars) != key or reader.next_token() != ":":
+            continue
+        if reader.next_token() == "[":
+            break
+
+    decoder = json.JSONDecoder()
+    while True:
+        c = reader.next_token()
+        if c == "]":
+            return
+        if c == ",":
+            continue
+        reader.pos -= 1  # give the item's first char back to the decoder
+        while True:
+            try:
+                item, end = decoder.raw_decode(reader.buffer, reader.pos)
+                break
+            except json.JSONDecodeError:
+                if not reader.fill():  # item is split across chunks, or truly invalid
+                    raise
+        reader.pos = end
+        yield item
+
+
+def result_key(result: dict) -> tuple:
+    return (
+        result.get("Driver", {}).get("driverId"),
+        result.get("Constructor", {}).get("constructorId"),
+        result.get("position"),
+    )
+
+
+# Yields the races of several paginated result files as one stream
+#   - a race split across two pages is merged back into one
+#   - races repeated by a later page (overlapping offsets) are dropped
+def iter_races(json_paths: Iterable[str]) -> Iterator[dict]:
+    current: dict | None = None
+    emitted: set[tuple[str, str]] = set()
+
+    for json_path in json_paths:
+        with open(json_path, encoding="utf-8") as f:
+            for race in iter_json_array(f, "Races"):
+                round_key = race.get("season"), race.get("round")
+                if current is not None:
+                    if round_key == (current.get("season"), current.get("round")):
+                        seen = {result_key(result) for result in current["Results"]}
+                        current["Results"].extend(
+                            result
+                            for result in race.get("Results", [])
+                            if result_key(result) not in seen
+                        )
+                        continue
+                    emitted.add((current.get("season"), current.get("round")))
+                    yield current
+                    current = None
+                if round_key not in emitted:
+                    current = race
+
+    if current is not None:
+        yield current
+
+
+@dataclass
+class IngestStats:
+    races: int = 0
+    results: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        return (self.races + self.results) / self.seconds if self.seconds else 0.0
+
+
+# Streams paginated result JSON files into the race/result CSVs
+#   - rows are spooled to temporary files race by race, so memory stays bounded by one race
+#   - nothing is written unless every race validates: then the new drivers / ctors /
+#     statuses are appended (ref_csv_paths: drivers, ctors, statuses) and only after them
+#     the spooled rows, so no row ever points at an id that is not written
+def stream_new_json(
+    json_paths: Iterable[str],
+    race_csv_path: str,
+    result_csv_path: str,
+    refs: RefTables,
+    ref_csv_paths: tuple[str, str, str],
+) -> IngestStats:
+    stats = IngestStats()
+    start = time.perf_counter()
+    rows = iter_new_rows(
+        iter_races(json_paths),
+        race_csv_path,
+        result_csv_path,
+        refs,
+    )
+    with (
+        tempfile.TemporaryFile("w+", newline="", encoding="utf-8") as race_spool,
+        tempfile.TemporaryFile("w+", newline="", encoding="utf-8") as result_spool,
+    ):
+        race_writer, result_writer = csv.writer(race_spool), csv.writer(result_spool)
+        for race_row, result_rows in rows:
+            if race_row is not None:
+                race_writer.writerow(race_row)
+                stats.races += 1
+            result_writer.writerows(result_rows)
+            stats.results += len(result_rows)
+
+        refs.append_new_rows(*ref_csv_paths)
+        if stats.races or stats.results:
+            for spool, csv_path in (
+                (race_spool, race_csv_path),
+                (result_spool, result_csv_path),
+            ):
+                spool.seek(0)
+                with open_for_append(csv_path) as f:
+                    shutil.copyfileobj(spool, f)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Stream Ergast / Jolpica result JSON pages into the race/result CSVs"
+    )
+    parser.add_argument("json_paths", nargs="+", help="result pages, in offset order")
+    parser.add_argument("--races", default="data/new_races.csv")
+    parser.add_argument("--results", default="data/new_results.csv")
+    args = parser.parse_args()
+
+    refs = RefTables.from_csvs("data")
+    try:
+        stats = stream_new_json(
+            args.json_paths,
+            args.races,
+            args.results,
+            refs,
+            ("data/drivers.csv", "data/constructors.csv", "data/status.csv"),
+        )
+    except ValueError as e:
+        parser.exit(1, f"Nothing written, invalid race {e}\n")
+    print(
+        f"Appended {stats.races} races and {stats.results} results "
+        f"in {stats.seconds:.3f}s ({stats.rows_per_sec:,.0f} rows/sec)"
+    )
@@ -0,0 +1,177 @@
+# Stage timers, request latency histograms and the Prometheus text exposition for /metrics
+#   - stage(name) times a pipeline / serialization stage, as a with block or a decorator
+#   - with tracemalloc tracing (e.g. PYTHONTRACEMALLOC=1) each stage also records its
+#     allocation peak; stages can nest (an inner stage's peak counts towards the outer
+#     one), stages running at the same time in other threads count each other's allocations
+#   - tracing is inherited by worker processes and slows the pipeline down many times over,
+#     so only turn it on to look at memory
+
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import wraps
+from threading import Lock
+from typing import Iterator
+
+PREFIX = "f1graph_"
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    seconds: float = 0.0
+    last_seconds: float = 0.0
+    peak_bytes: int = 0  # largest allocation peak over all runs, 0 if not traced
+    last_peak_bytes: int = 0
+
+
+stage_stats: dict[str, StageStats] = {}
+_stage_lock = Lock()
+_open_stages: list["stage"] = []  # traced stages not exited yet, in every thread
+
+
+class stage:
+    def __init__(self, name: str):
+        self.name = name
+
+    # as a decorator, each call enters a stage of its own, so concurrent or recursive
+    # calls never share one instance's start time / peak
+    def __call__(self, func):
+        @wraps(func)
+        def timed(*args, **kwargs):
+            with stage(self.name):
+                return func(*args, **kwargs)
+
+        return timed
+
+    def __enter__(self) -> "stage":
+        self._traced = tracemalloc.is_tracing()
+        if self._traced:
+            with _stage_lock:
+                # the traced peak is about to be reset, the stages already open keep it
+                peak = tracemalloc.get_traced_memory()[1]
+                for open_stage in _open_stages:
+                    open_stage._peak = max(open_stage._peak, peak)
+                tracemalloc.reset_peak()
+                self._base = self._peak = tracemalloc.get_traced_memory()[0]
+                _open_stages.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        seconds = time.perf_counter() - self._start
+        with _stage_lock:
+            peak = 0
+            if self._traced:
+                _open_stages.remove(self)
+                peak = max(self._peak, tracemalloc.get_traced_memory()[1]) - self._base
+            stats = stage_stats.setdefault(self.name, StageStats())
+            stats.count += 1
+            stats.seconds += seconds
+            stats.last_seconds = seconds
+            stats.last_peak_bytes = peak
+            stats.peak_bytes = max(stats.peak_bytes, peak)
+        return False
+
+
+class Histogram:
+    """
+    Prometheus style histogram (cumulative buckets, sum and count) per label values.
+    """
+
+    def __init__(
+        self, name: str, help: str, label_names: tuple[str, ...], buckets: list[float]
+    ):
+        self.name = PREFIX + name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = sorted(buckets)
+        self._series: dict[tuple[str, ...], list] = {}  # labels -> [counts, sum, count]
+        self._lock = Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            series = self._series.setdefault(
+                labels, [[0] * (len(self.buckets) + 1), 0.0, 0]
+            )
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                label_text = _labels(zip(self.label_names, labels))
+                cumulative = 0
+                for bound, bucket_count in zip([*self.buckets, "+Inf"], counts):
+                    cumulative += bucket_count
+                    bucket_labels = _labels(
+                        [*zip(self.label_names, labels), ("le", str(bound))]
+                    )
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{label_text} {total}")
+                lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+# metric family lines for samples given as (labels, value) pairs
+def metric(
+    name: str, kind: str, help: str, samples: list[tuple[dict[str, str], float]]
+) -> list[str]:
+    name = PREFIX + name
+    return [
+        f"# HELP {name} {help}",
+        f"# TYPE {name} {kind}",
+        *(f"{name}{_labels(labels.items())} {value}" for labels, value in samples),
+    ]
+
+
+def render_stage_metrics() -> list[str]:
+    with _stage_lock:
+        stats = sorted(stage_stats.items())
+    return [
+        *metric(
+            "stage_seconds_total",
+            "counter",
+            "Time spent in each pipeline / serialization stage.",
+            [({"stage": name}, s.seconds) for name, s in stats],
+        ),
+        *metric(
+            "stage_runs_total",
+            "counter",
+            "Number of runs of each stage.",
+            [({"stage": name}, s.count) for name, s in stats],
+        ),
+        *metric(
+            "stage_last_seconds",
+            "gauge",
+            "Duration of the last run of each stage.",
+            [({"stage": name}, s.last_seconds) for name, s in stats],
+        ),
+        *metric(
+            "stage_peak_bytes",
+            "gauge",
+            "Largest tracemalloc peak of each stage (0 unless tracemalloc is tracing).",
+            [({"stage": name}, s.peak_bytes) for name, s in stats],
+        ),
+    ]
+
+
+def _labels(pairs) -> str:
+    text = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{text}}}" if text else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
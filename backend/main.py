@@ -1,37 +1,101 @@
+import cProfile
 import csv
+import gc
+import io
 import json
-from datetime import date
-from data_types import Driver, Race, Ctor, Result, DriverPair
-from fastapi import FastAPI
-
-## GLOBAL DATA ##
-driver_by_id: dict[int, Driver] = (
-    dict()
-)  # indexed by id (e.g 1 -> {Lewis Hamilton Driver Object})
-driver_by_ref: dict[str, Driver] = (
-    dict()
-)  # indexed by driverRef (e.g. "hamilton" -> {Lewis Hamilton Driver Object})
-race_by_id: dict[int, Race] = dict()
-ctor_by_id: dict[int, Ctor] = dict()
-ctor_by_ref: dict[str, Ctor] = dict()
-result_by_id: dict[int, Result] = dict()
-driver_pair_by_id: dict[tuple[int, int], DriverPair] = dict()
+import os
+import pstats
+import secrets
+import time
+from contextlib import asynccontextmanager
+from data_types import (
+    Driver,
+    DriverRow,
+    Race,
+    RaceRow,
+    Ctor,
+    CtorRow,
+    Result,
+    DriverPair,
+    add_sorted,
+)
+from threading import Lock
+from fastapi import Body, Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from graph_cache import CachedPayload, etag_matches
+from compact_graph import COMPACT_VERSION
+from teammate_paths import TeammateGraph
+from graph_metrics import compute_graph_metrics
+from graph_layout import compute_layout, load_seed_positions
+from graph_state import GraphState
+from ctor_graph import load_ctor_lineage
+from shared_state import (
+    SnapshotWatcher,
+    file_lock,
+    load_or_build_snapshot,
+    prune_payload_stores,
+)
+from reloader import SourceWatcher
+from instrumentation import Histogram, metric, render_stage_metrics, stage
+from serialization import dumps
+from pairings import pair_drivers
+from head_to_head import load_status_outcomes, populate_head_to_head
+from ingest import (
+    CTOR_HEADER,
+    DRIVER_HEADER,
+    RACE_HEADER,
+    RESULT_HEADER,
+    RefTables,
+    append_rows,
+    iter_new_rows,
+    read_ref_ids,
+)
+from snapshot import Snapshot, hash_sources, load_snapshot, write_snapshot
+from columnar import (
+    QualifyingColumns,
+    ResultColumns,
+    load_qualifying_columns,
+    load_race_columns,
+    load_result_columns,
+    process_result_columns,
+    populate_driver_pairings_columnar,
+)
+from sqlite_store import (
+    ReadPool,
+    populate_driver_pairings_sql,
+    populate_driver_race_ids,
+    select_driver_standings,
+    select_qualifying_columns,
+    select_race_columns,
+    select_result_columns,
+    sync_database,
+)
+
+# "models" builds a pydantic model per results / races row, "columnar" loads them into typed arrays,
+# "sqlite" runs the loaders' group-bys against SQLITE_DB (see sqlite_store.py)
+LOADER = os.environ.get("LOADER", "models")
 
 
+@stage("load_drivers")
 def load_drivers(file_path: str) -> tuple[dict[int, Driver], dict[str, Driver]]:
     driver_by_id = {}
     driver_by_ref = {}
     with open(file_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            if row["number"] == r"\N":
-                row["number"] = None
-            driver = Driver(**row)
+            driver = driver_from_row(row)
             driver_by_id[int(row["driverId"])] = driver
             driver_by_ref[row["driverRef"]] = driver
         return driver_by_id, driver_by_ref
 
 
+def driver_from_row(row: dict[str, str]) -> Driver:
+    if row["number"] == r"\N":
+        row["number"] = None
+    return DriverRow(**row).to_driver()
+
+
+@stage("load_results")
 def load_results(file_path: str) -> dict[int, Result]:
     map = {}
     with open(file_path, newline="", encoding="utf-8") as f:
@@ -41,200 +105,65 @@ def load_results(file_path: str) -> dict[int, Result]:
     return map
 
 
+@stage("load_races")
 def load_races(file_path: str) -> dict[int, Race]:
     map = {}
     with open(file_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            map[int(row["raceId"])] = Race(**row)
+            map[int(row["raceId"])] = RaceRow(**row).to_race()
     return map
 
 
+@stage("load_ctors")
 def load_ctors(file_path: str) -> tuple[dict[int, Ctor], dict[str, Ctor]]:
     ctor_by_id: dict[int, Ctor] = {}
     ctor_by_ref: dict[str, Ctor] = {}
     with open(file_path, newline="", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            ctor = Ctor(**row)
+            ctor = CtorRow(**row).to_ctor()
             ctor_by_id[int(ctor.constructor_id)] = ctor
             ctor_by_ref[ctor.constructor_ref] = ctor
     return ctor_by_id, ctor_by_ref
 
 
+@stage("process_results")
 def process_results(
     race_by_id: dict[int, Race],
     result_by_id: dict[int, Result],
     driver_by_id: dict[int, Driver],
 ):
+    # years per driver are filled in by populate_driver_pairings (years_by_ctor)
     for result in result_by_id.values():
         race: Race = race_by_id[result.race_id]
-        race.results.add(result.result_id)
-        race.drivers.add(result.driver_id)
-        race.ctors.add(result.constructor_id)
-        driver_by_id[result.driver_id].years_active.add(race.date.year)
-        driver_by_id[result.driver_id].race_ids.add(race.race_id)
+        add_sorted(driver_by_id[result.driver_id].race_ids, race.race_id)
 
 
+@stage("populate_driver_pairings")
 def populate_driver_pairings(
     race_by_id: dict[int, Race],
     result_by_id: dict[int, Result],
     driver_by_id: dict[int, Driver],
     ctor_by_id: dict[int, Ctor],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair] | None = None,
 ) -> dict[tuple[int, int], DriverPair]:
-    driver_pair_by_id: dict[tuple[int, int], DriverPair] = dict()
-
-    for race in race_by_id.values():
-        for ctor_id in race.ctors:
-            pair: list[int, int] = list()
-            for result_id in race.results:
-                result: Result = result_by_id[result_id]
-                if result.constructor_id == ctor_id:
-                    pair.append(result.driver_id)
-
-            # temporary fix for if only one driver
-            # TODO: Change this to add drivers that didn't race with teammates
-            if len(pair) != 2:
-                driver_id = pair[0]
-                driver_by_id[driver_id].years_by_ctor.setdefault(ctor_id, set()).add(
-                    race.date.year
-                )
-                continue
-
-            # smaller driver_id goes first, to avoid duplicates
-            driver_id1 = min(pair)
-            driver_id2 = max(pair)
-            driver_pair_id = driver_id1, driver_id2
-
-            driver_pair: DriverPair = driver_pair_by_id.setdefault(
-                driver_pair_id, DriverPair(*driver_pair_id)
-            )
-
-            # add current race info to pair
-            driver_pair.race_ids.add(race.race_id)
-            driver_pair.years_by_ctor.setdefault(ctor_id, set()).add(race.date.year)
-
-            # link pair to drivers and ctor
-            driver_by_id[driver_id1].driver_pairs.add(driver_pair_id)
-            driver_by_id[driver_id1].years_by_ctor.setdefault(ctor_id, set()).add(
-                race.date.year
-            )
-
-            teammates: list = (
-                driver_by_id[driver_id1]
-                .teammates_by_year_by_ctor.setdefault(ctor_id, dict())
-                .setdefault(race.date.year, list())
-            )
-            if driver_id2 not in teammates:
-                teammates.append(driver_id2)
-
-            driver_by_id[driver_id2].driver_pairs.add(driver_pair_id)
-            driver_by_id[driver_id2].years_by_ctor.setdefault(ctor_id, set()).add(
-                race.date.year
-            )
-
-            teammates: list = (
-                driver_by_id[driver_id2]
-                .teammates_by_year_by_ctor.setdefault(ctor_id, dict())
-                .setdefault(race.date.year, list())
-            )
-            if driver_id1 not in teammates:
-                teammates.append(driver_id1)
-
-            ctor_by_id[ctor_id].driver_pair_ids.add(driver_pair_id)
-
-    return driver_pair_by_id
-
-
-def to_cytoscape_data(
-    driver_by_id: dict[int, Driver],
-    ctor_by_id: dict[int, Ctor],
-    driver_pair_by_id: dict[tuple[int, int], DriverPair],
-    min_year: int = 0,
-    max_year: int = 9999,
-) -> dict[str, dict]:
-    seen = set()  # used to only add edges with both drivers in year range
-    nodes = []
-    year_range: set[int] = set([i for i in range(min_year, max_year + 1)])
-
-    for id in driver_by_id:
-        driver: Driver = driver_by_id[id]
-        if len(driver.driver_pairs) == 0:
-            continue  # do not include drivers with no teammates
-        if driver.years_active & year_range:
-            nodes.append(
-                {
-                    "data": {
-                        "id": str(id),
-                        "displayCtorId": "0",  # default, will get changed
-                        "name": str(driver),
-                        "codename": driver.codename,
-                        "forename": driver.forename,
-                        "surname": driver.surname,
-                        # "yearsActive": sorted(list(driver.years_active)), Not using for now, because same info in yearsByCtor
-                        "yearsByCtor": sorted(
-                            [
-                                {
-                                    "ctor": ctor_by_id[ctor_id].name,
-                                    "ctorId": str(ctor_id),
-                                    "years": sorted(years),
-                                }
-                                for ctor_id, years in driver.years_by_ctor.items()
-                            ],
-                            key=lambda pair: min(pair["years"]),
-                        ),
-                        "teammatesByYearByCtor": sorted(
-                            [
-                                {
-                                    "ctorId": ctorId,
-                                    "years": sorted(
-                                        [list(item) for item in years.items()],
-                                        key=lambda year: year[0], reverse=True),
-                                }
-                                for ctorId, years in driver.teammates_by_year_by_ctor.items()
-                            ],
-                            key=lambda pair: (
-                                max([year[0] for year in pair["years"]]),
-                                len(pair["years"]),
-                            ), reverse=True
-                        ),
-                        "raceCount": len(driver.race_ids),
-                    }
-                }
-            ),
-            seen.add(id)
-
-    edges = [
-        {
-            "data": {
-                "source": str(driver_pair.driver_id_1),
-                "target": str(driver_pair.driver_id_2),
-                "displayCtorId": "0",  # default, will get changed
-                "yearsByCtor": sorted(
-                    [
-                        {
-                            "ctor": ctor_by_id[ctor_id].name,
-                            "ctorId": str(ctor_id),
-                            "years": sorted(years),
-                        }
-                        for ctor_id, years in driver_pair.years_by_ctor.items()
-                    ],
-                    key=lambda pair: max(pair["years"]),
-                ),
-            }
-        }
-        for driver_pair in driver_pair_by_id.values()
-        if driver_pair.driver_id_1 in seen and driver_pair.driver_id_2 in seen
-    ]
-
-    # Order the nodes from newest to oldest
-    #   - This is to fix a label chaching issue, where the last nodes in the list dont get their labels chached
-    #   - This was causing their labels to flicker. For now, put old nodes to end of list
-    #   - TODO: Come up with better solution, so that no labels flicker
-    nodes.sort(
-        key=lambda node: min(node["data"]["yearsByCtor"][0]["years"]), reverse=True
+    # group drivers by race and ctor in a single pass over the results
+    #   - a driver can have more than one result for a ctor in a race (shared drives)
+    drivers_by_ctor_by_race: dict[int, dict[int, list[int]]] = dict()
+    for result in result_by_id.values():
+        drivers: list[int] = drivers_by_ctor_by_race.setdefault(
+            result.race_id, dict()
+        ).setdefault(result.constructor_id, list())
+        if result.driver_id not in drivers:
+            drivers.append(result.driver_id)
+
+    return pair_drivers(
+        drivers_by_ctor_by_race,
+        {race.race_id: race.date.year for race in race_by_id.values()},
+        driver_by_id,
+        driver_pair_by_id,
     )
-    return {"nodes": nodes, "edges": edges}
 
 
 # creates map that frontend will use to style nodes / edges based on ctor
@@ -258,157 +187,595 @@ def create_ctor_map(ctor_by_id: dict[int, Ctor]) -> list[dict[str, str]]:
     ]
 
 
-# Takes result JSON and populates race/result CSVs
-def process_new_json(
-    json_path: str,
-    race_csv_path: str,
-    result_csv_path: str,
-    driver_by_ref: dict[str, Driver],
-    ctor_by_ref: dict[str, Ctor],
+# Adds freshly ingested race / result rows to the in-memory graph, in place
+def apply_new_rows(
+    new_race_by_id: dict[int, Race],
+    new_result_by_id: dict[int, Result],
+    race_by_id: dict[int, Race],
+    driver_by_id: dict[int, Driver],
+    ctor_by_id: dict[int, Ctor],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair],
+    qualifying: QualifyingColumns,
+    status_outcome_by_id: dict[int, str],
 ) -> None:
+    race_by_id.update(new_race_by_id)
+    process_results(race_by_id, new_result_by_id, driver_by_id)
+    populate_driver_pairings(
+        new_race_by_id, new_result_by_id, driver_by_id, ctor_by_id, driver_pair_by_id
+    )
+    populate_head_to_head(
+        ResultColumns.from_models(new_result_by_id),
+        qualifying,
+        {race.race_id: race.year for race in new_race_by_id.values()},
+        status_outcome_by_id,
+        driver_pair_by_id,
+    )
 
-    # Load existing CSV to find max raceId
-    with open(race_csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        race_rows = list(reader)
-
-    race_header = race_rows[0]
-    race_data = race_rows[1:]
-    max_race_id = max(int(race[0]) for race in race_data if race[0].isdigit())
-
-    with open(result_csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f)
-        result_rows = list(reader)
-
-    result_header = result_rows[0]
-    result_data = result_rows[1:]
-    max_result_id = max(int(result[0]) for result in result_data if result[0].isdigit())
-
-    # Load JSON races
-    with open(json_path, encoding="utf-8") as f:
-        races_json = json.load(f)
-
-    new_race_rows = []
-    new_result_rows = []
-    race_id = max_race_id
-    result_id = max_result_id
-
-    for race in races_json["MRData"]["RaceTable"]["Races"]:
-        race_id += 1
-        season = race.get("season")
-        round = race.get("round")
-        race_name = race.get("raceName")
-        url = race.get("url")
-        date = race.get("date")
-        time = race.get("time", None)  # Some JSONs include "time"
-
-        # For consistency with your example CSV structure
-        # Adjust indexes if your CSV has more columns
-        row = [
-            race_id,  # raceId
-            season,  # season (year)
-            round,  # round
-            "\\N",  # circuit ID
-            race_name,  # raceName
-            date,  # race date
-            time or "\\N",  # race time
-            url,  # wikipedia URL
-            "\\N",
-            "\\N",  # FP1 date/time
-            "\\N",
-            "\\N",  # FP2 date/time
-            "\\N",
-            "\\N",  # FP3 date/time
-            "\\N",
-            "\\N",  # Quali date/time
-            "\\N",
-            "\\N",  # Sprint date/time
-        ]
-        new_race_rows.append(row)
-
-        for result in race.get("Results"):
-            result_id += 1
-            driver_id = driver_by_ref[result.get("Driver").get("driverId")].driver_id
-            ctor_id = ctor_by_ref[
-                result.get("Constructor").get("constructorId")
-            ].constructor_id
-            number = int(result.get("Driver").get("permanentNumber"))
-            grid = int(result.get("grid"))
-            position = int(result.get("position"))
-            position_text = result.get("positionText")
-            points = int(result.get("points"))
-            position_order = laps = time = milliseconds = fastestLap = rank = (
-                fastestLapTime
-            ) = fastestLapSpeed = statusId = "\\N"
-            row = [
-                result_id,
-                race_id,
-                driver_id,
-                ctor_id,
-                number,
-                grid,
-                position,
-                position_text,
-                position_order,
-                points,
-                laps,
-                time,
-                milliseconds,
-                fastestLap,
-                rank,
-                fastestLapTime,
-                fastestLapSpeed,
-                statusId,
-            ]
 
-            new_result_rows.append(row)
+# # MAIN LOADER CODE
 
-    # Write back out with new races appended
-    with open("data/new_races.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(race_header)
-        writer.writerows(race_data + new_race_rows)
+DATA_DIR = "data"
+DRIVER_CSV = "data/drivers.csv"
+CTOR_CSV = "data/constructors.csv"
+RACE_CSV = "data/new_races.csv"
+RESULT_CSV = "data/new_results.csv"
+QUALIFYING_CSV = "data/qualifying.csv"
+STATUS_CSV = "data/status.csv"
+CIRCUITS_CSV = "data/circuits.csv"  # only read by /ingest, for circuitRef -> circuitId
+# ctors that are one team under different names, for /ctor-graph
+CTOR_LINEAGE = "data/ctor_lineage.json"
+SOURCE_FILES = [
+    DRIVER_CSV,
+    CTOR_CSV,
+    RESULT_CSV,
+    RACE_CSV,
+    QUALIFYING_CSV,
+    STATUS_CSV,
+    CTOR_LINEAGE,
+]
+SNAPSHOT_PATH = "graph.snapshot"  # bump snapshot.VERSION when processing changes
+# Cytoscape positions export, seeds the first server-side layout
+NODE_POSITIONS = "../frontend/src/data/nodePositions.json"
+# directory of rendered /graph payloads shared by all workers, unset to keep them per process
+PAYLOAD_STORE = os.environ.get("PAYLOAD_STORE")
+# seconds between checks of SOURCE_FILES for changes, 0 turns hot reloading off
+RELOAD_INTERVAL = float(os.environ.get("RELOAD_INTERVAL", "2"))
+# where POST /admin/profile writes its cProfile dumps
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+# SQLite copy of the CSVs in DATA_DIR, for LOADER=sqlite and the endpoints that query it
+#   - unset (and LOADER is not sqlite) keeps everything on the CSVs
+SQLITE_DB = os.environ.get("SQLITE_DB", "data.sqlite" if LOADER == "sqlite" else None)
+read_pool = ReadPool(SQLITE_DB) if SQLITE_DB is not None else None
+# token for the endpoints that write or rebuild (POST /admin/*, /ingest), sent as an
+# X-Admin-Token header; unset, those endpoints are not served at all
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+# runs the whole processing pipeline from the source CSVs
+def build_snapshot() -> Snapshot:
+    driver_by_id, driver_by_ref = load_drivers(DRIVER_CSV)
+    ctor_by_id, ctor_by_ref = load_ctors(CTOR_CSV)
+
+    if LOADER == "sqlite":
+        # results stay in typed arrays, grouping by race / ctor and by driver is left to SQLite
+        with read_pool.connection() as conn:
+            with stage("load_races"):
+                race_columns = select_race_columns(conn)
+                race_by_id = race_columns.to_models()
+            with stage("load_results"):
+                result_columns = select_result_columns(conn)
+                qualifying_columns = select_qualifying_columns(conn)
+            with stage("process_results"):
+                populate_driver_race_ids(conn, driver_by_id)
+            with stage("populate_driver_pairings"):
+                driver_pair_by_id = populate_driver_pairings_sql(
+                    conn, race_columns, driver_by_id
+                )
+        year_by_race_id = race_columns.year_by_race_id()
+    elif LOADER == "columnar":
+        # results stay in typed arrays, result_by_id is never built
+        with stage("load_races"):
+            race_columns = load_race_columns(RACE_CSV)
+            race_by_id = race_columns.to_models()
+        with stage("load_results"):
+            result_columns = load_result_columns(RESULT_CSV)
+        with stage("process_results"):
+            process_result_columns(result_columns, driver_by_id)
+
+        with stage("populate_driver_pairings"):
+            driver_pair_by_id = populate_driver_pairings_columnar(
+                race_columns, result_columns, driver_by_id
+            )
+        year_by_race_id = race_columns.year_by_race_id()
+        qualifying_columns = load_qualifying_columns(QUALIFYING_CSV)
+    else:
+        result_by_id = load_results(RESULT_CSV)
+        race_by_id = load_races(RACE_CSV)
+        process_results(race_by_id, result_by_id, driver_by_id)
+
+        driver_pair_by_id = populate_driver_pairings(
+            race_by_id, result_by_id, driver_by_id, ctor_by_id
+        )
+        result_columns = ResultColumns.from_models(result_by_id)
+        year_by_race_id = {race.race_id: race.year for race in race_by_id.values()}
+        qualifying_columns = load_qualifying_columns(QUALIFYING_CSV)
+
+    with stage("populate_head_to_head"):
+        populate_head_to_head(
+            result_columns,
+            qualifying_columns,
+            year_by_race_id,
+            load_status_outcomes(STATUS_CSV),
+            driver_pair_by_id,
+        )
 
-    with open("data/new_results.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(result_header)
-        writer.writerows(result_data + new_result_rows)
+    # all-pairs BFS over the teammate graph, split across processes
+    #   - allocations in the worker processes are not traced
+    with stage("compute_graph_metrics"):
+        graph_metrics = compute_graph_metrics(TeammateGraph(driver_pair_by_id))
+
+    with stage("compute_layout"):
+        graph_layout = compute_layout(list(driver_pair_by_id), layout_seed(graph_state))
+
+    return Snapshot(
+        driver_by_id,
+        driver_by_ref,
+        ctor_by_id,
+        ctor_by_ref,
+        race_by_id,
+        driver_pair_by_id,
+        graph_metrics,
+        graph_layout,
+    )
 
-    pass
 
+# the current layout, so drivers keep their positions across rebuilds, else the
+# frontend's positions export
+def layout_seed(state: "GraphState | None") -> dict[int, tuple[float, float]]:
+    if state is not None and state.graph_layout is not None:
+        return state.graph_layout.positions()
+    return load_seed_positions(NODE_POSITIONS)
 
-# # MAIN LOADER CODE
 
-driver_by_id, driver_by_ref = load_drivers("data/drivers.csv")
-ctor_by_id, ctor_by_ref = load_ctors("data/constructors.csv")
-result_by_id = load_results("data/new_results.csv")
-race_by_id = load_races("data/new_races.csv")
-process_results(race_by_id, result_by_id, driver_by_id)
+# held while the graph is read for a payload or updated by an ingest, by every GraphState
+graph_lock = Lock()
+reload_lock = Lock()  # one state swap at a time
+graph_state: GraphState | None = None  # set by swap_state
+
+
+# swaps in a new state, requests already running finish on the one they started with
+#   - the version (and so every etag) changes with the source files
+def swap_state(snapshot: Snapshot, source_hash: bytes) -> GraphState:
+    global graph_state
+    graph_state = GraphState(
+        snapshot,
+        source_hash.hex()[:16],
+        graph_lock,
+        PAYLOAD_STORE,
+        load_ctor_lineage(CTOR_LINEAGE, snapshot.ctor_by_id),
+    )
+    snapshot_watcher.mark()
+    return graph_state
+
 
-driver_pair_by_id = populate_driver_pairings(
-    race_by_id, result_by_id, driver_by_id, ctor_by_id
+# static exports only change with the data, so only the process that built it rewrites them
+def write_exports(state: GraphState) -> None:
+    if PAYLOAD_STORE:
+        prune_payload_stores(PAYLOAD_STORE, keep=state.version)
+
+    # also warms the cache for the default (full history) range
+    with open("dump.json", "wb") as f:
+        f.write(state.graph_caches[1].get(0, 2025).body)
+
+    write_ctor_map(state.ctor_by_id)
+
+
+def write_ctor_map(ctor_by_id: dict[int, Ctor]) -> None:
+    with open("../frontend/src/data/ctorMap.json", "w") as f:
+        f.write(json.dumps(create_ctor_map(ctor_by_id)))
+
+
+# brings the SQLite copy, if there is one, up to date with the CSVs
+def sync_sqlite() -> None:
+    if SQLITE_DB is not None:
+        with stage("sync_database"):
+            sync_database(SQLITE_DB, DATA_DIR)
+
+
+# rebuilds (or loads, if another worker already rebuilt) the graph for the current sources
+def reload_graph() -> str:
+    with reload_lock:
+        sync_sqlite()
+        source_hash = hash_sources(SOURCE_FILES)
+        snapshot, built = load_or_build_snapshot(
+            SNAPSHOT_PATH, source_hash, build_snapshot
+        )
+        state = swap_state(snapshot, source_hash)
+    if built:
+        write_exports(state)
+    return state.version
+
+
+# with several workers, only the first one to find the snapshot stale builds it
+#   - forking workers from one import (gunicorn --preload) also shares the loaded graph
+snapshot_watcher = SnapshotWatcher(SNAPSHOT_PATH)
+source_watcher = SourceWatcher(SOURCE_FILES, reload_graph, RELOAD_INTERVAL)
+source_watcher.version = reload_graph()
+
+# the loaded graph is never freed, keeping it out of gc passes also keeps the pages
+# shared with workers forked after the import (e.g. gunicorn --preload)
+gc.freeze()
+
+
+# the state a request should use, swapping in a newer snapshot written by another worker
+def current_state() -> GraphState:
+    if snapshot_watcher.changed():
+        with reload_lock:
+            source_hash = hash_sources(SOURCE_FILES)
+            snapshot = load_snapshot(SNAPSHOT_PATH, source_hash)
+            # a stale snapshot (sources changed, not rebuilt yet) keeps the current state
+            if snapshot is not None:
+                swap_state(snapshot, source_hash)
+    return graph_state
+
+
+# the source watcher runs in each worker, started after any fork
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    source_watcher.start()
+    yield
+    source_watcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+
+GRAPH_LATENCY = Histogram(
+    "graph_request_seconds",
+    "Time to serve a /graph payload, cache hits and misses alike.",
+    ("endpoint", "version"),
+    [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5],
 )
 
 
-with open("dump.json", "w") as f:
-    f.write(
-        json.dumps(
-            to_cytoscape_data(driver_by_id, ctor_by_id, driver_pair_by_id, 0, 2025)
+# serves a cached payload, honouring Accept-Encoding and If-None-Match
+def cached_response(request: Request, payload: CachedPayload) -> Response:
+    body, etag, content_coding = payload.representation(
+        request.headers.get("accept-encoding")
+    )
+    headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+    if content_coding:
+        headers["Content-Encoding"] = content_coding
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# version 1 is the Cytoscape elements format, version 2 the compact format (see compact_graph.py)
+@app.get("/graph")
+def get_graph(
+    request: Request,
+    min_year: int = 0,
+    max_year: int = 2025,
+    version: int = Query(1, ge=1, le=COMPACT_VERSION),
+):
+    with GRAPH_LATENCY.time("/graph", str(version)):
+        state = current_state()
+        return cached_response(
+            request, state.graph_caches[version].get(min_year, max_year)
+        )
+
+
+# ids, codename, display ctor and edges only, details come from /driver and /pair
+@app.get("/graph/skeleton")
+def get_skeleton_graph(request: Request, min_year: int = 0, max_year: int = 2025):
+    with GRAPH_LATENCY.time("/graph/skeleton", "skeleton"):
+        state = current_state()
+        return cached_response(
+            request, state.graph_caches["skeleton"].get(min_year, max_year)
+        )
+
+
+# base graph plus per-season add / remove patches, for scrubbing (see graph_deltas.py)
+#   - each season's frame is the graph of the window seasons up to it
+@app.get("/graph/deltas")
+def get_graph_deltas(
+    request: Request,
+    min_year: int = 0,
+    max_year: int = 2025,
+    window: int = Query(1, ge=1, le=100),
+):
+    with GRAPH_LATENCY.time("/graph/deltas", "deltas"):
+        state = current_state()
+        return cached_response(
+            request, state.delta_cache.get(min_year, max_year, window)
+        )
+
+
+# team-level graph: ctors (grouped by lineage) linked by shared drivers and transfers
+@app.get("/ctor-graph")
+def get_ctor_graph(request: Request, min_year: int = 0, max_year: int = 2025):
+    with GRAPH_LATENCY.time("/ctor-graph", "ctor"):
+        state = current_state()
+        return cached_response(request, state.ctor_graph_cache.get(min_year, max_year))
+
+
+@app.get("/graph/cache")
+def get_graph_cache_stats():
+    state = current_state()
+    return {"version": state.version, **state.cache_stats()}
+
+
+# data version and the last hot reload (what triggered it, how long it took, any error)
+@app.get("/admin/reload")
+def get_reload_stats():
+    return {"dataVersion": current_state().version, **source_watcher.stats()}
+
+
+# 404s unless ADMIN_TOKEN is set and sent, so the endpoints look absent otherwise
+def require_admin(x_admin_token: str | None = Header(None)) -> None:
+    if ADMIN_TOKEN is None or not secrets.compare_digest(
+        (x_admin_token or "").encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+# reloads now, e.g. after editing a CSV with RELOAD_INTERVAL=0
+@app.post("/admin/reload", dependencies=[Depends(require_admin)])
+def reload_now():
+    return source_watcher.trigger("requested")
+
+
+# Prometheus text format: stage timers / allocation peaks, /graph latency, caches, reloads
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    state = current_state()
+    cache_stats = state.cache_stats()
+    lines = [
+        *render_stage_metrics(),
+        *GRAPH_LATENCY.render(),
+        *(
+            line
+            for name, help in (
+                ("hits", "Payload cache hits."),
+                ("misses", "Payload cache misses (built or loaded from the store)."),
+            )
+            for line in metric(
+                f"payload_cache_{name}_total",
+                "counter",
+                help,
+                [({"cache": cache}, stats[name]) for cache, stats in cache_stats.items()],
+            )
+        ),
+        *metric(
+            "payload_cache_size",
+            "gauge",
+            "Payloads held by each cache.",
+            [({"cache": cache}, stats["size"]) for cache, stats in cache_stats.items()],
+        ),
+        *metric(
+            "data_version_info",
+            "gauge",
+            "Data version currently served.",
+            [({"version": state.version}, 1)],
+        ),
+        *metric(
+            "reloads_total",
+            "counter",
+            "Hot reloads run by this process.",
+            [({}, source_watcher.reloads)],
+        ),
+    ]
+    if source_watcher.last_reload is not None:
+        lines += metric(
+            "last_reload_seconds",
+            "gauge",
+            "Duration of the last hot reload.",
+            [({}, source_watcher.last_reload["seconds"])],
         )
+    return PlainTextResponse(
+        "\n".join(lines) + "\n", media_type="text/plain; version=0.0.4"
     )
 
-with open("../frontend/src/data/ctorMap.json", "w") as f:
-    f.write(json.dumps(create_ctor_map(ctor_by_id)))
 
-app = FastAPI()
+# Runs a stage under cProfile and writes the .prof dump to PROFILE_DIR
+#   - pipeline: the whole build_snapshot(), the result is discarded
+#   - graph: an uncached /graph payload for the year range, built and serialized
+# returns the dump path and the top functions by cumulative time
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+def profile(
+    target: str = Query("pipeline", pattern="^(pipeline|graph)$"),
+    min_year: int = 0,
+    max_year: int = 2025,
+    version: int = Query(1, ge=1, le=COMPACT_VERSION),
+    limit: int = Query(30, ge=1),
+):
+    state = current_state()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        if target == "pipeline":
+            build_snapshot()
+        else:
+            dumps(state.graph_caches[version].build(min_year, max_year))
+    finally:
+        profiler.disable()
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{target}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+    profiler.dump_stats(path)
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(limit)
+    return PlainTextResponse(f"{path}\n{output.getvalue()}")
+
+
+@app.get("/driver/{driver_id}")
+def get_driver(request: Request, driver_id: int):
+    state = current_state()
+    if driver_id not in state.driver_by_id:
+        raise HTTPException(status_code=404, detail=f"No driver with id {driver_id}")
+    return cached_response(request, state.driver_detail_cache.get(driver_id))
+
+
+@app.get("/pair/{driver_id1}/{driver_id2}")
+def get_pair(request: Request, driver_id1: int, driver_id2: int):
+    state = current_state()
+    # smaller driver_id goes first, same as driver_pair_by_id
+    driver_pair_id = min(driver_id1, driver_id2), max(driver_id1, driver_id2)
+    if driver_pair_id not in state.driver_pair_by_id:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Drivers {driver_id1} and {driver_id2} were never teammates",
+        )
+    return cached_response(request, state.pair_detail_cache.get(*driver_pair_id))
+
+
+# Championship position, points and wins at the end of each season, queried from SQLITE_DB
+@app.get("/driver/{driver_id}/standings")
+def get_driver_standings(driver_id: int):
+    state = current_state()
+    if driver_id not in state.driver_by_id:
+        raise HTTPException(status_code=404, detail=f"No driver with id {driver_id}")
+    if read_pool is None:
+        raise HTTPException(status_code=503, detail="No SQLite database, set SQLITE_DB")
+    with read_pool.connection() as conn:
+        return {"driverId": driver_id, "seasons": select_driver_standings(conn, driver_id)}
+
+
+# Fewest teammate hops between two drivers, e.g. /path?from=hamilton&to=fangio
+#   - optionally only following pairings within [min_year, max_year] and / or for one ctor
+@app.get("/path")
+def get_path(
+    request: Request,
+    from_ref: str = Query(alias="from"),
+    to_ref: str = Query(alias="to"),
+    min_year: int | None = None,
+    max_year: int | None = None,
+    ctor: str | None = None,
+):
+    state = current_state()
+    for ref in (from_ref, to_ref):
+        if ref not in state.driver_by_ref:
+            raise HTTPException(status_code=404, detail=f"No driver with ref '{ref}'")
+    if ctor is not None and ctor not in state.ctor_by_ref:
+        raise HTTPException(status_code=404, detail=f"No constructor with ref '{ctor}'")
+
+    return cached_response(
+        request,
+        state.path_cache.get(
+            state.driver_by_ref[from_ref].driver_id,
+            state.driver_by_ref[to_ref].driver_id,
+            *state.teammate_graph.clamp_years(min_year, max_year),
+            state.ctor_by_ref[ctor].constructor_id if ctor is not None else None,
+        ),
+    )
 
 
-@app.get("/graph")
-def get_graph():
-    return to_cytoscape_data(driver_by_id, ctor_by_id, driver_pair_by_id, 0, 2025)
+# Ingests an Ergast / Jolpica results JSON (MRData.RaceTable.Races) without a reload
+#   - rounds that were already ingested are skipped
+#   - new drivers / ctors are added from the result JSON, a race or row that does not
+#     validate (see ingest.validate_race) fails the request with 422 and nothing is written
+#   - new drivers / ctors / statuses are written before the rows that point at them
+#   - other workers pick the new snapshot up through their SnapshotWatcher
+@app.post("/ingest", dependencies=[Depends(require_admin)])
+def ingest_results(races_json: dict = Body(...)):
+    with graph_lock:
+        state = current_state()
+        refs = RefTables(
+            {ref: driver.driver_id for ref, driver in state.driver_by_ref.items()},
+            {ref: ctor.constructor_id for ref, ctor in state.ctor_by_ref.items()},
+            read_ref_ids(STATUS_CSV, "statusId", "status"),
+            read_ref_ids(CIRCUITS_CSV, "circuitId", "circuitRef"),
+        )
+        # every row is built, and parsed into its model, before anything is written
+        try:
+            race_rows, result_rows = list(), list()
+            for race_row, rows in iter_new_rows(
+                races_json["MRData"]["RaceTable"]["Races"], RACE_CSV, RESULT_CSV, refs
+            ):
+                if race_row is not None:
+                    race_rows.append(race_row)
+                result_rows.extend(rows)
+            new_drivers = [
+                driver_from_row(dict(zip(DRIVER_HEADER, map(str, row))))
+                for row in refs.new_rows["drivers"]
+            ]
+            new_ctors = [
+                CtorRow(**dict(zip(CTOR_HEADER, map(str, row)))).to_ctor()
+                for row in refs.new_rows["ctors"]
+            ]
+            new_race_by_id: dict[int, Race] = dict()
+            for row in race_rows:
+                race = RaceRow(**dict(zip(RACE_HEADER, row))).to_race()
+                new_race_by_id[race.race_id] = race
+            new_result_by_id: dict[int, Result] = dict()
+            for row in result_rows:
+                result = Result(**dict(zip(RESULT_HEADER, row)))
+                new_result_by_id[result.result_id] = result
+        except (KeyError, TypeError, ValueError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid races JSON: {e}")
+
+        # the same order as ingest.stream_new_json, no row points at an id not written yet
+        refs.append_new_rows(DRIVER_CSV, CTOR_CSV, STATUS_CSV)
+        append_rows(RACE_CSV, race_rows)
+        append_rows(RESULT_CSV, result_rows)
+
+        # the tail of a race already loaded (split across result pages): its pairings and
+        # head-to-heads can't be added to, so the graph is rebuilt from the CSVs
+        rebuild = any(
+            result.race_id not in new_race_by_id for result in new_result_by_id.values()
+        )
+        if race_rows and not rebuild:
+            for driver in new_drivers:
+                state.driver_by_id[driver.driver_id] = driver
+                state.driver_by_ref[driver.driver_ref] = driver
+            for ctor in new_ctors:
+                state.ctor_by_id[ctor.constructor_id] = ctor
+                state.ctor_by_ref[ctor.constructor_ref] = ctor
+            if new_ctors:
+                write_ctor_map(state.ctor_by_id)
+            apply_new_rows(
+                new_race_by_id,
+                new_result_by_id,
+                state.race_by_id,
+                state.driver_by_id,
+                state.ctor_by_id,
+                state.driver_pair_by_id,
+                # ingested races only get a qualifying head-to-head if they are in the CSV
+                load_qualifying_columns(QUALIFYING_CSV),
+                load_status_outcomes(STATUS_CSV),
+            )
+            with stage("compute_graph_metrics"):
+                state.graph_metrics = compute_graph_metrics(
+                    TeammateGraph(state.driver_pair_by_id)
+                )
+            with stage("compute_layout"):
+                state.graph_layout = compute_layout(
+                    list(state.driver_pair_by_id), layout_seed(state)
+                )
+            source_hash = hash_sources(SOURCE_FILES)
+            snapshot = state.to_snapshot()
+            with reload_lock:
+                # the lock load_or_build_snapshot builds under, so a worker rebuilding at
+                # the same time never writes the same temporary file
+                with file_lock(f"{SNAPSHOT_PATH}.lock"):
+                    write_snapshot(SNAPSHOT_PATH, source_hash, snapshot)
+                # new state for the same (updated) data, with fresh indexes and caches
+                state = swap_state(snapshot, source_hash)
+            sync_sqlite()
+            # the appended CSVs are already loaded, no need for a hot reload
+            source_watcher.mark()
+            source_watcher.version = state.version
+            if PAYLOAD_STORE:
+                prune_payload_stores(PAYLOAD_STORE, keep=state.version)
+    if rebuild:
+        # outside graph_lock, writing the exports renders a payload
+        source_watcher.version = reload_graph()
+        source_watcher.mark()
+    return {"races": len(race_rows), "results": len(result_rows)}
 
 
 # process_new_json(
-#     "data/2025/f1_2025_results_pt1.json", "data/races.csv", "data/results.csv",
-#     driver_by_ref, ctor_by_ref
+#     "data/2025/f1_2025_results_pt1.json", RACE_CSV, RESULT_CSV,
+#     RefTables.from_csvs("data")
 # )
@@ -0,0 +1,62 @@
+from itertools import combinations
+from data_types import Driver, DriverPair, add_sorted, sorted_ids
+
+
+def pair_drivers(
+    drivers_by_ctor_by_race: dict[int, dict[int, list[int]]],
+    year_by_race_id: dict[int, int],
+    driver_by_id: dict[int, Driver],
+    driver_pair_by_id: dict[tuple[int, int], DriverPair] | None = None,
+) -> dict[tuple[int, int], DriverPair]:
+    """
+    Builds driver pairs from drivers already grouped by race and ctor.
+
+    drivers_by_ctor_by_race maps race_id -> ctor_id -> distinct driver ids.
+    Races are walked in year_by_race_id order, so teammate lists are filled
+    oldest entry first. Passing an existing driver_pair_by_id adds the races
+    to it in place (used for incremental ingestion).
+    """
+    if driver_pair_by_id is None:
+        driver_pair_by_id = dict()
+
+    for race_id, year in year_by_race_id.items():
+        for ctor_id, drivers in drivers_by_ctor_by_race.get(race_id, {}).items():
+            for driver_id in drivers:
+                add_sorted(
+                    driver_by_id[driver_id].years_by_ctor.setdefault(
+                        ctor_id, sorted_ids()
+                    ),
+                    year,
+                )
+
+            # every combination of entrants is a pairing, so teams running 3+ cars are kept
+            # smaller driver_id goes first, to avoid duplicates
+            for driver_pair_id in combinations(sorted(drivers), 2):
+                driver_id1, driver_id2 = driver_pair_id
+
+                driver_pair: DriverPair = driver_pair_by_id.get(driver_pair_id)
+                if driver_pair is None:
+                    driver_pair = driver_pair_by_id[driver_pair_id] = DriverPair(
+                        *driver_pair_id
+                    )
+
+                # add current race info to pair
+                add_sorted(driver_pair.race_ids, race_id)
+                add_sorted(
+                    driver_pair.years_by_ctor.setdefault(ctor_id, sorted_ids()), year
+                )
+
+                # link drivers to each other
+                for driver_id, teammate_id in (
+                    (driver_id1, driver_id2),
+                    (driver_id2, driver_id1),
+                ):
+                    driver: Driver = driver_by_id[driver_id]
+                    add_sorted(driver.teammate_ids, teammate_id)
+                    teammates: list = driver.teammates_by_year_by_ctor.setdefault(
+                        ctor_id, dict()
+                    ).setdefault(year, list())
+                    if teammate_id not in teammates:
+                        teammates.append(teammate_id)
+
+    return driver_pair_by_id
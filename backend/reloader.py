@@ -0,0 +1,107 @@
+import os
+import time
+from threading import Event, Lock, Thread
+from typing import Callable
+
+
+class SourceWatcher:
+    """
+    Polls the source files and calls reload() in a background thread when they change.
+
+    A change is only acted on once the files have stopped changing for one poll,
+    so a CSV that is still being written is not loaded half way. reload() returns
+    the new data version; while it runs, requests keep using the current state.
+    """
+
+    def __init__(
+        self,
+        file_paths: list[str],
+        reload: Callable[[], str],
+        interval: float = 2.0,
+    ):
+        self.file_paths = file_paths
+        self.reload = reload
+        self.interval = interval
+        self._seen = self._stat()
+        self._pending: tuple | None = None  # changed stats, waiting to settle
+        self._lock = Lock()  # one reload at a time
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+        self.version: str | None = None
+        self.reloads = 0
+        self.last_reload: dict | None = None
+
+    def _stat(self) -> tuple:
+        stats = []
+        for file_path in self.file_paths:
+            try:
+                stat = os.stat(file_path)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stats.append(None)
+        return tuple(stats)
+
+    # records the current files as loaded, e.g. after an ingest appended to them
+    def mark(self) -> None:
+        self._seen = self._stat()
+        self._pending = None
+
+    def poll(self) -> bool:
+        stats = self._stat()
+        if stats == self._seen:
+            self._pending = None
+            return False
+        if stats != self._pending:  # still changing, check again next poll
+            self._pending = stats
+            return False
+        self.trigger("sources changed")
+        return True
+
+    def trigger(self, reason: str) -> dict:
+        with self._lock:
+            stats = self._stat()
+            started = time.time()
+            start = time.perf_counter()
+            try:
+                self.version = self.reload()
+                error = None
+            except Exception as e:  # keep serving the current state
+                error = f"{type(e).__name__}: {e}"
+            self._seen = stats
+            self._pending = None
+            self.reloads += 1
+            self.last_reload = {
+                "reason": reason,
+                "startedAt": started,
+                "seconds": round(time.perf_counter() - start, 3),
+                "version": self.version,
+                "error": error,
+            }
+            return self.last_reload
+
+    def start(self) -> None:
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="source-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "interval": self.interval,
+            "watching": self._thread is not None,
+            "reloads": self.reloads,
+            "lastReload": self.last_reload,
+        }
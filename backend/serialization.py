@@ -0,0 +1,33 @@
+# JSON encoding for payloads, snapshots and exports
+#   - orjson when it is installed, the stdlib json module otherwise
+#   - JSON_BACKEND=json forces the stdlib, e.g. to compare the two (bench/bench_serialize.py)
+#   - both produce the same JSON values, but not the same bytes (orjson has no spaces
+#     after separators), so etags differ between backends
+
+import json
+import os
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional, json.dumps is ~6x slower on the graph payloads
+    orjson = None
+
+JSON_BACKEND = os.environ.get("JSON_BACKEND", "orjson" if orjson else "json")
+if JSON_BACKEND not in ("orjson", "json"):
+    raise ValueError(f"Unknown JSON_BACKEND '{JSON_BACKEND}'")
+if JSON_BACKEND == "orjson" and orjson is None:
+    raise ValueError("JSON_BACKEND=orjson, but orjson is not installed")
+
+
+def dumps_json(obj: Any) -> bytes:
+    return json.dumps(obj).encode("utf-8")
+
+
+def dumps_orjson(obj: Any) -> bytes:
+    # non-str keys are turned into strings, the same as json.dumps does
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+
+dumps = dumps_orjson if JSON_BACKEND == "orjson" else dumps_json
+loads = orjson.loads if JSON_BACKEND == "orjson" else json.loads
@@ -0,0 +1,91 @@
+# Sharing one processed graph between worker processes
+#   - the first process to find the snapshot missing or stale builds it, under a file lock,
+#     the others wait for it and load the snapshot it wrote
+#   - snapshots are swapped in with os.replace, so a worker that sees the file replaced
+#     (e.g. after an /ingest in another worker) can load the new one and swap its state
+#   - rendered payloads are shared through a PayloadStore directory per data version
+
+import fcntl
+import os
+import shutil
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from instrumentation import stage
+from snapshot import Snapshot, load_snapshot, write_snapshot
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# returns the snapshot and whether this process built it
+def load_or_build_snapshot(
+    path: str, source_hash: bytes, build: Callable[[], Snapshot]
+) -> tuple[Snapshot, bool]:
+    with stage("load_snapshot"):
+        snapshot = load_snapshot(path, source_hash)
+    if snapshot is not None:
+        return snapshot, False
+
+    with file_lock(f"{path}.lock"):
+        # another process may have built it while this one waited for the lock
+        with stage("load_snapshot"):
+            snapshot = load_snapshot(path, source_hash)
+        if snapshot is not None:
+            return snapshot, False
+        snapshot = build()
+        with stage("write_snapshot"):
+            write_snapshot(path, source_hash, snapshot)
+        return snapshot, True
+
+
+class SnapshotWatcher:
+    """
+    Notices when the snapshot file is replaced, checking at most every interval seconds.
+    """
+
+    def __init__(self, path: str, interval: float = 1.0):
+        self.path = path
+        self.interval = interval
+        self._identity = self._stat()
+        self._checked = time.monotonic()
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    # records the current file as seen, e.g. after this process wrote it
+    def mark(self) -> None:
+        self._identity = self._stat()
+        self._checked = time.monotonic()
+
+    def changed(self) -> bool:
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return False
+        self._checked = now
+        identity = self._stat()
+        if identity == self._identity:
+            return False
+        self._identity = identity
+        return True
+
+
+# removes payload stores of other data versions under root
+#   - workers still serving an old version keep their mapped payloads, and rebuild misses
+def prune_payload_stores(root: str, keep: str) -> None:
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        if name != keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
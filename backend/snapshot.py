@@ -0,0 +1,330 @@
+# Binary snapshot of the processed graph (drivers, ctors, races and pairs)
+#
+# Layout (native byte order, recorded in the header):
+#   header   magic, version, byte order, sha256 of the source files, section count
+#   toc      (name, offset, length) per section
+#   sections 8-byte aligned, either a JSON blob (row data) or a flat typed array
+#            (int32, except for head-to-head points, the graph metrics and layout)
+#
+# The file is memory-mapped on load and the int32 sections are read in place.
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from data_types import Driver, Ctor, Race, DriverPair, HeadToHead, add_sorted
+from graph_layout import GraphLayout
+from graph_metrics import GraphMetrics
+from serialization import dumps, loads
+
+MAGIC = b"EMSNAP\0\0"
+VERSION = 5
+HEADER = struct.Struct("<8sIc32sI")  # magic, version, byte order, source hash, sections
+TOC_ENTRY = struct.Struct("<16sQQ")  # name, offset, length
+
+# section name -> GraphMetrics field and array typecode
+METRIC_SECTIONS = {
+    "metric_ids": ("driver_ids", "i"),
+    "distances": ("distances", "B"),
+    "eccentricity": ("eccentricity", "B"),
+    "closeness": ("closeness", "d"),
+    "betweenness": ("betweenness", "d"),
+}
+# section name -> GraphLayout field and array typecode
+LAYOUT_SECTIONS = {
+    "layout_ids": ("driver_ids", "i"),
+    "layout_xy": ("xy", "d"),
+}
+# sections that are not int32 arrays
+TYPECODES = {
+    "h2h_points": "d",
+    **{name: typecode for name, (_, typecode) in METRIC_SECTIONS.items()},
+    **{name: typecode for name, (_, typecode) in LAYOUT_SECTIONS.items()},
+}
+
+
+@dataclass
+class Snapshot:
+    driver_by_id: dict[int, Driver]
+    driver_by_ref: dict[str, Driver]
+    ctor_by_id: dict[int, Ctor]
+    ctor_by_ref: dict[str, Ctor]
+    race_by_id: dict[int, Race]
+    driver_pair_by_id: dict[tuple[int, int], DriverPair]
+    graph_metrics: GraphMetrics | None = None
+    graph_layout: GraphLayout | None = None
+
+
+def hash_sources(file_paths: list[str]) -> bytes:
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        digest.update(os.path.basename(file_path).encode("utf-8"))
+        with open(file_path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.digest()
+
+
+def write_snapshot(path: str, source_hash: bytes, snapshot: Snapshot) -> None:
+    driver_races, driver_years, teammates = array("i"), array("i"), array("i")
+    for driver_id, driver in snapshot.driver_by_id.items():
+        for race_id in driver.race_ids:
+            driver_races.extend((driver_id, race_id))
+        for ctor_id, years in driver.years_by_ctor.items():
+            for year in years:
+                driver_years.extend((driver_id, ctor_id, year))
+        for ctor_id, teammates_by_year in driver.teammates_by_year_by_ctor.items():
+            for year, teammate_ids in teammates_by_year.items():
+                for teammate_id in teammate_ids:
+                    teammates.extend((driver_id, ctor_id, year, teammate_id))
+
+    pairs, pair_races, pair_years = array("i"), array("i"), array("i")
+    head_to_heads, head_to_head_points = array("i"), array("d")
+    for driver_pair_id, driver_pair in snapshot.driver_pair_by_id.items():
+        pairs.extend(driver_pair_id)
+        for race_id in driver_pair.race_ids:
+            pair_races.extend((*driver_pair_id, race_id))
+        for ctor_id, years in driver_pair.years_by_ctor.items():
+            for year in years:
+                pair_years.extend((*driver_pair_id, ctor_id, year))
+        for ctor_id, head_to_head_by_year in (
+            driver_pair.head_to_head_by_year_by_ctor.items()
+        ):
+            for year, head_to_head in head_to_head_by_year.items():
+                head_to_heads.extend(
+                    (
+                        *driver_pair_id,
+                        ctor_id,
+                        year,
+                        head_to_head.races,
+                        *head_to_head.race_ahead,
+                        *head_to_head.qualifying_ahead,
+                        *head_to_head.dnfs,
+                    )
+                )
+                head_to_head_points.extend(head_to_head.points)
+
+    # the loaded fields, positional; derived fields are rebuilt from the int32 sections
+    rows = {
+        "drivers": [
+            [
+                driver.driver_id,
+                driver.driver_ref,
+                driver.number,
+                driver.forename,
+                driver.surname,
+                driver.codename,
+                driver.dob.isoformat(),
+                driver.nationality,
+            ]
+            for driver in snapshot.driver_by_id.values()
+        ],
+        "ctors": [
+            [
+                ctor.constructor_id,
+                ctor.constructor_ref,
+                ctor.name,
+                ctor.nationality,
+                ctor.color_primary,
+                ctor.color_secondary,
+            ]
+            for ctor in snapshot.ctor_by_id.values()
+        ],
+        "races": [
+            [race.race_id, race.year, race.name, race.date.isoformat()]
+            for race in snapshot.race_by_id.values()
+        ],
+    }
+
+    sections: list[tuple[bytes, bytes]] = [
+        (b"rows", dumps(rows)),
+        (b"driver_races", driver_races.tobytes()),
+        (b"driver_years", driver_years.tobytes()),
+        (b"teammates", teammates.tobytes()),
+        (b"pairs", pairs.tobytes()),
+        (b"pair_races", pair_races.tobytes()),
+        (b"pair_years", pair_years.tobytes()),
+        (b"head_to_head", head_to_heads.tobytes()),
+        (b"h2h_points", head_to_head_points.tobytes()),
+    ]
+    if snapshot.graph_metrics is not None:
+        sections += [
+            (name.encode("ascii"), getattr(snapshot.graph_metrics, field).tobytes())
+            for name, (field, _) in METRIC_SECTIONS.items()
+        ]
+    if snapshot.graph_layout is not None:
+        sections += [
+            (name.encode("ascii"), getattr(snapshot.graph_layout, field).tobytes())
+            for name, (field, _) in LAYOUT_SECTIONS.items()
+        ]
+
+    offset = HEADER.size + TOC_ENTRY.size * len(sections)
+    toc, data = [], []
+    for name, content in sections:
+        offset += -offset % 8  # align every section to 8 bytes
+        toc.append(TOC_ENTRY.pack(name, offset, len(content)))
+        data.append((offset, content))
+        offset += len(content)
+
+    # write to a temp file and swap it in, so readers never see a partial snapshot
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                sys.byteorder[0].encode("ascii"),
+                source_hash,
+                len(sections),
+            )
+        )
+        f.write(b"".join(toc))
+        for offset, content in data:
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(content)
+    os.replace(tmp_path, path)
+
+
+# returns None if the snapshot is missing, from another version / platform, or stale
+def load_snapshot(path: str, source_hash: bytes) -> Snapshot | None:
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < HEADER.size:
+            return None
+        magic, version, byte_order, file_hash, section_count = HEADER.unpack_from(mm)
+        if (
+            magic != MAGIC
+            or version != VERSION
+            or byte_order != sys.byteorder[0].encode("ascii")
+            or file_hash != source_hash
+        ):
+            return None
+
+        buffer = memoryview(mm)
+        sections: dict[str, memoryview] = {}
+        for i in range(section_count):
+            name, offset, length = TOC_ENTRY.unpack_from(
+                mm, HEADER.size + i * TOC_ENTRY.size
+            )
+            sections[name.rstrip(b"\0").decode("ascii")] = buffer[offset : offset + length]
+
+        try:
+            return _read_sections(sections)
+        finally:
+            for section in sections.values():
+                section.release()
+            buffer.release()
+
+
+def _read_sections(sections: dict[str, memoryview]) -> Snapshot:
+    rows = loads(bytes(sections["rows"]))
+    ints = {
+        name: section.cast("i")
+        for name, section in sections.items()
+        if name != "rows" and name not in TYPECODES
+    }
+
+    driver_by_id: dict[int, Driver] = {}
+    driver_by_ref: dict[str, Driver] = {}
+    for row in rows["drivers"]:
+        driver = Driver(*row[:6], date.fromisoformat(row[6]), row[7])
+        driver_by_id[driver.driver_id] = driver
+        driver_by_ref[driver.driver_ref] = driver
+
+    ctor_by_id: dict[int, Ctor] = {}
+    ctor_by_ref: dict[str, Ctor] = {}
+    for row in rows["ctors"]:
+        ctor = Ctor(*row)
+        ctor_by_id[ctor.constructor_id] = ctor
+        ctor_by_ref[ctor.constructor_ref] = ctor
+
+    race_by_id: dict[int, Race] = {}
+    for row in rows["races"]:
+        race = Race(*row[:3], date.fromisoformat(row[3]))
+        race_by_id[race.race_id] = race
+
+    # id arrays were written in sorted order, so they are appended to as they are read
+    try:
+        values = ints["driver_races"]
+        for i in range(0, len(values), 2):
+            driver_by_id[values[i]].race_ids.append(values[i + 1])
+
+        values = ints["driver_years"]
+        for i in range(0, len(values), 3):
+            driver_by_id[values[i]].years_by_ctor.setdefault(
+                values[i + 1], array("i")
+            ).append(values[i + 2])
+
+        values = ints["teammates"]
+        for i in range(0, len(values), 4):
+            driver_by_id[values[i]].teammates_by_year_by_ctor.setdefault(
+                values[i + 1], dict()
+            ).setdefault(values[i + 2], list()).append(values[i + 3])
+
+        driver_pair_by_id: dict[tuple[int, int], DriverPair] = {}
+        values = ints["pairs"]
+        for i in range(0, len(values), 2):
+            driver_pair_id = values[i], values[i + 1]
+            driver_pair_by_id[driver_pair_id] = DriverPair(*driver_pair_id)
+            add_sorted(driver_by_id[values[i]].teammate_ids, values[i + 1])
+            add_sorted(driver_by_id[values[i + 1]].teammate_ids, values[i])
+
+        values = ints["pair_races"]
+        for i in range(0, len(values), 3):
+            driver_pair_by_id[values[i], values[i + 1]].race_ids.append(values[i + 2])
+
+        values = ints["pair_years"]
+        for i in range(0, len(values), 4):
+            driver_pair_by_id[values[i], values[i + 1]].years_by_ctor.setdefault(
+                values[i + 2], array("i")
+            ).append(values[i + 3])
+
+        values = ints["head_to_head"]
+        points = array("d")
+        points.frombytes(sections["h2h_points"])
+        for i, j in zip(range(0, len(values), 11), range(0, len(points), 2)):
+            driver_pair = driver_pair_by_id[values[i], values[i + 1]]
+            driver_pair.head_to_head_by_year_by_ctor.setdefault(values[i + 2], dict())[
+                values[i + 3]
+            ] = HeadToHead(
+                values[i + 4],
+                list(values[i + 5 : i + 7]),
+                list(values[i + 7 : i + 9]),
+                list(points[j : j + 2]),
+                list(values[i + 9 : i + 11]),
+            )
+    finally:
+        for values in ints.values():
+            values.release()
+
+    graph_metrics = None
+    if all(name in sections for name in METRIC_SECTIONS):
+        metric_arrays = {}
+        for name, (field, typecode) in METRIC_SECTIONS.items():
+            metric_arrays[field] = array(typecode)
+            metric_arrays[field].frombytes(sections[name])
+        graph_metrics = GraphMetrics(**metric_arrays)
+
+    graph_layout = None
+    if all(name in sections for name in LAYOUT_SECTIONS):
+        layout_arrays = {}
+        for name, (field, typecode) in LAYOUT_SECTIONS.items():
+            layout_arrays[field] = array(typecode)
+            layout_arrays[field].frombytes(sections[name])
+        graph_layout = GraphLayout(**layout_arrays)
+
+    return Snapshot(
+        driver_by_id,
+        driver_by_ref,
+        ctor_by_id,
+        ctor_by_ref,
+        race_by_id,
+        driver_pair_by_id,
+        graph_metrics,
+        graph_layout,
+    )
@@ -0,0 +1,307 @@
+# Optional SQLite copy of the data CSVs (LOADER=sqlite, and the endpoints that query it)
+#   - each CSV in TABLES becomes a table, columns in snake_case, \N and missing trailing
+#     values stored as NULL
+#   - rebuilt when the CSVs change (their hash is kept in the meta table), into a temporary
+#     file swapped in with os.replace, so readers never see a half-written database
+#   - the loaders' group-bys (drivers by race and ctor, races by driver) run in SQLite and
+#     only their results come back to Python, tables that are not kept hot (pit stops,
+#     standings, ...) are only read by the queries that need them
+#   - requests read through a ReadPool of read-only connections
+
+import csv
+import os
+import re
+import sqlite3
+from array import array
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from queue import Empty, LifoQueue
+from threading import BoundedSemaphore
+from typing import Iterator
+from columnar import NULL, QualifyingColumns, RaceColumns, ResultColumns, lap_time_ms
+from data_types import Driver, DriverPair
+from pairings import pair_drivers
+from shared_state import file_lock
+from snapshot import hash_sources
+
+# table -> CSV in the data directory, missing CSVs are skipped (e.g. synthetic data)
+TABLES = {
+    "races": "new_races.csv",
+    "results": "new_results.csv",
+    "sprint_results": "sprint_results.csv",
+    "qualifying": "qualifying.csv",
+    "drivers": "drivers.csv",
+    "constructors": "constructors.csv",
+    "status": "status.csv",
+    "circuits": "circuits.csv",
+    "seasons": "seasons.csv",
+    "pit_stops": "pit_stops.csv",
+    "driver_standings": "driver_standings.csv",
+    "constructor_standings": "constructor_standings.csv",
+    "constructor_results": "constructor_results.csv",
+}
+INDEXES = {
+    "races": [("race_id",), ("year",)],
+    "results": [("race_id", "constructor_id"), ("driver_id",)],
+    "sprint_results": [("race_id", "constructor_id"), ("driver_id",)],
+    "qualifying": [("race_id", "constructor_id"), ("driver_id",)],
+    "pit_stops": [("race_id", "driver_id")],
+    "driver_standings": [("driver_id",), ("race_id",)],
+    "constructor_standings": [("constructor_id",), ("race_id",)],
+    "constructor_results": [("race_id", "constructor_id")],
+}
+# besides the *_id columns, everything else is TEXT (e.g. a "+5.2" gap stays as written)
+INTEGER_COLUMNS = {
+    "alt",
+    "fastest_lap",
+    "grid",
+    "lap",
+    "laps",
+    "milliseconds",
+    "number",
+    "position",
+    "position_order",
+    "rank",
+    "round",
+    "stop",
+    "wins",
+    "year",
+}
+REAL_COLUMNS = {"lat", "lng", "points"}
+
+
+def to_snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def column_type(column: str) -> str:
+    if column.endswith("_id") or column in INTEGER_COLUMNS:
+        return "INTEGER"
+    return "REAL" if column in REAL_COLUMNS else "TEXT"
+
+
+def source_paths(data_dir: str) -> list[str]:
+    paths = (os.path.join(data_dir, file_name) for file_name in TABLES.values())
+    return [path for path in paths if os.path.exists(path)]
+
+
+def connect_read_only(db_path: str) -> sqlite3.Connection:
+    return sqlite3.connect(
+        f"{Path(db_path).absolute().as_uri()}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+    )
+
+
+# hash of the CSVs the database was built from, None if there is no database (yet)
+def stored_hash(db_path: str) -> bytes | None:
+    try:
+        conn = connect_read_only(db_path)
+        try:
+            return conn.execute("SELECT source_hash FROM meta").fetchone()[0]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+
+
+def build_database(db_path: str, data_dir: str, source_hash: bytes) -> None:
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # nothing to recover if the build fails, the temporary file is simply rebuilt
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        for table, file_name in TABLES.items():
+            path = os.path.join(data_dir, file_name)
+            if not os.path.exists(path):
+                continue
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                columns = [to_snake_case(column) for column in next(reader)]
+                conn.execute(
+                    f"CREATE TABLE {table} "
+                    f"({', '.join(f'{column} {column_type(column)}' for column in columns)})"
+                )
+                conn.executemany(
+                    f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})",
+                    # short rows (e.g. constructors without colours) end in NULLs
+                    (
+                        [None if value == r"\N" else value for value in row]
+                        + [None] * (len(columns) - len(row))
+                        for row in reader
+                        if row
+                    ),
+                )
+            for index_columns in INDEXES.get(table, ()):
+                conn.execute(
+                    f"CREATE INDEX {table}_{'_'.join(index_columns)} "
+                    f"ON {table} ({', '.join(index_columns)})"
+                )
+        conn.execute("CREATE TABLE meta (source_hash BLOB)")
+        conn.execute("INSERT INTO meta VALUES (?)", (source_hash,))
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+# rebuilds the database if the CSVs changed since it was built, returns whether it did
+#   - with several workers, only the first one to find it stale rebuilds it
+def sync_database(db_path: str, data_dir: str) -> bool:
+    source_hash = hash_sources(source_paths(data_dir))
+    if stored_hash(db_path) == source_hash:
+        return False
+    with file_lock(f"{db_path}.lock"):
+        if stored_hash(db_path) == source_hash:
+            return False
+        build_database(db_path, data_dir, source_hash)
+    return True
+
+
+class ReadPool:
+    """
+    Read-only connections to the database, reused across requests.
+
+    At most size connections are in use at once. A connection opened before the
+    database was rebuilt is replaced the next time it is taken from the pool.
+    """
+
+    def __init__(self, db_path: str, size: int = 4):
+        self.db_path = db_path
+        self._slots = BoundedSemaphore(size)
+        # (file identity when opened, connection), last returned first
+        self._idle: LifoQueue[tuple[tuple[int, int], sqlite3.Connection]] = LifoQueue()
+
+    def _identity(self) -> tuple[int, int]:
+        stat = os.stat(self.db_path)
+        return stat.st_ino, stat.st_mtime_ns
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        with self._slots:
+            identity = self._identity()
+            try:
+                conn_identity, conn = self._idle.get_nowait()
+            except Empty:
+                conn_identity, conn = None, None
+            if conn_identity != identity:
+                if conn is not None:
+                    conn.close()
+                conn = connect_read_only(self.db_path)
+            try:
+                yield conn
+            finally:
+                self._idle.put((identity, conn))
+
+
+# rows come back in CSV order, like the columnar loaders, so the processed graph is identical
+def select_race_columns(conn: sqlite3.Connection) -> RaceColumns:
+    columns = RaceColumns()
+    for race_id, year, name, race_date in conn.execute(
+        "SELECT race_id, year, name, date FROM races ORDER BY rowid"
+    ):
+        columns.race_id.append(race_id)
+        columns.year.append(year)
+        columns.date.append(date.fromisoformat(race_date).toordinal())
+        columns.name.append(name)
+    return columns
+
+
+def select_result_columns(conn: sqlite3.Connection) -> ResultColumns:
+    columns = ResultColumns()
+    integer_columns = (
+        columns.position,
+        columns.grid,
+        columns.position_order,
+        columns.laps,
+        columns.milliseconds,
+    )
+    for row in conn.execute(
+        "SELECT result_id, race_id, driver_id, constructor_id, points, fastest_lap_time, "
+        "status_id, position, grid, position_order, laps, milliseconds "
+        "FROM results ORDER BY rowid"
+    ):
+        result_id, race_id, driver_id, ctor_id, points, fastest_lap_time, status_id = row[:7]
+        columns.result_id.append(result_id)
+        columns.race_id.append(race_id)
+        columns.driver_id.append(driver_id)
+        columns.constructor_id.append(ctor_id)
+        columns.points.append(points)
+        columns.fastest_lap_ms.append(lap_time_ms(fastest_lap_time))
+        columns.status_id.append(NULL if status_id is None else status_id)
+        for column, value in zip(integer_columns, row[7:]):
+            column.append(NULL if value is None else value)
+    return columns
+
+
+def select_qualifying_columns(conn: sqlite3.Connection) -> QualifyingColumns:
+    columns = QualifyingColumns()
+    for race_id, driver_id, ctor_id, position in conn.execute(
+        "SELECT race_id, driver_id, constructor_id, position FROM qualifying ORDER BY rowid"
+    ):
+        columns.race_id.append(race_id)
+        columns.driver_id.append(driver_id)
+        columns.constructor_id.append(ctor_id)
+        columns.position.append(NULL if position is None else position)
+    return columns
+
+
+# SQL equivalent of process_results, each driver's races in one group-by
+def populate_driver_race_ids(
+    conn: sqlite3.Connection, driver_by_id: dict[int, Driver]
+) -> None:
+    for driver_id, race_ids in conn.execute(
+        "SELECT driver_id, group_concat(DISTINCT race_id) FROM results GROUP BY driver_id"
+    ):
+        driver_by_id[driver_id].race_ids = array(
+            "i", sorted(map(int, race_ids.split(",")))
+        )
+
+
+# race_id -> ctor_id -> distinct driver ids, in order of first result like the
+# single pass in populate_driver_pairings
+def select_drivers_by_race_ctor(
+    conn: sqlite3.Connection,
+) -> dict[int, dict[int, list[int]]]:
+    drivers_by_ctor_by_race: dict[int, dict[int, list[int]]] = dict()
+    for race_id, ctor_id, driver_ids in conn.execute(
+        "SELECT race_id, constructor_id, group_concat(DISTINCT driver_id) FROM results "
+        "GROUP BY race_id, constructor_id ORDER BY MIN(rowid)"
+    ):
+        drivers_by_ctor_by_race.setdefault(race_id, dict())[ctor_id] = [
+            int(driver_id) for driver_id in driver_ids.split(",")
+        ]
+    return drivers_by_ctor_by_race
+
+
+def populate_driver_pairings_sql(
+    conn: sqlite3.Connection,
+    races: RaceColumns,
+    driver_by_id: dict[int, Driver],
+) -> dict[tuple[int, int], DriverPair]:
+    return pair_drivers(
+        select_drivers_by_race_ctor(conn), races.year_by_race_id(), driver_by_id
+    )
+
+
+# championship standing after each season's last round the driver was classified in
+def select_driver_standings(conn: sqlite3.Connection, driver_id: int) -> list[dict]:
+    return [
+        {"year": year, "position": position, "points": points, "wins": wins}
+        for year, position, points, wins in conn.execute(
+            "SELECT year, position, points, wins FROM ("
+            "  SELECT races.year, driver_standings.position, driver_standings.points,"
+            "    driver_standings.wins, ROW_NUMBER() OVER ("
+            "      PARTITION BY races.year ORDER BY races.round DESC"
+            "    ) AS latest"
+            "  FROM driver_standings JOIN races USING (race_id)"
+            "  WHERE driver_standings.driver_id = ?"
+            ") WHERE latest = 1 ORDER BY year",
+            (driver_id,),
+        )
+    ]
@@ -0,0 +1,171 @@
+from array import array
+from data_types import DriverPair
+
+
+class TeammateGraph:
+    """
+    Compact adjacency (CSR) of the teammate graph, for shortest path queries.
+
+    Node i is driver_ids[i], its neighbours are
+    neighbors[offsets[i]:offsets[i + 1]]. Each edge slot also keeps a bitmask of
+    the years the pair raced together (bit = year - first_year), overall and per
+    ctor, so year / ctor constraints are checked without touching DriverPair.
+    """
+
+    def __init__(self, driver_pair_by_id: dict[tuple[int, int], DriverPair]):
+        years = {
+            year
+            for driver_pair in driver_pair_by_id.values()
+            for ctor_years in driver_pair.years_by_ctor.values()
+            for year in ctor_years
+        }
+        self.first_year = min(years, default=0)
+        self.last_year = max(years, default=0)
+
+        self.driver_ids: array = array(
+            "i",
+            sorted({driver_id for pair_id in driver_pair_by_id for driver_id in pair_id}),
+        )
+        self.index_by_driver_id: dict[int, int] = {
+            driver_id: i for i, driver_id in enumerate(self.driver_ids)
+        }
+
+        adjacency: list[list[tuple[int, tuple[int, int]]]] = [
+            [] for _ in self.driver_ids
+        ]
+        for driver_pair_id in driver_pair_by_id:
+            i, j = (self.index_by_driver_id[driver_id] for driver_id in driver_pair_id)
+            adjacency[i].append((j, driver_pair_id))
+            adjacency[j].append((i, driver_pair_id))
+
+        self.offsets: array = array("i", [0])
+        self.neighbors: array = array("i")
+        self.edge_years: list[int] = []  # year bitmask per edge slot
+        self.edge_ctor_years: list[dict[int, int]] = []  # ctor_id -> year bitmask
+        for edges in adjacency:
+            for j, driver_pair_id in sorted(edges):
+                ctor_years = {
+                    ctor_id: self.year_mask(years)
+                    for ctor_id, years in driver_pair_by_id[
+                        driver_pair_id
+                    ].years_by_ctor.items()
+                }
+                self.neighbors.append(j)
+                self.edge_ctor_years.append(ctor_years)
+                self.edge_years.append(_or(ctor_years.values()))
+            self.offsets.append(len(self.neighbors))
+
+    def year_mask(self, years) -> int:
+        mask = 0
+        for year in years:
+            mask |= 1 << (year - self.first_year)
+        return mask
+
+    # clamped to [first_year, last_year] like GraphCache.key, so ranges that select the
+    # same seasons are one path_cache entry (and masks stay within the edge masks' bits)
+    def clamp_years(
+        self, min_year: int | None, max_year: int | None
+    ) -> tuple[int | None, int | None]:
+        return (
+            None if min_year is None else max(min_year, self.first_year),
+            None if max_year is None else min(max_year, self.last_year),
+        )
+
+    def range_mask(self, min_year: int | None, max_year: int | None) -> int | None:
+        if min_year is None and max_year is None:
+            return None
+        min_year, max_year = self.clamp_years(min_year, max_year)
+        start = (min_year if min_year is not None else self.first_year) - self.first_year
+        end = (max_year if max_year is not None else self.last_year) - self.first_year
+        if end < start:
+            return 0
+        return ((1 << (end - start + 1)) - 1) << start
+
+    def _edge_allowed(
+        self, slot: int, years_mask: int | None, ctor_id: int | None
+    ) -> bool:
+        mask = (
+            self.edge_years[slot]
+            if ctor_id is None
+            else self.edge_ctor_years[slot].get(ctor_id, 0)
+        )
+        return bool(mask if years_mask is None else mask & years_mask)
+
+    def shortest_path(
+        self,
+        from_driver_id: int,
+        to_driver_id: int,
+        min_year: int | None = None,
+        max_year: int | None = None,
+        ctor_id: int | None = None,
+    ) -> list[int] | None:
+        """
+        Fewest-teammate-hops path between two drivers, as driver ids.
+
+        Only pairings that raced together within [min_year, max_year] (and for
+        ctor_id, if given) are followed. Returns None if there is no such path.
+        """
+        source = self.index_by_driver_id.get(from_driver_id)
+        target = self.index_by_driver_id.get(to_driver_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return [from_driver_id]
+
+        years_mask = self.range_mask(min_year, max_year)
+        constrained = years_mask is not None or ctor_id is not None
+        offsets, neighbors = self.offsets, self.neighbors
+
+        # bidirectional BFS, always expanding the smaller frontier by a full level
+        parents = ({source: -1}, {target: -1})
+        frontiers = ([source], [target])
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            seen, other_seen = parents[side], parents[1 - side]
+            next_frontier = []
+            meeting = None
+            for node in frontiers[side]:
+                for slot in range(offsets[node], offsets[node + 1]):
+                    neighbor = neighbors[slot]
+                    if neighbor in seen or (
+                        constrained
+                        and not self._edge_allowed(slot, years_mask, ctor_id)
+                    ):
+                        continue
+                    seen[neighbor] = node
+                    if neighbor in other_seen:
+                        meeting = neighbor
+                        break
+                    next_frontier.append(neighbor)
+                if meeting is not None:
+                    break
+            if meeting is not None:
+                return self._join(parents, meeting)
+            frontiers = (
+                (next_frontier, frontiers[1])
+                if side == 0
+                else (frontiers[0], next_frontier)
+            )
+        return None
+
+    def _join(
+        self, parents: tuple[dict[int, int], dict[int, int]], meeting: int
+    ) -> list[int]:
+        path = []
+        node = meeting
+        while node != -1:
+            path.append(node)
+            node = parents[0][node]
+        path.reverse()
+        node = parents[1][meeting]
+        while node != -1:
+            path.append(node)
+            node = parents[1][node]
+        return [self.driver_ids[i] for i in path]
+
+
+def _or(masks) -> int:
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
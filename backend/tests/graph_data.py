@@ -0,0 +1,58 @@
+"""
+The processed graph of backend/data, for the tests that check views and indexes
+against the real history. Built with the columnar loaders (what LOADER=columnar
+runs), without importing main.py, which would build and write graph.snapshot.
+"""
+
+import csv
+from functools import cache
+
+from columnar import (
+    load_qualifying_columns,
+    load_race_columns,
+    load_result_columns,
+    populate_driver_pairings_columnar,
+    process_result_columns,
+)
+from data_types import CtorRow, DriverRow
+from head_to_head import load_status_outcomes, populate_head_to_head
+from snapshot import Snapshot
+
+DATA_DIR = "data"
+
+
+def read_rows(file_name: str) -> list[dict[str, str]]:
+    with open(f"{DATA_DIR}/{file_name}", newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+# built once per test run, tests must not change it
+@cache
+def load_graph() -> Snapshot:
+    drivers = [
+        DriverRow(**{**row, "number": None if row["number"] == r"\N" else row["number"]})
+        .to_driver()
+        for row in read_rows("drivers.csv")
+    ]
+    ctors = [CtorRow(**row).to_ctor() for row in read_rows("constructors.csv")]
+    driver_by_id = {driver.driver_id: driver for driver in drivers}
+
+    races = load_race_columns(f"{DATA_DIR}/new_races.csv")
+    results = load_result_columns(f"{DATA_DIR}/new_results.csv")
+    process_result_columns(results, driver_by_id)
+    driver_pair_by_id = populate_driver_pairings_columnar(races, results, driver_by_id)
+    populate_head_to_head(
+        results,
+        load_qualifying_columns(f"{DATA_DIR}/qualifying.csv"),
+        races.year_by_race_id(),
+        load_status_outcomes(f"{DATA_DIR}/status.csv"),
+        driver_pair_by_id,
+    )
+    return Snapshot(
+        driver_by_id,
+        {driver.driver_ref: driver for driver in drivers},
+        {ctor.constructor_id: ctor for ctor in ctors},
+        {ctor.constructor_ref: ctor for ctor in ctors},
+        races.to_models(),
+        driver_pair_by_id,
+    )
@@ -0,0 +1,98 @@
+"""
+Replays the /graph/deltas payload (graph_deltas.py) season by season and checks
+every frame against the /graph/skeleton payload of the same year range, on the
+graph of backend/data. Run from backend/:
+    python -m unittest tests.test_graph_deltas
+"""
+
+import unittest
+
+from graph_deltas import SeasonFrames, to_delta_data
+from graph_views import to_skeleton_data
+from tests.graph_data import load_graph
+from year_index import YearIndex
+
+
+# (driver_id -> displayCtorId, (source, target) -> displayCtorId) of a skeleton payload
+def skeleton_frame(skeleton: dict) -> tuple[dict, dict]:
+    return (
+        {
+            int(node["data"]["id"]): int(node["data"]["displayCtorId"])
+            for node in skeleton["nodes"]
+        },
+        {
+            (int(edge["data"]["source"]), int(edge["data"]["target"])): int(
+                edge["data"]["displayCtorId"]
+            )
+            for edge in skeleton["edges"]
+        },
+    )
+
+
+def apply_delta(nodes: dict, edges: dict, delta: dict) -> None:
+    for driver_id in delta["removeNodes"]:
+        del nodes[driver_id]
+    for source, target in delta["removeEdges"]:
+        del edges[source, target]
+    for driver_id, ctor_id in delta["addNodes"] + delta["ctorChanges"]["nodes"]:
+        nodes[driver_id] = ctor_id
+    for source, target, ctor_id in delta["addEdges"] + delta["ctorChanges"]["edges"]:
+        edges[source, target] = ctor_id
+
+
+class DeltaReplayTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        graph = load_graph()
+        cls.graph = graph
+        cls.year_index = YearIndex(graph.driver_by_id)
+        cls.season_frames = SeasonFrames(
+            graph.driver_by_id, graph.driver_pair_by_id, cls.year_index
+        )
+
+    def skeleton(self, min_year: int, max_year: int) -> tuple[dict, dict]:
+        return skeleton_frame(
+            to_skeleton_data(
+                self.graph.driver_by_id,
+                self.graph.ctor_by_id,
+                self.graph.driver_pair_by_id,
+                self.year_index,
+                min_year,
+                max_year,
+            )
+        )
+
+    def assert_replays_skeleton(self, min_year: int, max_year: int, window: int):
+        data = to_delta_data(self.season_frames, min_year, max_year, window)
+        years = self.year_index.years_in(min_year, max_year)
+        self.assertEqual(
+            [data["base"]["year"]] + [delta["year"] for delta in data["deltas"]], years
+        )
+
+        nodes = {driver_id: ctor_id for driver_id, ctor_id in data["base"]["nodes"]}
+        edges = {
+            (source, target): ctor_id for source, target, ctor_id in data["base"]["edges"]
+        }
+        self.assertEqual((nodes, edges), self.skeleton(years[0] - window + 1, years[0]))
+        for delta in data["deltas"]:
+            apply_delta(nodes, edges, delta)
+            self.assertEqual(
+                (nodes, edges),
+                self.skeleton(delta["year"] - window + 1, delta["year"]),
+                delta["year"],
+            )
+
+    def test_single_seasons(self):
+        self.assert_replays_skeleton(0, 9999, window=1)
+
+    def test_window(self):
+        self.assert_replays_skeleton(1980, 2010, window=5)
+
+    def test_empty_range(self):
+        data = to_delta_data(self.season_frames, 3000, 3010)
+        self.assertIsNone(data["base"])
+        self.assertEqual(data["deltas"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
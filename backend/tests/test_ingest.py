@@ -0,0 +1,218 @@
+"""
+Checks ingest.py on small Ergast races written to temporary CSVs: validation,
+the tail of a race split across two result pages, and that a failed stream
+writes nothing. Run from backend/:
+    python -m unittest tests.test_ingest
+"""
+
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from ingest import (
+    CTOR_HEADER,
+    DRIVER_HEADER,
+    RACE_HEADER,
+    RESULT_HEADER,
+    RefTables,
+    iter_new_rows,
+    process_races_json,
+    stream_new_json,
+    validate_race,
+)
+
+DRIVERS = {"hamilton": 1, "russell": 2, "norris": 3}
+CTORS = {"mercedes": 1, "mclaren": 2}
+STATUSES = {"Finished": 1, "+1 Lap": 11}
+
+
+def result(driver_ref: str, ctor_ref: str, position: int, laps: int = 58) -> dict:
+    return {
+        "number": str(position),
+        "position": str(position),
+        "positionText": str(position),
+        "points": "0",
+        "Driver": {"driverId": driver_ref},
+        "Constructor": {"constructorId": ctor_ref},
+        "grid": str(position),
+        "laps": str(laps),
+        "status": "Finished" if laps == 58 else "Lapped",
+    }
+
+
+def race(round: int, results: list[dict]) -> dict:
+    return {
+        "season": "2025",
+        "round": str(round),
+        "raceName": f"Grand Prix {round}",
+        "date": "2025-03-16",
+        "Results": results,
+    }
+
+
+def races_json(*races: dict) -> dict:
+    return {"MRData": {"RaceTable": {"Races": list(races)}}}
+
+
+class IngestTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+        self.race_csv = self.write_csv("races.csv", RACE_HEADER)
+        self.result_csv = self.write_csv("results.csv", RESULT_HEADER)
+        self.ref_csvs = (
+            self.write_csv(
+                "drivers.csv",
+                DRIVER_HEADER,
+                [
+                    [i, ref, "", "", ref, ref, "1990-01-01", "", ""]
+                    for ref, i in DRIVERS.items()
+                ],
+            ),
+            self.write_csv(
+                "constructors.csv",
+                CTOR_HEADER,
+                [[i, ref, ref, "", "", "", ""] for ref, i in CTORS.items()],
+            ),
+            self.write_csv(
+                "status.csv", ["statusId", "status"], [[i, s] for s, i in STATUSES.items()]
+            ),
+        )
+        self.refs = RefTables(DRIVERS, CTORS, STATUSES)
+
+    def write_csv(self, file_name: str, header: list[str], rows: list[list] = ()) -> str:
+        path = os.path.join(self.dir, file_name)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows([header, *rows])
+        return path
+
+    def read_csv(self, path: str) -> list[dict[str, str]]:
+        with open(path, newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+
+    def read_files(self) -> list[bytes]:
+        files = []
+        for path in (self.race_csv, self.result_csv, *self.ref_csvs):
+            with open(path, "rb") as f:
+                files.append(f.read())
+        return files
+
+    def test_validate_race(self):
+        valid = race(1, [result("hamilton", "mercedes", 1)])
+        self.assertEqual(validate_race(valid, self.refs), [])
+
+        bad = race(1, [result("hamilton", "mercedes", 1), result("newcomer", "mercedes", 2)])
+        bad["season"] = "twenty"
+        bad["Results"][0]["grid"] = ""
+        bad["Results"].append(result("hamilton", "mercedes", 1))
+        self.assertEqual(
+            validate_race(bad, self.refs),
+            [
+                "season is 'twenty', not a number",
+                "Results: hamilton has grid ''",
+                "Results: unknown driver 'newcomer' without givenName, familyName, "
+                "dateOfBirth, nationality",
+                "Results: hamilton is listed twice in car 1",
+            ],
+        )
+
+    def test_invalid_race_raises(self):
+        races = [
+            race(1, [result("hamilton", "mercedes", 1)]),
+            race(2, [result("hamilton", "unknown", 1)]),
+        ]
+        rows = iter_new_rows(races, self.race_csv, self.result_csv, self.refs)
+        self.assertIsNotNone(next(rows)[0])
+        with self.assertRaisesRegex(ValueError, "2025 round 2: .*unknown constructor"):
+            next(rows)
+
+    def test_split_race(self):
+        head = race(1, [result("hamilton", "mercedes", 1), result("russell", "mercedes", 2)])
+        # the tail page repeats the last result of the head page
+        tail = race(1, [result("russell", "mercedes", 2), result("norris", "mclaren", 3, 57)])
+
+        race_rows, result_rows = process_races_json(
+            races_json(head), self.race_csv, self.result_csv, self.refs
+        )
+        self.assertEqual((len(race_rows), len(result_rows)), (1, 2))
+        race_rows, result_rows = process_races_json(
+            races_json(tail), self.race_csv, self.result_csv, self.refs
+        )
+        self.assertEqual((len(race_rows), len(result_rows)), (0, 1))
+        # re-posting the tail is a no-op
+        self.assertEqual(
+            process_races_json(races_json(tail), self.race_csv, self.result_csv, self.refs),
+            ([], []),
+        )
+
+        self.assertEqual(len(self.read_csv(self.race_csv)), 1)
+        results = self.read_csv(self.result_csv)
+        self.assertEqual(
+            [
+                (row["resultId"], row["raceId"], row["driverId"], row["positionOrder"])
+                for row in results
+            ],
+            [("1", "1", "1", "1"), ("2", "1", "2", "2"), ("3", "1", "3", "3")],
+        )
+        # lapped by the winner of the head page
+        self.assertEqual(results[-1]["statusId"], str(STATUSES["+1 Lap"]))
+
+    def write_json(self, file_name: str, data: dict) -> str:
+        path = os.path.join(self.dir, file_name)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        return path
+
+    def test_stream_split_race(self):
+        json_paths = [
+            self.write_json(
+                "page1.json",
+                races_json(
+                    race(1, [result("hamilton", "mercedes", 1)]),
+                    race(
+                        2, [result("norris", "mclaren", 1), result("russell", "mercedes", 2)]
+                    ),
+                ),
+            ),
+            self.write_json(
+                "page2.json",
+                races_json(race(2, [result("hamilton", "mercedes", 3, 57)])),
+            ),
+        ]
+        stats = stream_new_json(
+            json_paths, self.race_csv, self.result_csv, self.refs, self.ref_csvs
+        )
+
+        self.assertEqual((stats.races, stats.results), (2, 4))
+        results = self.read_csv(self.result_csv)
+        self.assertEqual(
+            [(row["raceId"], row["positionOrder"]) for row in results],
+            [("1", "1"), ("2", "1"), ("2", "2"), ("2", "3")],
+        )
+        self.assertEqual(results[-1]["statusId"], str(STATUSES["+1 Lap"]))
+
+    def test_stream_writes_nothing_on_failure(self):
+        rookie = result("rookie", "mclaren", 2)
+        rookie["Driver"].update(
+            givenName="Rookie", familyName="Driver", dateOfBirth="2006-01-01", nationality="X"
+        )
+        invalid = race(2, [result("hamilton", "mercedes", 1)])
+        invalid["date"] = ""
+        json_path = self.write_json(
+            "page1.json",
+            races_json(race(1, [result("hamilton", "mercedes", 1), rookie]), invalid),
+        )
+        files = self.read_files()
+
+        with self.assertRaisesRegex(ValueError, "2025 round 2: no raceName / date"):
+            stream_new_json(
+                [json_path], self.race_csv, self.result_csv, self.refs, self.ref_csvs
+            )
+        self.assertEqual(self.read_files(), files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Checks util/request.py against a local stub of a paginated Ergast endpoint:
+pagination (with the server clamping the limit), the 429 / 5xx retry and
+revalidation of cached pages with a 304. Run from backend/:
+    python -m unittest tests.test_request
+"""
+
+import asyncio
+import json
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from util.request import ConnectionPool, FetchError, RateLimiter, fetch_all_pages, fetch_json
+
+TOTAL = 250
+MAX_LIMIT = 100  # like Jolpica, larger limits are clamped
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = dict(parse_qsl(parts.query))
+        server: StubServer = self.server
+        with server.lock:
+            server.requests[(parts.path, query.get("offset"))] += 1
+            count = server.requests[(parts.path, query.get("offset"))]
+
+        if parts.path == "/unavailable.json":
+            return self.reply(503, b"", {"Retry-After": "0"})
+        offset = int(query.get("offset", 0))
+        if offset in server.rate_limited_offsets and count == 1:
+            return self.reply(429, b"", {"Retry-After": "0"})
+
+        etag = f'"page-{offset}"'
+        if self.headers.get("If-None-Match") == etag:
+            with server.lock:
+                server.not_modified += 1
+            return self.reply(304, b"", {"ETag": etag})
+        limit = min(int(query.get("limit", 30)), MAX_LIMIT)
+        page = {
+            "MRData": {
+                "limit": str(limit),
+                "offset": str(offset),
+                "total": str(TOTAL),
+                "Items": list(range(offset, min(offset + limit, TOTAL))),
+            }
+        }
+        self.reply(200, json.dumps(page).encode("utf-8"), {"ETag": etag})
+
+    def reply(self, status: int, body: bytes, headers: dict[str, str]) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, rate_limited_offsets: set[int] = frozenset()):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.lock = threading.Lock()
+        self.requests: Counter[tuple[str, str | None]] = Counter()
+        self.rate_limited_offsets = rate_limited_offsets
+        self.not_modified = 0
+
+
+class FetchTest(unittest.TestCase):
+    def start_server(self, **kwargs) -> str:
+        server = StubServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.server = server
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    def test_pages_in_offset_order_with_retried_429(self):
+        base_url = self.start_server(rate_limited_offsets={100})
+        pages = asyncio.run(
+            fetch_all_pages(f"{base_url}/results.json", limit=500, concurrency=3, rate=0)
+        )
+
+        # the clamped limit from the first page decides the offsets
+        self.assertEqual([page["MRData"]["offset"] for page in pages], ["0", "100", "200"])
+        items = [item for page in pages for item in page["MRData"]["Items"]]
+        self.assertEqual(items, list(range(TOTAL)))
+        self.assertEqual(self.server.requests[("/results.json", "100")], 2)
+        self.assertEqual(self.server.requests[("/results.json", "200")], 1)
+
+    def test_cached_pages_are_revalidated(self):
+        base_url = self.start_server()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = asyncio.run(
+                fetch_all_pages(f"{base_url}/results.json", rate=0, cache_dir=cache_dir)
+            )
+            self.assertEqual(self.server.not_modified, 0)
+            second = asyncio.run(
+                fetch_all_pages(f"{base_url}/results.json", rate=0, cache_dir=cache_dir)
+            )
+        self.assertEqual(second, first)
+        self.assertEqual(self.server.not_modified, len(first))
+
+    def test_gives_up_after_retries(self):
+        base_url = self.start_server()
+
+        async def fetch():
+            pool = ConnectionPool("http", urlsplit(base_url).netloc, size=1)
+            try:
+                await fetch_json(
+                    f"{base_url}/unavailable.json", pool, RateLimiter(0), retries=2
+                )
+            finally:
+                pool.close()
+
+        with self.assertRaises(FetchError):
+            asyncio.run(fetch())
+        self.assertEqual(self.server.requests[("/unavailable.json", None)], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
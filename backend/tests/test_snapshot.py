@@ -0,0 +1,73 @@
+"""
+Writes the graph of backend/data to a snapshot and checks that load_snapshot
+gives back the same models, graph metrics and layout, and that a snapshot of
+other sources is not loaded. Run from backend/:
+    python -m unittest tests.test_snapshot
+"""
+
+import dataclasses
+import os
+import tempfile
+import unittest
+
+from graph_layout import compute_layout
+from graph_metrics import compute_graph_metrics
+from snapshot import hash_sources, load_snapshot, write_snapshot
+from teammate_paths import TeammateGraph
+from tests.graph_data import DATA_DIR, load_graph
+
+
+class SnapshotTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        graph = load_graph()
+        pair_ids = list(graph.driver_pair_by_id)
+        cls.graph = dataclasses.replace(
+            graph,
+            graph_metrics=compute_graph_metrics(
+                TeammateGraph(graph.driver_pair_by_id), processes=1
+            ),
+            graph_layout=compute_layout(pair_ids, {}, iterations=1),
+        )
+        cls.source_hash = hash_sources([f"{DATA_DIR}/new_results.csv"])
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "graph.snapshot")
+
+    def test_round_trip(self):
+        write_snapshot(self.path, self.source_hash, self.graph)
+        loaded = load_snapshot(self.path, self.source_hash)
+
+        self.assertIsNotNone(loaded)
+        self.assertEqual(loaded.driver_by_id, self.graph.driver_by_id)
+        self.assertEqual(loaded.driver_by_ref, self.graph.driver_by_ref)
+        self.assertEqual(loaded.ctor_by_id, self.graph.ctor_by_id)
+        self.assertEqual(loaded.ctor_by_ref, self.graph.ctor_by_ref)
+        self.assertEqual(loaded.race_by_id, self.graph.race_by_id)
+        self.assertEqual(loaded.driver_pair_by_id, self.graph.driver_pair_by_id)
+        self.assertEqual(loaded.graph_metrics, self.graph.graph_metrics)
+        self.assertEqual(loaded.graph_layout.driver_ids, self.graph.graph_layout.driver_ids)
+        self.assertEqual(loaded.graph_layout.xy, self.graph.graph_layout.xy)
+
+    def test_without_metrics_and_layout(self):
+        graph = dataclasses.replace(self.graph, graph_metrics=None, graph_layout=None)
+        write_snapshot(self.path, self.source_hash, graph)
+        loaded = load_snapshot(self.path, self.source_hash)
+
+        self.assertEqual(loaded.driver_pair_by_id, graph.driver_pair_by_id)
+        self.assertIsNone(loaded.graph_metrics)
+        self.assertIsNone(loaded.graph_layout)
+
+    def test_stale_or_missing(self):
+        self.assertIsNone(load_snapshot(self.path, self.source_hash))
+        write_snapshot(self.path, self.source_hash, self.graph)
+        self.assertIsNone(load_snapshot(self.path, bytes(32)))
+        with open(self.path, "r+b") as f:
+            f.write(b"NOTASNAP")
+        self.assertIsNone(load_snapshot(self.path, self.source_hash))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Checks the bidirectional BFS in teammate_paths.py against a plain BFS over the
+driver pairs of backend/data, with and without year / ctor constraints, and the
+clamping of year ranges. Run from backend/:
+    python -m unittest tests.test_teammate_paths
+"""
+
+import random
+import unittest
+from collections import deque
+
+from teammate_paths import TeammateGraph
+from tests.graph_data import load_graph
+
+
+# whether the pair raced together in the range (for ctor_id, if given)
+def pair_allowed(driver_pair, min_year, max_year, ctor_id) -> bool:
+    return any(
+        (min_year is None or year >= min_year) and (max_year is None or year <= max_year)
+        for pair_ctor_id, years in driver_pair.years_by_ctor.items()
+        if ctor_id is None or pair_ctor_id == ctor_id
+        for year in years
+    )
+
+
+# reference: single-source BFS straight over the DriverPairs, hop count or None
+def plain_distance(driver_pair_by_id, from_id, to_id, min_year, max_year, ctor_id):
+    neighbors: dict[int, list[int]] = {}
+    for (driver_id1, driver_id2), driver_pair in driver_pair_by_id.items():
+        if pair_allowed(driver_pair, min_year, max_year, ctor_id):
+            neighbors.setdefault(driver_id1, []).append(driver_id2)
+            neighbors.setdefault(driver_id2, []).append(driver_id1)
+
+    distance = {from_id: 0}
+    queue = deque([from_id])
+    while queue:
+        node = queue.popleft()
+        if node == to_id:
+            return distance[node]
+        for neighbor in neighbors.get(node, ()):
+            if neighbor not in distance:
+                distance[neighbor] = distance[node] + 1
+                queue.append(neighbor)
+    return None
+
+
+class ShortestPathTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.driver_pair_by_id = load_graph().driver_pair_by_id
+        cls.graph = TeammateGraph(cls.driver_pair_by_id)
+
+    def assert_matches_plain_bfs(
+        self, from_id, to_id, min_year=None, max_year=None, ctor_id=None
+    ):
+        path = self.graph.shortest_path(from_id, to_id, min_year, max_year, ctor_id)
+        expected = plain_distance(
+            self.driver_pair_by_id, from_id, to_id, min_year, max_year, ctor_id
+        )
+        if expected is None:
+            self.assertIsNone(path)
+            return
+        self.assertEqual(len(path) - 1, expected)
+        self.assertEqual((path[0], path[-1]), (from_id, to_id))
+        # every hop is a pairing that satisfies the constraints
+        for driver_ids in zip(path, path[1:]):
+            driver_pair = self.driver_pair_by_id[tuple(sorted(driver_ids))]
+            self.assertTrue(pair_allowed(driver_pair, min_year, max_year, ctor_id))
+
+    def test_unconstrained(self):
+        rng = random.Random(0)
+        driver_ids = list(self.graph.driver_ids)
+        for _ in range(100):
+            self.assert_matches_plain_bfs(*rng.sample(driver_ids, 2))
+
+    def test_year_ranges(self):
+        rng = random.Random(1)
+        driver_ids = list(self.graph.driver_ids)
+        for _ in range(100):
+            min_year = rng.randrange(self.graph.first_year, self.graph.last_year + 1)
+            max_year = min_year + rng.randrange(0, 30)
+            self.assert_matches_plain_bfs(*rng.sample(driver_ids, 2), min_year, max_year)
+
+    def test_ctor(self):
+        rng = random.Random(2)
+        pair_ids = list(self.driver_pair_by_id)
+        for _ in range(50):
+            # two drivers of the same ctor, so a path is possible
+            driver_pair = self.driver_pair_by_id[rng.choice(pair_ids)]
+            ctor_id = rng.choice(list(driver_pair.years_by_ctor))
+            teammate_pair_ids = [
+                pair_id
+                for pair_id, pair in self.driver_pair_by_id.items()
+                if ctor_id in pair.years_by_ctor
+            ]
+            from_id = driver_pair.driver_id_1
+            to_id = rng.choice(rng.choice(teammate_pair_ids))
+            self.assert_matches_plain_bfs(from_id, to_id, ctor_id=ctor_id)
+
+    def test_same_and_unknown_driver(self):
+        driver_id = self.graph.driver_ids[0]
+        self.assertEqual(self.graph.shortest_path(driver_id, driver_id), [driver_id])
+        self.assertIsNone(self.graph.shortest_path(driver_id, -1))
+
+    def test_year_ranges_are_clamped(self):
+        first_year, last_year = self.graph.first_year, self.graph.last_year
+        self.assertEqual(self.graph.clamp_years(None, None), (None, None))
+        self.assertEqual(self.graph.clamp_years(0, 10**18), (first_year, last_year))
+        self.assertEqual(
+            self.graph.range_mask(-(10**18), 10**18), self.graph.range_mask(None, last_year)
+        )
+        # a range outside the seasons follows no pairing
+        self.assertEqual(self.graph.range_mask(last_year + 1, 10**18), 0)
+        self.assertEqual(self.graph.range_mask(-(10**18), first_year - 1), 0)
+        from_id, to_id = next(iter(self.driver_pair_by_id))
+        self.assertEqual(
+            self.graph.shortest_path(from_id, to_id, max_year=10**18), [from_id, to_id]
+        )
+        self.assertIsNone(self.graph.shortest_path(from_id, to_id, min_year=last_year + 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,29 +1,255 @@
-import requests
+import argparse
+import asyncio
+import hashlib
+import http.client
+import json
+import os
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 
-def fetch_and_save_results(url: str, output_filename: str = "results.json") -> None:
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Throw an error for bad HTTP status codes
-    except requests.RequestException as e:
-        print(f"Error fetching data from {url}: {e}")
-        return
+class FetchError(Exception):
+    pass
+
+
+# Spaces out request starts so at most `rate` requests are sent per second
+class RateLimiter:
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_start > now:
+                await asyncio.sleep(self._next_start - now)
+                now = self._next_start
+            self._next_start = now + self.interval
+
+
+# Fixed-size pool of keep-alive connections to one host
+#   - http.client is blocking, so each request runs in a worker thread
+class ConnectionPool:
+    def __init__(self, scheme: str, netloc: str, size: int = 4, timeout: float = 30):
+        connection_class = (
+            http.client.HTTPSConnection
+            if scheme == "https"
+            else http.client.HTTPConnection
+        )
+        self._idle: asyncio.Queue[http.client.HTTPConnection] = asyncio.Queue()
+        for _ in range(size):
+            self._idle.put_nowait(connection_class(netloc, timeout=timeout))
+
+    @staticmethod
+    def _send(
+        connection: http.client.HTTPConnection, path: str, headers: dict[str, str]
+    ) -> tuple[int, dict[str, str], bytes]:
+        for attempt in range(2):
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+                return (
+                    response.status,
+                    {name.lower(): value for name, value in response.getheaders()},
+                    body,
+                )
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # server dropped an idle keep-alive connection, reconnect once
+                connection.close()
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    async def get(
+        self, path: str, headers: dict[str, str]
+    ) -> tuple[int, dict[str, str], bytes]:
+        connection = await self._idle.get()
+        try:
+            return await asyncio.to_thread(self._send, connection, path, headers)
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            raise
+        finally:
+            self._idle.put_nowait(connection)
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str | None
+    last_modified: str | None
+
+
+# On-disk response cache, revalidated with If-None-Match / If-Modified-Since
+class ResponseCache:
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def load(self, url: str) -> CachedResponse | None:
+        path = self._path(url)
+        try:
+            with open(f"{path}.meta", encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(f"{path}.body", "rb") as f:
+                return CachedResponse(f.read(), meta.get("etag"), meta.get("last_modified"))
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, body: bytes, headers: dict[str, str]) -> None:
+        path = self._path(url)
+        with open(f"{path}.body", "wb") as f:
+            f.write(body)
+        with open(f"{path}.meta", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "url": url,
+                    "etag": headers.get("etag"),
+                    "last_modified": headers.get("last-modified"),
+                },
+                f,
+            )
+
+
+def with_page(url: str, limit: int, offset: int) -> str:
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update(limit=str(limit), offset=str(offset))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+async def fetch_json(
+    url: str,
+    pool: ConnectionPool,
+    limiter: RateLimiter,
+    cache: ResponseCache | None = None,
+    retries: int = 3,
+) -> dict:
+    cached = cache.load(url) if cache else None
+    headers = {"Accept": "application/json"}
+    if cached and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+    for attempt in range(retries + 1):
+        await limiter.wait()
+        status, response_headers, body = await pool.get(path, headers)
+
+        if status == 304 and cached:
+            return json.loads(cached.body)
+        if status == 200:
+            data = json.loads(body)
+            if cache:
+                cache.store(url, body, response_headers)
+            return data
+        if (status == 429 or status >= 500) and attempt < retries:
+            retry_after = response_headers.get("retry-after", "")
+            await asyncio.sleep(float(retry_after) if retry_after.isdigit() else 2**attempt)
+            continue
+        raise FetchError(f"GET {url} returned HTTP {status}")
+
+    raise FetchError(f"GET {url} failed after {retries} retries")
+
+
+# Fetches every page of a paginated Ergast / Jolpica endpoint
+#   - the first page gives MRData.total / limit, the remaining pages are fetched concurrently
+#   - returns the pages in offset order
+async def fetch_all_pages(
+    url: str,
+    limit: int = 100,
+    concurrency: int = 4,
+    rate: float = 4.0,
+    cache_dir: str | None = None,
+) -> list[dict]:
+    parts = urlsplit(url)
+    pool = ConnectionPool(parts.scheme, parts.netloc, size=concurrency)
+    limiter = RateLimiter(rate)
+    cache = ResponseCache(cache_dir) if cache_dir else None
 
     try:
-        data = response.json()
-    except ValueError:
-        print("Error: Response content is not valid JSON")
-        return
+        first_page = await fetch_json(with_page(url, limit, 0), pool, limiter, cache)
+        total = int(first_page["MRData"]["total"])
+        limit = int(first_page["MRData"]["limit"])  # the server may clamp the limit
+        pages = await asyncio.gather(
+            *(
+                fetch_json(with_page(url, limit, offset), pool, limiter, cache)
+                for offset in range(limit, total, limit)
+            )
+        )
+    finally:
+        pool.close()
+    return [first_page, *pages]
+
+
+# Writes pages as compact JSON, one part file per page if there is more than one
+#   - e.g. results.json -> results_pt1.json, results_pt2.json, ...
+def save_pages(pages: list[dict], output_filename: str) -> list[str]:
+    stem, extension = os.path.splitext(output_filename)
+    paths = (
+        [output_filename]
+        if len(pages) == 1
+        else [f"{stem}_pt{i}{extension}" for i in range(1, len(pages) + 1)]
+    )
+    for page, path in zip(pages, paths):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(page, f, ensure_ascii=False, separators=(",", ":"))
+    return paths
+
 
+def fetch_and_save_results(
+    url: str,
+    output_filename: str = "results.json",
+    limit: int = 100,
+    concurrency: int = 4,
+    rate: float = 4.0,
+    cache_dir: str | None = None,
+) -> list[str]:
     try:
-        with open(output_filename, "w", encoding="utf-8") as f:
-            import json
+        pages = asyncio.run(fetch_all_pages(url, limit, concurrency, rate, cache_dir))
+    except (FetchError, http.client.HTTPException, OSError) as e:
+        print(f"Error fetching data from {url}: {e}")
+        return []
+    except (ValueError, KeyError) as e:
+        print(f"Error: Response content is not valid MRData JSON ({e})")
+        return []
 
-            json.dump(data, f, ensure_ascii=False, indent=4)
-        print(f"JSON data successfully saved to {output_filename}")
+    try:
+        paths = save_pages(pages, output_filename)
     except IOError as e:
         print(f"Error writing to file '{output_filename}': {e}")
+        return []
+    print(f"JSON data successfully saved to {', '.join(paths)}")
+    return paths
+
 
 if __name__ == "__main__":
-    api_url = "https://api.jolpi.ca/ergast/f1/2025/drivers.json?limit=100"
-    fetch_and_save_results(api_url, "f1_2025_drivers.json")
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Fetch every page of an Ergast / Jolpica endpoint"
+    )
+    parser.add_argument(
+        "url", nargs="?", default="https://api.jolpi.ca/ergast/f1/2025/drivers.json"
+    )
+    parser.add_argument("output", nargs="?", default="f1_2025_drivers.json")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=4.0, help="max requests / second")
+    parser.add_argument("--cache-dir", default=".http_cache")
+    args = parser.parse_args()
+
+    fetch_and_save_results(
+        args.url, args.output, args.limit, args.concurrency, args.rate, args.cache_dir
+    )
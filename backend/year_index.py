@@ -0,0 +1,51 @@
+from bisect import bisect_left, bisect_right
+from data_types import Driver
+
+
+class YearIndex:
+    """
+    Per-year lookup of the drivers active in each season.
+
+    Built once after populate_driver_pairings, so year range queries only touch
+    the seasons (and drivers) inside the range instead of every driver / pair.
+    """
+
+    def __init__(self, driver_by_id: dict[int, Driver]):
+        # year -> drivers with at least one result that year
+        self.driver_ids_by_year: dict[int, set[int]] = dict()
+
+        for driver_id, driver in driver_by_id.items():
+            for year in driver.years_active:
+                self.driver_ids_by_year.setdefault(year, set()).add(driver_id)
+
+        self.years: list[int] = sorted(self.driver_ids_by_year)
+
+    def years_in(self, min_year: int, max_year: int) -> list[int]:
+        return self.years[
+            bisect_left(self.years, min_year) : bisect_right(self.years, max_year)
+        ]
+
+    def driver_ids(self, min_year: int, max_year: int) -> set[int]:
+        return set().union(
+            *(self.driver_ids_by_year[year] for year in self.years_in(min_year, max_year))
+        )
+
+    # drivers with teammates active in the range, and the pairs with both drivers among them
+    def graph_ids(
+        self, driver_by_id: dict[int, Driver], min_year: int, max_year: int
+    ) -> tuple[list[int], list[tuple[int, int]]]:
+        driver_ids = [
+            driver_id
+            for driver_id in sorted(self.driver_ids(min_year, max_year))
+            if driver_by_id[driver_id].teammate_ids
+        ]
+        seen = set(driver_ids)
+        # each pair once, from its smaller driver_id
+        pair_ids = sorted(
+            (driver_id, teammate_id)
+            for driver_id in driver_ids
+            for teammate_id in driver_by_id[driver_id].teammate_ids
+            if teammate_id > driver_id and teammate_id in seen
+        )
+        return driver_ids, pair_ids
+